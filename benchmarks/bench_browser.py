@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 浏览器执行模型基准
+对比每个请求启动一个Chrome (web_agent.get_content) 与 CDP引擎在少量Chrome中并发多标签页，
+输出 页面/秒 和 每个并发页面占用的内存 (MB)
+
+用法:
+    python3 benchmarks/bench_browser.py --pages 40 --concurrency 8 -o browser_bench.json
+    python3 benchmarks/bench_browser.py --modes cdp --browsers 2 --tabs 4 --scenario js
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_server import start_server
+from load_test import SCENARIOS, ProcessSampler, git_revision
+from cdp_engine import CDPEngine
+import web_agent
+
+
+def page_urls(fixture_url, scenario, count):
+    path = SCENARIOS[scenario]
+    return [f"{fixture_url}{path}{'&' if '?' in path else '?'}n={i}" for i in range(count)]
+
+
+def run_per_request(urls, concurrency):
+    """旧模型: 每个页面启动并退出一个Chrome"""
+    def one(url):
+        html, _ = web_agent.get_content(url)
+        return bool(html)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return sum(executor.map(one, urls))
+
+
+def run_cdp(urls, concurrency, browsers, tabs):
+    """CDP引擎: browsers 个Chrome，每个最多 tabs 个标签页"""
+    async def main():
+        engine = CDPEngine(browsers=browsers, tabs_per_browser=tabs)
+        await engine.start()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(url):
+            async with semaphore:
+                try:
+                    html, _, _ = await engine.fetch(url, timeout=60)
+                    return bool(html)
+                except Exception as e:
+                    print(f"访问失败: {e}", file=sys.stderr)
+                    return False
+
+        try:
+            return sum(await asyncio.gather(*(one(url) for url in urls)))
+        finally:
+            await engine.close()
+
+    return asyncio.run(main())
+
+
+def measure(name, func, concurrency):
+    sampler = ProcessSampler(os.getpid(), interval=0.2)
+    baseline = sampler.sample()
+    sampler.start()
+    started = time.perf_counter()
+    successful = func()
+    duration = time.perf_counter() - started
+    process = sampler.stop()
+
+    extra_mb = max(0.0, process.get("peak_rss_mb", 0) - baseline["rss"] / 1024 / 1024)
+    return {
+        "mode": name,
+        "successful": successful,
+        "duration_seconds": round(duration, 3),
+        "pages_per_second": round(successful / duration, 2) if duration else 0,
+        "peak_browser_processes": process.get("peak_browser_processes", 0),
+        "peak_extra_rss_mb": round(extra_mb, 1),
+        # 浏览器额外占用的内存平摊到同时进行的页面上
+        "mb_per_concurrent_page": round(extra_mb / concurrency, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FoxRead 浏览器执行模型基准')
+    parser.add_argument('--modes', default='per-request,cdp')
+    parser.add_argument('--scenario', default='static', choices=list(SCENARIOS))
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--browsers', type=int, default=1, help='CDP引擎的Chrome进程数')
+    parser.add_argument('--tabs', type=int, default=8, help='每个Chrome的标签页数')
+    parser.add_argument('-o', '--output', help='结果JSON输出路径')
+    args = parser.parse_args()
+
+    fixture_server, fixture_url = start_server()
+    urls = page_urls(fixture_url, args.scenario, args.pages)
+    runners = {
+        "per-request": lambda: run_per_request(urls, args.concurrency),
+        "cdp": lambda: run_cdp(urls, args.concurrency, args.browsers, args.tabs),
+    }
+    reports = []
+    try:
+        for mode in args.modes.split(','):
+            report = measure(mode, runners[mode], args.concurrency)
+            reports.append(report)
+            print(f"🦊 {mode:<12} {report['pages_per_second']:>8} pages/s  "
+                  f"{report['mb_per_concurrent_page']:>7} MB/page  "
+                  f"ok={report['successful']}/{args.pages}  chrome={report['peak_browser_processes']}")
+    finally:
+        fixture_server.shutdown()
+
+    result = {
+        "benchmark": "browser",
+        "git_revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scenario": args.scenario,
+        "pages": args.pages,
+        "concurrency": args.concurrency,
+        "browsers": args.browsers,
+        "tabs_per_browser": args.tabs,
+        "modes": reports,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
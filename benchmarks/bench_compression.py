@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 响应压缩基准
+1. 编码器: 各编码对典型中文JSON/Markdown响应的压缩率、压缩CPU耗时和吞吐
+2. 端到端: 对同一缓存条目反复请求，比较不同 Accept-Encoding 和 If-None-Match 下
+   每个响应传输的字节数和服务端CPU时间 (命中缓存时使用预压缩正文)
+
+用法:
+    python3 benchmarks/bench_compression.py -o compression.json
+    python3 benchmarks/bench_compression.py --kb 500 --requests 50
+"""
+
+import os
+import sys
+import re
+import json
+import time
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_server import start_server, FIXTURE_DIR
+from load_test import git_revision
+import compression
+import extractor
+
+
+def sample_bodies(kilobytes):
+    """用静态页面的分句随机组合出约 kilobytes KB 的中文正文，生成JSON和Markdown响应正文"""
+    with open(os.path.join(FIXTURE_DIR, 'static.html'), encoding='utf-8') as f:
+        article = extractor.extract(f.read(), "http://fixture/static")
+    # 按分句重新组合，避免整段重复使压缩率虚高
+    clauses = [clause for clause in re.split(r'[，。；]', article.text.replace('\n', '')) if clause]
+    random.seed(42)
+    lines, size = [], 0
+    while size < kilobytes * 1024:
+        line = '，'.join(random.sample(clauses, 4)) + f"（{random.randint(1, 100000)}）。"
+        lines.append(line)
+        size += len(line.encode('utf-8')) + 1
+    text = '\n'.join(lines)
+    markdown = f"# {article.title}\n\n" + '\n\n'.join(lines)
+    body = json.dumps({"service": "🦊 FoxRead", "title": article.title, "content": text, "success": True},
+                      ensure_ascii=False, separators=(',', ':'))
+    return {"json": body.encode('utf-8'), "markdown": markdown.encode('utf-8')}
+
+
+def bench_codecs(bodies, repeat):
+    results = []
+    for name, body in bodies.items():
+        for encoding in compression.PREFERENCE:
+            compressed = compression.compress(body, encoding)
+            started = time.process_time()
+            for _ in range(repeat):
+                compression.compress(body, encoding)
+            cpu = (time.process_time() - started) / repeat
+            result = {
+                "body": name,
+                "encoding": encoding,
+                "raw_bytes": len(body),
+                "compressed_bytes": len(compressed),
+                "ratio": round(len(body) / len(compressed), 2),
+                "cpu_ms": round(cpu * 1000, 3),
+                "mb_per_second": round(len(body) / 1024 / 1024 / cpu, 1) if cpu else None,
+            }
+            results.append(result)
+            print(f"🦊 {name:<9} {encoding:<5} {result['raw_bytes'] / 1024:>8.1f} KB -> "
+                  f"{result['compressed_bytes'] / 1024:>7.1f} KB  x{result['ratio']:<5} {result['cpu_ms']:>7} ms")
+    return results
+
+
+def bench_end_to_end(url, requests_count):
+    """在进程内运行API (TestClient)，先请求一次填充缓存，再按各种请求头重复请求"""
+    os.environ.setdefault("FOXREAD_POOL_PREWARM", "0")
+    from fastapi.testclient import TestClient
+    import foxread_api
+
+    modes = [("identity", {"Accept-Encoding": "identity"})]
+    modes += [(encoding, {"Accept-Encoding": encoding}) for encoding in compression.PREFERENCE]
+    results = []
+    with TestClient(foxread_api.app) as client:
+        first = client.get("/api", params={"url": url, "format": "markdown"}, headers={"Accept-Encoding": "identity"})
+        etag = first.headers.get("etag")
+        modes.append(("if-none-match", {"Accept-Encoding": "gzip", "If-None-Match": etag}))
+
+        for name, headers in modes:
+            sent = 0
+            started = time.process_time()
+            for _ in range(requests_count):
+                # stream=True 读取原始字节，不让客户端解压影响CPU时间
+                with client.stream("GET", "/api", params={"url": url, "format": "markdown"}, headers=headers) as response:
+                    sent += sum(len(chunk) for chunk in response.iter_raw())
+            cpu = (time.process_time() - started) / requests_count
+            result = {
+                "mode": name,
+                "bytes_per_response": sent // requests_count,
+                "cpu_ms_per_request": round(cpu * 1000, 3),
+            }
+            results.append(result)
+            print(f"🦊 {name:<14} {result['bytes_per_response'] / 1024:>8.1f} KB/response  {result['cpu_ms_per_request']:>7} ms CPU")
+        cache = client.get("/health").json()["cache"]
+    return results, {key: cache.get(key) for key in ("precompressed_hits", "precompressed_stores")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FoxRead 响应压缩基准')
+    parser.add_argument('--kb', type=int, default=300, help='编码器测试的正文大小 (KB)')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=30, help='端到端测试每种模式的请求数')
+    parser.add_argument('--page-mb', type=float, default=0.5, help='端到端测试页面大小 (fixture /huge)')
+    parser.add_argument('-o', '--output', help='结果JSON输出路径')
+    args = parser.parse_args()
+
+    codecs = bench_codecs(sample_bodies(args.kb), args.repeat)
+
+    fixture_server, fixture_url = start_server()
+    os.environ.setdefault("FOXREAD_DOMAIN_POLICIES", json.dumps({"127.0.0.1": {"rate": 1000, "burst": 1000, "concurrency": 50}}))
+    try:
+        end_to_end, cache = bench_end_to_end(f"{fixture_url}/huge?mb={args.page_mb}", args.requests)
+    finally:
+        fixture_server.shutdown()
+
+    result = {
+        "benchmark": "compression",
+        "git_revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "encodings": compression.PREFERENCE,
+        "codecs": codecs,
+        "end_to_end": end_to_end,
+        "cache": cache,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 正文提取基准测试
+对比旧路径 (BeautifulSoup html.parser + 整页 get_text) 与 extractor 正文提取的解析耗时和输出大小
+
+用法:
+    python3 benchmarks/bench_extract.py                 # 使用内置的合成页面
+    python3 benchmarks/bench_extract.py page1.html dir/ # 使用指定的HTML文件或目录
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+import extractor
+
+PARAGRAPH = "狐狸在森林里寻找猎物，它需要耐心、智慧和一点点运气。每一次成功的狩猎，都源于对环境的细致观察，以及对时机的准确把握。"
+
+
+def legacy_extract(html):
+    """旧的提取路径: 整页 get_text"""
+    soup = BeautifulSoup(html, 'html.parser')
+    return soup.get_text(separator='\n', strip=True)
+
+
+def synthetic_page(paragraphs, comments, nav_links):
+    """合成一篇带导航、侧栏和评论区的文章页面"""
+    nav = ''.join(f'<li><a href="/c/{i}">栏目{i}</a></li>' for i in range(nav_links))
+    body = ''.join(f'<p>{PARAGRAPH} 第{i}段。</p>' for i in range(paragraphs))
+    sidebar = ''.join(f'<li><a href="/p/{i}">推荐阅读第{i}篇文章</a></li>' for i in range(nav_links))
+    comment_html = ''.join(
+        f'<div class="comment-item"><span class="author">用户{i}</span><p>写得很好，学习了，感谢分享！{i}</p></div>'
+        for i in range(comments)
+    )
+    scripts = '<script>' + 'var x = 1;' * 2000 + '</script>'
+    return (
+        f'<html><head><title>合成文章</title><style>body{{margin:0}}</style>{scripts}</head><body>'
+        f'<header><nav><ul>{nav}</ul></nav></header>'
+        f'<div class="container"><div class="main-content"><article><h1>合成文章</h1>{body}</article></div>'
+        f'<div class="sidebar"><ul>{sidebar}</ul></div></div>'
+        f'<div id="comments">{comment_html}</div>'
+        f'<footer>版权所有 © FoxRead</footer></body></html>'
+    )
+
+
+def builtin_pages():
+    return {
+        "small": synthetic_page(paragraphs=10, comments=20, nav_links=30),
+        "medium": synthetic_page(paragraphs=200, comments=300, nav_links=100),
+        "large": synthetic_page(paragraphs=3000, comments=3000, nav_links=300),
+    }
+
+
+def load_pages(paths):
+    pages = {}
+    for path in paths:
+        files = [os.path.join(path, f) for f in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+        for file in files:
+            if file.endswith(('.html', '.htm')):
+                with open(file, encoding='utf-8', errors='replace') as f:
+                    pages[os.path.relpath(file)] = f.read()
+    return pages
+
+
+def timed(func, repeat):
+    durations = []
+    output = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations), output
+
+
+def run(pages, repeat):
+    results = []
+    for name, html in pages.items():
+        legacy_time, legacy_text = timed(lambda: legacy_extract(html), repeat)
+        engine_time, article = timed(lambda: extractor.extract(html, "https://example.com/"), repeat)
+        results.append({
+            "page": name,
+            "html_bytes": len(html.encode('utf-8')),
+            "legacy": {"seconds": round(legacy_time, 5), "output_chars": len(legacy_text)},
+            "extractor": {
+                "seconds": round(engine_time, 5),
+                "text_chars": len(article.text),
+                "markdown_chars": len(article.markdown),
+                "method": article.method,
+            },
+            "speedup": round(legacy_time / engine_time, 2) if engine_time else None,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FoxRead 正文提取基准测试')
+    parser.add_argument('paths', nargs='*', help='HTML文件或目录 (默认使用合成页面)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('-o', '--output', help='结果JSON输出路径')
+    args = parser.parse_args()
+
+    pages = load_pages(args.paths) if args.paths else builtin_pages()
+    results = run(pages, args.repeat)
+
+    print(f"{'page':<20}{'html KB':>10}{'legacy ms':>12}{'engine ms':>12}{'speedup':>9}{'legacy chars':>14}{'text chars':>12}")
+    for r in results:
+        print(f"{r['page'][:19]:<20}{r['html_bytes'] / 1024:>10.1f}{r['legacy']['seconds'] * 1000:>12.2f}"
+              f"{r['extractor']['seconds'] * 1000:>12.2f}{r['speedup']:>9}"
+              f"{r['legacy']['output_chars']:>14}{r['extractor']['text_chars']:>12}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"benchmark": "extract", "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
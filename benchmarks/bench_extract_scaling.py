@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 提取进程池扩展性基准
+在固定页面集 (benchmarks/fixtures 和 bench_extract 的合成页面) 上，
+用 1/2/4/.../N 个提取进程并发提取，测量吞吐 (页/秒) 和相对单进程的加速比；
+同时测量API进程内线程池提取的吞吐作为对照 (受GIL限制，基本不随线程数增长)
+
+用法:
+    python3 benchmarks/bench_extract_scaling.py -o extract_scaling.json
+    python3 benchmarks/bench_extract_scaling.py --max-workers 8 --rounds 20
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_server import FIXTURE_DIR
+from load_test import git_revision
+from bench_extract import builtin_pages, load_pages
+from extract_worker import ExtractWorkerPool
+import extractor
+
+
+def corpus():
+    pages = load_pages([FIXTURE_DIR])
+    pages.update(builtin_pages())
+    return [(f"http://fixture/{name}", html) for name, html in sorted(pages.items())]
+
+
+def worker_counts(max_workers):
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+def run_pool(pages, workers, rounds):
+    """workers 个提取进程，每个进程同时有一个任务在途"""
+
+    async def main():
+        pool = ExtractWorkerPool(workers)
+        await pool.start()
+        try:
+            for url, html in pages:  # 预热: 每个进程首次导入lxml等
+                await pool.extract(html, url)
+            jobs = asyncio.Queue()
+            for _ in range(rounds):
+                for page in pages:
+                    jobs.put_nowait(page)
+
+            async def drain():
+                while not jobs.empty():
+                    url, html = jobs.get_nowait()
+                    await pool.extract(html, url)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(drain() for _ in range(workers)))
+            return time.perf_counter() - started, pool.stats()
+        finally:
+            await pool.close()
+
+    return asyncio.run(main())
+
+
+def run_threads(pages, threads, rounds):
+    jobs = [page for _ in range(rounds) for page in pages]
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(lambda page: extractor.extract(page[1], page[0]), pages))
+        started = time.perf_counter()
+        list(executor.map(lambda page: extractor.extract(page[1], page[0]), jobs))
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FoxRead 提取进程池扩展性基准')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1, help='最多提取进程数 (默认CPU核数)')
+    parser.add_argument('--rounds', type=int, default=10, help='页面集重复次数')
+    parser.add_argument('-o', '--output', help='结果JSON输出路径')
+    args = parser.parse_args()
+
+    pages = corpus()
+    total = len(pages) * args.rounds
+    megabytes = sum(len(html.encode('utf-8')) for _, html in pages) * args.rounds / 1024 / 1024
+    print(f"🦊 {len(pages)} pages x {args.rounds} rounds = {total} extractions, {megabytes:.1f} MB HTML")
+
+    reports = []
+    baseline = None
+    for workers in worker_counts(args.max_workers):
+        process_seconds, stats = run_pool(pages, workers, args.rounds)
+        thread_seconds = run_threads(pages, workers, args.rounds)
+        baseline = baseline or process_seconds
+        report = {
+            "workers": workers,
+            "processes_pages_per_second": round(total / process_seconds, 1),
+            "processes_mb_per_second": round(megabytes / process_seconds, 1),
+            "speedup": round(baseline / process_seconds, 2),
+            "threads_pages_per_second": round(total / thread_seconds, 1),
+            "shared_memory_transfers": stats["shared_memory"],
+        }
+        reports.append(report)
+        print(f"🦊 {workers:>3} workers  processes {report['processes_pages_per_second']:>8} pages/s "
+              f"(x{report['speedup']:<5})  threads {report['threads_pages_per_second']:>8} pages/s")
+
+    result = {
+        "benchmark": "extract_scaling",
+        "git_revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cpu_count": os.cpu_count(),
+        "pages": [url for url, _ in pages],
+        "rounds": args.rounds,
+        "results": reports,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
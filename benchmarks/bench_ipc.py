@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 进程间传输基准
+对比 JSON文本 (json.dumps -> encode -> decode -> json.loads) 与 ipc.py 二进制帧
+在 1/5/20 MB 提取结果上的吞吐、帧大小和峰值内存；可选测量提取工作进程的往返耗时
+
+用法:
+    python3 benchmarks/bench_ipc.py -o ipc_bench.json
+    python3 benchmarks/bench_ipc.py --sizes 1,20 --workers 2
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ipc
+from load_test import git_revision
+from extract_worker import ExtractWorkerPool
+
+PARAGRAPH = "狐狸在雪地里留下一串脚印，The quick brown fox jumps over the lazy dog. "
+
+
+def sample_result(megabytes):
+    """构造接近真实的提取结果: 正文和Markdown各占一半，含中英文和换行"""
+    target = megabytes * 1024 * 1024 // 2
+    lines, size = [], 0
+    while size < target:
+        line = PARAGRAPH * 8
+        lines.append(line)
+        size += len(line.encode('utf-8')) + 1
+    text = "\n".join(lines)
+    return {
+        "title": "🦊 FoxRead benchmark",
+        "url": "https://example.com/article",
+        "content": text,
+        "markdown": "# FoxRead\n\n" + text,
+        "extractor": "readability",
+        "content_type": "text/html",
+    }
+
+
+def json_roundtrip(message):
+    payload = json.dumps(message, ensure_ascii=False).encode('utf-8')
+    return json.loads(payload.decode('utf-8')), len(payload)
+
+
+def frame_roundtrip(message, compression):
+    parts = ipc.pack(message, compression)
+    frame = b"".join(parts)
+    size, flags = ipc.unpack_header(frame[:ipc.HEADER.size])
+    body = memoryview(frame)[ipc.HEADER.size:]
+    return ipc.decode(flags, ipc.decompress(flags, body)), len(frame)
+
+
+def measure(func, message, repeat):
+    func(message)  # 预热
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        decoded, size = func(message)
+        durations.append(time.perf_counter() - started)
+    assert decoded["content"] == message["content"]
+
+    tracemalloc.start()
+    func(message)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(durations)
+    payload_mb = len(message["content"].encode('utf-8')) * 2 / 1024 / 1024
+    return {
+        "best_ms": round(best * 1000, 2),
+        "throughput_mb_s": round(payload_mb / best, 1) if best else 0,
+        "wire_bytes": size,
+        "peak_alloc_mb": round(peak / 1024 / 1024, 1),
+    }
+
+
+def measure_workers(message, workers, repeat):
+    """经常驻提取进程完成一次提取的往返耗时 (含传输HTML和结果)"""
+    html = f"<html><head><title>bench</title></head><body><article><p>{message['content']}</p></article></body></html>"
+
+    async def main():
+        pool = ExtractWorkerPool(workers)
+        await pool.start()
+        try:
+            durations = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                await pool.extract(html, message["url"])
+                durations.append(time.perf_counter() - started)
+            return {"best_ms": round(min(durations) * 1000, 2), "workers": workers}
+        finally:
+            await pool.close()
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FoxRead 进程间传输基准')
+    parser.add_argument('--sizes', default='1,5,20', help='结果大小 (MB)，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=0, help='同时测量提取工作进程往返 (进程数)')
+    parser.add_argument('-o', '--output', help='结果JSON输出路径')
+    args = parser.parse_args()
+
+    codecs = {
+        "json": json_roundtrip,
+        "frame": lambda m: frame_roundtrip(m, "none"),
+        "frame+zlib": lambda m: frame_roundtrip(m, "zlib"),
+    }
+    if ipc.zstandard is not None:
+        codecs["frame+zstd"] = lambda m: frame_roundtrip(m, "zstd")
+
+    reports = []
+    for megabytes in (int(size) for size in args.sizes.split(',')):
+        message = sample_result(megabytes)
+        report = {"size_mb": megabytes, "codecs": {}}
+        for name, func in codecs.items():
+            report["codecs"][name] = measure(func, message, args.repeat)
+            stats = report["codecs"][name]
+            print(f"🦊 {megabytes:>3} MB {name:<11} {stats['best_ms']:>9} ms  {stats['throughput_mb_s']:>8} MB/s  "
+                  f"wire={stats['wire_bytes'] / 1024 / 1024:.1f} MB  peak={stats['peak_alloc_mb']} MB")
+        if args.workers:
+            report["worker_roundtrip"] = measure_workers(message, args.workers, args.repeat)
+            print(f"🦊 {megabytes:>3} MB worker      {report['worker_roundtrip']['best_ms']:>9} ms")
+        reports.append(report)
+
+    result = {
+        "benchmark": "ipc",
+        "git_revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "msgpack": ipc.msgpack is not None,
+        "zstandard": ipc.zstandard is not None,
+        "sizes": reports,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 启动耗时基准
+多次冷启动 foxread_api，测量到 /health 可用的时间、启动引导耗时以及首个请求延迟
+
+用法:
+    python3 benchmarks/bench_startup.py --runs 5 -o startup.json
+    python3 benchmarks/bench_startup.py --scenario js --env FOXREAD_POOL_PREWARM=0
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_server import start_server
+from load_test import SCENARIOS, launch_foxread, git_revision
+
+
+def one_run(port, env, first_url):
+    process, target, ready_seconds = launch_foxread(port, env)
+    try:
+        started = time.perf_counter()
+        response = requests.get(f"{target}/api", params={"url": first_url, "no_cache": "true"}, timeout=120)
+        first_request = time.perf_counter() - started
+        health = requests.get(f"{target}/health", timeout=5).json()
+        return {
+            "ready_seconds": round(ready_seconds, 3),
+            "first_request_seconds": round(first_request, 3),
+            "first_request_status": response.status_code,
+            "bootstrap_seconds": health.get("startup", {}).get("bootstrap_seconds"),
+            "environment_source": health.get("environment", {}).get("source"),
+        }
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FoxRead 启动耗时基准')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--scenario', default='static', choices=list(SCENARIOS), help='首个请求使用的页面')
+    parser.add_argument('--port', type=int, default=8912)
+    parser.add_argument('--env', action='append', default=[], help='传给foxread_api的环境变量 KEY=VALUE')
+    parser.add_argument('-o', '--output', help='结果JSON输出路径')
+    args = parser.parse_args()
+
+    fixture_server, fixture_url = start_server()
+    env = dict(item.split('=', 1) for item in args.env)
+    runs = []
+    try:
+        for i in range(args.runs):
+            run = one_run(args.port, env, f"{fixture_url}{SCENARIOS[args.scenario]}")
+            runs.append(run)
+            print(f"🦊 run {i + 1}: ready={run['ready_seconds']}s bootstrap={run['bootstrap_seconds']}s "
+                  f"({run['environment_source']}) first_request={run['first_request_seconds']}s")
+    finally:
+        fixture_server.shutdown()
+
+    result = {
+        "benchmark": "startup",
+        "git_revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scenario": args.scenario,
+        "env": env,
+        "runs": runs,
+        "mean_ready_seconds": round(sum(r["ready_seconds"] for r in runs) / len(runs), 3),
+        "mean_first_request_seconds": round(sum(r["first_request_seconds"] for r in runs) / len(runs), 3),
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 基准测试用本地网页服务器
+提供录制好的固定页面，离线模拟各种站点:
+
+    /static      完整的静态文章页 (带 ETag / Last-Modified)
+    /js          JS渲染的单页应用外壳
+    /slow        分块缓慢输出的页面 (?chunks=10&delay=0.2)
+    /huge        超大页面 (?mb=5)
+    /antibot     反爬验证页
+
+用法:
+    python3 benchmarks/fixture_server.py --port 8901
+"""
+
+import os
+import time
+import hashlib
+import argparse
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+STARTED_AT = formatdate(time.time(), usegmt=True)
+
+PARAGRAPH = "<p>狐狸在森林里寻找猎物，它需要耐心、智慧和一点点运气。每一次成功的狩猎，都源于对环境的细致观察。</p>\n"
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), 'rb') as f:
+        return f.read()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fixtures = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        route = parsed.path.rstrip('/') or '/static'
+
+        if route.startswith('/static'):
+            self.send_static(self.fixtures['static.html'])
+        elif route.startswith('/js'):
+            self.send_body(self.fixtures['js_rendered.html'])
+        elif route.startswith('/antibot'):
+            self.send_body(self.fixtures['antibot.html'])
+        elif route.startswith('/slow'):
+            self.send_slow(int(query.get('chunks', 10)), float(query.get('delay', 0.2)))
+        elif route.startswith('/huge'):
+            self.send_huge(float(query.get('mb', 5)))
+        else:
+            self.send_body(b"<html><body>not found</body></html>", status=404)
+
+    def send_body(self, body, status=200, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_static(self, body):
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_body(body, headers={'ETag': etag, 'Last-Modified': STARTED_AT})
+
+    def send_slow(self, chunks, delay):
+        """分块传输，每块之间停顿，模拟慢速首字节和流式输出"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        parts = [b"<html><head><title>Slow streaming page</title></head><body><article><h1>Slow</h1>"]
+        parts += [PARAGRAPH.encode('utf-8') * 5 for _ in range(chunks)]
+        parts.append(b"</article></body></html>")
+        for part in parts:
+            time.sleep(delay)
+            self.wfile.write(f"{len(part):x}\r\n".encode('ascii') + part + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def send_huge(self, megabytes):
+        paragraph = PARAGRAPH.encode('utf-8')
+        count = max(1, int(megabytes * 1024 * 1024 / len(paragraph)))
+        body = (b"<html><head><title>Huge page</title></head><body><article><h1>Huge</h1>"
+                + paragraph * count + b"</article></body></html>")
+        self.send_body(body)
+
+
+def start_server(host="127.0.0.1", port=0):
+    """在后台线程启动服务器，返回 (server, base_url)"""
+    FixtureHandler.fixtures = {name: load_fixture(name) for name in os.listdir(FIXTURE_DIR) if name.endswith('.html')}
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FoxRead 基准测试网页服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8901)
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.host, args.port)
+    print(f"🦊 Fixture server: {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 端到端负载测试
+启动本地固定网页服务器和 foxread_api，按场景并发请求 /api，输出延迟分位数、吞吐量、内存和浏览器进程数
+
+用法:
+    python3 benchmarks/load_test.py --requests 100 --concurrency 16 -o load.json
+    python3 benchmarks/load_test.py --scenarios static,huge --target http://127.0.0.1:8900 --pid 12345
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_server import start_server
+from scheduler import percentiles
+
+SCENARIOS = {
+    "static": "/static",
+    "js": "/js",
+    "slow": "/slow?chunks=10&delay=0.1",
+    "huge": "/huge?mb=5",
+    "antibot": "/antibot",
+}
+
+
+def process_tree(root_pid):
+    """root_pid 及其全部子孙进程 (读取 /proc)"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+            ppid = int(stat.rsplit(')', 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    tree, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+def process_info(pid):
+    """(RSS字节, 进程名)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+        rss = int(status.get('VmRSS', '0 kB').split()[0]) * 1024
+        return rss, status.get('Name', '').strip()
+    except (OSError, ValueError):
+        return 0, ''
+
+
+class ProcessSampler(threading.Thread):
+    """定期采样服务进程树的内存和浏览器进程数"""
+
+    def __init__(self, pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def sample(self):
+        rss_total = 0
+        browsers = 0
+        for pid in process_tree(self.pid):
+            rss, name = process_info(pid)
+            rss_total += rss
+            if 'chrom' in name.lower():
+                browsers += 1
+        return {"rss": rss_total, "browsers": browsers}
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.samples.append(self.sample())
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        if not self.samples:
+            return {}
+        return {
+            "peak_rss_mb": round(max(s["rss"] for s in self.samples) / 1024 / 1024, 1),
+            "mean_rss_mb": round(sum(s["rss"] for s in self.samples) / len(self.samples) / 1024 / 1024, 1),
+            "peak_browser_processes": max(s["browsers"] for s in self.samples),
+        }
+
+
+def launch_foxread(port, env_overrides):
+    """以子进程启动 foxread_api，等待 /health 可用"""
+    env = dict(os.environ)
+    # 本地固定服务器不需要礼貌限速
+    env.setdefault("FOXREAD_DOMAIN_POLICIES", json.dumps(
+        {"127.0.0.1": {"rate": 100000, "burst": 100000, "concurrency": 100000}}))
+    env.update(env_overrides)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "foxread_api:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    target = f"http://127.0.0.1:{port}"
+    started = time.monotonic()
+    while time.monotonic() - started < 60:
+        if process.poll() is not None:
+            raise RuntimeError("foxread_api exited during startup")
+        try:
+            if requests.get(f"{target}/health", timeout=1).status_code == 200:
+                return process, target, time.monotonic() - started
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("foxread_api did not become healthy within 60s")
+
+
+def one_request(session, target, url, fmt, use_cache, timeout):
+    params = {"url": url, "format": fmt}
+    if not use_cache:
+        params["no_cache"] = "true"
+    started = time.perf_counter()
+    try:
+        response = session.get(f"{target}/api", params=params, timeout=timeout)
+        elapsed = time.perf_counter() - started
+        tier = ""
+        success = False
+        if fmt == "json" and response.headers.get('content-type', '').startswith('application/json'):
+            data = response.json()
+            tier = data.get("tier", "")
+            success = bool(data.get("success"))
+        else:
+            success = response.status_code == 200
+        return {"status": response.status_code, "seconds": elapsed, "bytes": len(response.content),
+                "tier": tier, "success": success}
+    except requests.RequestException as e:
+        return {"status": "error", "seconds": time.perf_counter() - started, "bytes": 0,
+                "tier": "", "success": False, "error": type(e).__name__}
+
+
+def run_scenario(name, target, fixture_url, args, pid):
+    sampler = ProcessSampler(pid) if pid else None
+    if sampler:
+        sampler.start()
+
+    local = threading.local()
+
+    def task(i):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        path = SCENARIOS[name]
+        url = f"{fixture_url}{path}{'&' if '?' in path else '?'}n={i if args.unique else 0}"
+        return one_request(local.session, target, url, args.format, args.cache, args.timeout)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(task, range(args.requests)))
+    duration = time.perf_counter() - started
+
+    latencies = [r["seconds"] for r in results]
+    statuses, tiers = {}, {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+        if r["tier"]:
+            tiers[r["tier"]] = tiers.get(r["tier"], 0) + 1
+
+    report = {
+        "scenario": name,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "duration_seconds": round(duration, 3),
+        "throughput_rps": round(args.requests / duration, 2) if duration else 0,
+        "latency_seconds": {**percentiles(latencies), "mean": round(sum(latencies) / len(latencies), 4)},
+        "successful": sum(1 for r in results if r["success"]),
+        "status_codes": statuses,
+        "tiers": tiers,
+        "response_bytes": sum(r["bytes"] for r in results),
+    }
+    if sampler:
+        report["process"] = sampler.stop()
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FoxRead 端到端负载测试')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='逗号分隔: ' + ','.join(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=50, help='每个场景的请求数')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--format', default='json', choices=['json', 'text', 'markdown'])
+    parser.add_argument('--cache', action='store_true', help='允许命中缓存 (默认 no_cache=true)')
+    parser.add_argument('--no-unique', dest='unique', action='store_false',
+                        help='所有请求使用同一URL (测试合并/缓存)')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--target', help='已运行的FoxRead地址，不指定则自动启动')
+    parser.add_argument('--pid', type=int, help='--target 对应的进程号，用于采样内存')
+    parser.add_argument('--port', type=int, default=8911)
+    parser.add_argument('--env', action='append', default=[], help='传给foxread_api的环境变量 KEY=VALUE')
+    parser.add_argument('-o', '--output', help='结果JSON输出路径')
+    args = parser.parse_args()
+
+    fixture_server, fixture_url = start_server()
+    process = None
+    startup_seconds = None
+    try:
+        if args.target:
+            target, pid = args.target.rstrip('/'), args.pid
+        else:
+            env = dict(item.split('=', 1) for item in args.env)
+            process, target, startup_seconds = launch_foxread(args.port, env)
+            pid = process.pid
+
+        version = requests.get(f"{target}/", timeout=5).json().get("version", "")
+        reports = []
+        for name in args.scenarios.split(','):
+            report = run_scenario(name.strip(), target, fixture_url, args, pid)
+            reports.append(report)
+            lat = report["latency_seconds"]
+            print(f"🦊 {report['scenario']:<8} {report['throughput_rps']:>8} req/s  "
+                  f"p50={lat['p50']:.3f}s p95={lat['p95']:.3f}s p99={lat['p99']:.3f}s  "
+                  f"ok={report['successful']}/{report['requests']}  {report.get('process', {})}")
+
+        result = {
+            "benchmark": "load",
+            "foxread_version": version,
+            "git_revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "startup_seconds": round(startup_seconds, 3) if startup_seconds is not None else None,
+            "scenarios": reports,
+        }
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+        else:
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        fixture_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 启动引导
+服务启动时一次性检查依赖、解析并固定 Chrome 和 ChromeDriver 路径，请求路径上不再做任何查找
+
+用法:
+    python3 bootstrap.py            # 查看解析结果
+    python3 bootstrap.py --write    # 解析并写入 foxread_config.json (install.py 会自动执行)
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import threading
+import subprocess
+from importlib.util import find_spec
+
+CONFIG_PATH = os.environ.get(
+    "FOXREAD_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "foxread_config.json")
+)
+
+# 运行时必需的模块 (import名 -> pip包名)
+REQUIRED_MODULES = {
+    "fastapi": "fastapi",
+    "uvicorn": "uvicorn",
+    "selenium": "selenium",
+    "lxml": "lxml",
+    "requests": "requests",
+    "webdriver_manager": "webdriver-manager",
+}
+
+CHROME_CANDIDATES = {
+    "darwin": [
+        "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+        "/Applications/Chromium.app/Contents/MacOS/Chromium",
+    ],
+    "windows": [
+        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+    ],
+    "linux": [],
+}
+CHROME_COMMANDS = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"]
+
+
+def missing_dependencies():
+    """缺少的pip包 (只查找模块位置，不导入)"""
+    return [package for module, package in REQUIRED_MODULES.items() if find_spec(module) is None]
+
+
+def is_executable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def find_chrome_binary():
+    """Chrome/Chromium 可执行文件: FOXREAD_CHROME_BINARY > 常见安装位置 > PATH"""
+    explicit = os.environ.get("FOXREAD_CHROME_BINARY")
+    if explicit:
+        return explicit
+    for path in CHROME_CANDIDATES.get(platform.system().lower(), []):
+        if is_executable(path):
+            return path
+    for command in CHROME_COMMANDS:
+        path = shutil.which(command)
+        if path:
+            return path
+    return ""
+
+
+def find_chromedriver():
+    """ChromeDriver: FOXREAD_CHROMEDRIVER > PATH > webdriver-manager 下载/缓存 (可能联网)"""
+    explicit = os.environ.get("FOXREAD_CHROMEDRIVER")
+    if explicit:
+        return explicit
+    path = shutil.which("chromedriver")
+    if path:
+        return path
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+
+def binary_version(path):
+    try:
+        output = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10).stdout
+        return output.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def resolve_environment():
+    """完整解析一次运行环境"""
+    started = time.perf_counter()
+    missing = missing_dependencies()
+    chrome = find_chrome_binary()
+    driver, driver_error = "", None
+    if "selenium" not in missing and "webdriver-manager" not in missing:
+        try:
+            driver = find_chromedriver()
+        except Exception as e:
+            driver_error = str(e)
+    return {
+        "chrome_binary": chrome,
+        "chrome_version": binary_version(chrome) if chrome else "",
+        "chromedriver": driver,
+        "chromedriver_version": binary_version(driver) if driver else "",
+        "chromedriver_error": driver_error,
+        "missing_dependencies": missing,
+        "python": sys.executable,
+        "resolved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "resolve_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def load_config(path=CONFIG_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_config(config, path=CONFIG_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+
+
+def config_usable(config):
+    """配置文件中固定的路径是否仍然有效 (升级Chrome或移动目录后需要重新解析)"""
+    if not config or config.get("python") != sys.executable:
+        return False
+    if os.environ.get("FOXREAD_CHROMEDRIVER") or os.environ.get("FOXREAD_CHROME_BINARY"):
+        return False
+    return is_executable(config.get("chromedriver")) and (
+        not config.get("chrome_binary") or is_executable(config["chrome_binary"])
+    )
+
+
+def bootstrap(refresh=False):
+    """读取 install.py 写入的配置，无效时重新解析；返回固定后的环境"""
+    started = time.perf_counter()
+    config = None if refresh else load_config()
+    if config_usable(config):
+        config = dict(config, source="config", missing_dependencies=missing_dependencies())
+    else:
+        config = dict(resolve_environment(), source="resolved")
+    config["bootstrap_seconds"] = round(time.perf_counter() - started, 3)
+    return config
+
+
+_settings = None
+_lock = threading.Lock()
+
+
+def settings():
+    """已固定的运行环境，进程内只解析一次"""
+    global _settings
+    if _settings is None:
+        with _lock:
+            if _settings is None:
+                _settings = bootstrap()
+    return _settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FoxRead 启动引导')
+    parser.add_argument('--write', action='store_true', help=f'写入 {CONFIG_PATH}')
+    args = parser.parse_args()
+
+    config = resolve_environment()
+    print(json.dumps(config, ensure_ascii=False, indent=2))
+    if args.write:
+        save_config(config)
+        print(f"✅ 已写入 {CONFIG_PATH}")
+    if config["missing_dependencies"] or not config["chromedriver"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 浏览器池
+预先启动并常驻的无头Chrome会话，按需借出/归还，避免每个请求都重新启动浏览器
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from readiness import MUTATION_TRACKER_JS, readiness_stats, wait_until_ready
+from metrics import BROWSER_LAUNCH, span
+from bootstrap import settings
+from session_store import CAPTURE_STORAGE_JS, restore_script
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+PAGE_LOAD_TIMEOUT = 30
+
+# JavaScript反检测 (关键!) 与反检测网站的额外请求头
+STEALTH_JS = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+STEALTH_HEADERS = {
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+# 🚫 资源拦截: 正文提取用不到的资源类型 (CDP Network.setBlockedURLs)
+BLOCK_RESOURCE_TYPES = [t for t in os.environ.get("FOXREAD_BLOCK_RESOURCES", "Image,Font,Media").split(",") if t]
+
+RESOURCE_TYPE_EXTENSIONS = {
+    'Image': ['png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp'],
+    'Font': ['woff', 'woff2', 'ttf', 'otf', 'eot'],
+    'Media': ['mp4', 'webm', 'm3u8', 'mp3', 'm4a', 'ogg', 'wav', 'flv'],
+    'Stylesheet': ['css'],
+}
+
+# 广告与统计脚本
+TRACKER_DOMAINS = [
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'googleadservices.com', 'hm.baidu.com', 'cnzz.com', 'umeng.com', 'connect.facebook.net',
+    'hotjar.com', 'scorecardresearch.com', 'mmstat.com', 'tanx.com',
+]
+
+# 按站点覆盖: block_types 替换默认类型，extra_patterns 追加拦截，allow_types 从拦截中移除
+SITE_RESOURCE_OVERRIDES = {
+    'zhihu.com': {"extra_patterns": ["*zhihu-web-analytics.zhihu.com/*"]},
+    'weibo.com': {"extra_patterns": ["*beacon.sina.com.cn/*"]},
+}
+SITE_RESOURCE_OVERRIDES.update(json.loads(os.environ.get("FOXREAD_RESOURCE_OVERRIDES", "{}")))
+
+# 被拦截资源的典型大小 (字节)，用于估算节省的流量
+TYPICAL_RESOURCE_BYTES = {
+    'Image': 40 * 1024,
+    'Font': 60 * 1024,
+    'Media': 800 * 1024,
+    'Stylesheet': 30 * 1024,
+    'Script': 40 * 1024,
+    'XHR': 5 * 1024,
+    'Fetch': 5 * 1024,
+    'Ping': 512,
+}
+
+
+def site_override(url):
+    host = (urlparse(url).hostname or '').lower()
+    for domain, override in SITE_RESOURCE_OVERRIDES.items():
+        if host == domain or host.endswith('.' + domain):
+            return override
+    return {}
+
+
+def blocked_url_patterns(url):
+    """目标页面需要拦截的URL模式"""
+    override = site_override(url)
+    types = override.get("block_types", BLOCK_RESOURCE_TYPES)
+    types = [t for t in types if t not in override.get("allow_types", [])]
+
+    patterns = []
+    for resource_type in types:
+        for ext in RESOURCE_TYPE_EXTENSIONS.get(resource_type, []):
+            patterns.append(f"*.{ext}")
+            patterns.append(f"*.{ext}?*")
+    for domain in TRACKER_DOMAINS:
+        patterns.append(f"*://{domain}/*")
+        patterns.append(f"*.{domain}/*")
+    patterns.extend(override.get("extra_patterns", []))
+    return patterns
+
+
+def summarize_network_log(entries):
+    """从performance日志统计加载和被拦截的资源"""
+    types = {}
+    loaded_bytes = 0
+    loaded = 0
+    blocked = {}
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError, TypeError):
+            continue
+        method = message.get('method')
+        params = message.get('params', {})
+        if method == 'Network.requestWillBeSent':
+            types[params.get('requestId')] = params.get('type', 'Other')
+        elif method == 'Network.loadingFinished':
+            loaded += 1
+            loaded_bytes += int(params.get('encodedDataLength', 0))
+        elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+            resource_type = params.get('type') or types.get(params.get('requestId'), 'Other')
+            blocked[resource_type] = blocked.get(resource_type, 0) + 1
+
+    return {
+        "requests_loaded": loaded,
+        "bytes_loaded": loaded_bytes,
+        "requests_blocked": sum(blocked.values()),
+        "blocked_by_type": blocked,
+        # 被拦截的请求从未下载，只能按资源类型的典型大小估算
+        "bytes_saved_estimate": sum(TYPICAL_RESOURCE_BYTES.get(t, 0) * n for t, n in blocked.items()),
+    }
+
+
+class PoolExhausted(Exception):
+    """浏览器池在等待时间内没有可用会话"""
+
+
+class BrowserSession:
+    """一个常驻的浏览器会话"""
+
+    def __init__(self, driver, stealth):
+        self.driver = driver
+        self.stealth = stealth
+        self.pages_served = 0
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.last_load = {}
+        self._origins = set()
+        self._blocked_patterns = None
+
+    def is_healthy(self):
+        """健康检查: 驱动进程存活且能执行脚本"""
+        try:
+            process = self.driver.service.process
+            if process is not None and process.poll() is not None:
+                return False
+            return self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def apply_blocking(self, url):
+        """按目标站点设置资源拦截规则 (规则不变时不重复下发)"""
+        patterns = blocked_url_patterns(url)
+        if patterns != self._blocked_patterns:
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+            self._blocked_patterns = patterns
+
+    def network_log(self):
+        try:
+            return self.driver.get_log('performance')
+        except Exception:
+            return []
+
+    def load(self, url, snapshot=None, capture=False):
+        """在当前会话中打开页面，返回 (page_source, title)；资源统计记录在 last_load。
+        snapshot 为保存的域名会话 (导航前恢复)；capture 时在 last_load 中带回新的会话状态"""
+        parsed = urlparse(url)
+        if parsed.scheme in ('http', 'https'):
+            self._origins.add(f"{parsed.scheme}://{parsed.netloc}")
+
+        self.apply_blocking(url)
+        self.network_log()  # 丢弃上一次导航遗留的日志
+        restore = self.restore(snapshot)
+
+        navigation_started = time.monotonic()
+        try:
+            with span("navigate"):
+                self.driver.get(url)
+
+            # ⏱️ 等待正文选择器/网络空闲/DOM静默，而不是固定sleep
+            with span("readiness"):
+                timings, entries = wait_until_ready(self.driver, url, self.stealth, self.network_log)
+        finally:
+            if restore is not None:
+                # 恢复脚本只属于这一次导航，会话归还后不能带给下一个站点
+                self.driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument', {'identifier': restore})
+        readiness_stats.record(url, timings)
+        navigation_seconds = time.monotonic() - navigation_started
+
+        with span("page_source"):
+            page_source, title = self.driver.page_source, self.driver.title
+        self.last_load = {
+            "resources": summarize_network_log(entries + self.network_log()),
+            "readiness": timings,
+            "navigation_seconds": navigation_seconds
+        }
+        if capture:
+            self.last_load["session_state"] = self.session_state()
+        return page_source, title
+
+    def restore(self, snapshot):
+        """导航前恢复保存的cookie，localStorage由注入脚本恢复；返回注入脚本的标识"""
+        if not snapshot:
+            return None
+        if snapshot.get("cookies"):
+            self.driver.execute_cdp_cmd('Network.setCookies', {'cookies': snapshot["cookies"]})
+        if snapshot.get("storage"):
+            return self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument',
+                                               {'source': restore_script(snapshot["storage"])})['identifier']
+        return None
+
+    def session_state(self):
+        """浏览器中的全部cookie和当前源的localStorage，读取失败时返回None"""
+        try:
+            cookies = self.driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+            return {"cookies": cookies, "storage": self.driver.execute_script(f"return {CAPTURE_STORAGE_JS}")}
+        except Exception:
+            return None
+
+    def reset(self):
+        """清理会话状态: 关闭多余标签页、清空cookies和本地存储"""
+        handles = self.driver.window_handles
+        main = handles[0]
+        for handle in handles[1:]:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.driver.switch_to.window(main)
+
+        self.driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        for origin in self._origins:
+            self.driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+                'origin': origin,
+                'storageTypes': 'local_storage,session_storage,indexeddb,cache_storage,service_workers'
+            })
+        self._origins.clear()
+        self.driver.get("about:blank")
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class BrowserPool:
+    """浏览器会话池基类 - 子类决定Chrome选项集"""
+
+    stealth = False
+    name = "browser"
+
+    def __init__(self, size=2, max_pages=50, acquire_timeout=30):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.acquire_timeout = acquire_timeout
+        self._idle = []
+        self._total = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {"launched": 0, "recycled": 0, "unhealthy": 0, "borrowed": 0}
+
+    # ---- 浏览器配置 ----
+
+    def build_options(self):
+        """基础Chrome选项，子类在此之上追加"""
+        chrome_options = Options()
+        # 使用启动时固定的Chrome路径
+        if settings()["chrome_binary"]:
+            chrome_options.binary_location = settings()["chrome_binary"]
+        chrome_options.add_argument('--headless')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        # 🔑 User-Agent (必需)
+        chrome_options.add_argument(f"--user-agent={USER_AGENT}")
+        # DOMContentLoaded即返回，之后由就绪检测决定何时读取页面
+        chrome_options.page_load_strategy = 'eager'
+        # 只记录网络事件，用于统计加载/拦截的资源和判断网络空闲
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+        return chrome_options
+
+    def prepare(self, driver):
+        """浏览器启动后的一次性设置"""
+        driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': MUTATION_TRACKER_JS})
+
+    def launch_session(self):
+        """启动一个新的浏览器会话"""
+        started = time.monotonic()
+        with span("browser_launch"):
+            # 驱动路径在启动时解析一次 (bootstrap)，这里不再做任何查找
+            driver = webdriver.Chrome(service=Service(settings()["chromedriver"] or None), options=self.build_options())
+            try:
+                self.prepare(driver)
+            except Exception:
+                driver.quit()
+                raise
+        BROWSER_LAUNCH.observe(time.monotonic() - started, self.name)
+        with self._cond:
+            self._stats["launched"] += 1
+        return BrowserSession(driver, self.stealth)
+
+    # ---- 借出/归还 ----
+
+    def start(self):
+        """预热: 启动全部会话"""
+        while True:
+            with self._cond:
+                if self._closed or self._total >= self.size:
+                    return
+                self._total += 1
+            try:
+                session = self.launch_session()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append(session)
+                self._cond.notify()
+
+    def acquire(self, timeout=None):
+        """借出一个健康的会话"""
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        while True:
+            session = None
+            with self._cond:
+                while not self._idle and self._total >= self.size:
+                    if self._closed:
+                        raise PoolExhausted(f"{self.name} pool is closed")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolExhausted(f"No idle {self.name} session within timeout")
+                    self._cond.wait(remaining)
+                if self._closed:
+                    raise PoolExhausted(f"{self.name} pool is closed")
+                if self._idle:
+                    session = self._idle.pop()
+                else:
+                    self._total += 1
+
+            if session is None:
+                try:
+                    session = self.launch_session()
+                except Exception:
+                    self._discard(None)
+                    raise
+            elif not session.is_healthy():
+                with self._cond:
+                    self._stats["unhealthy"] += 1
+                self._discard(session)
+                continue
+
+            with self._cond:
+                self._stats["borrowed"] += 1
+            return session
+
+    def release(self, session, broken=False):
+        """归还会话: 超过页数上限或异常的会话直接回收"""
+        session.pages_served += 1
+        session.last_used = time.time()
+
+        if broken or self._closed or session.pages_served >= self.max_pages:
+            with self._cond:
+                self._stats["recycled"] += 1
+            self._discard(session)
+            return
+
+        try:
+            session.reset()
+        except Exception:
+            self._discard(session)
+            return
+
+        with self._cond:
+            self._idle.append(session)
+            self._cond.notify()
+
+    def _discard(self, session):
+        if session is not None:
+            session.quit()
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def session(self, timeout=None):
+        """with pool.session() as s: ..."""
+        with span("pool_acquire"):
+            session = self.acquire(timeout)
+        broken = False
+        try:
+            yield session
+        except Exception:
+            broken = not session.is_healthy()
+            raise
+        finally:
+            with span("session_release"):
+                self.release(session, broken=broken)
+
+    def fetch(self, url, timeout=None, snapshot=None, capture=False):
+        """借一个会话打开页面，返回 (page_source, title, 加载信息)"""
+        with self.session(timeout) as session:
+            page_source, title = session.load(url, snapshot, capture)
+            return page_source, title, session.last_load
+
+    def close(self):
+        """关闭池内全部浏览器"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for session in idle:
+            self._discard(session)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "total": self._total,
+                "idle": len(self._idle),
+                "in_use": self._total - len(self._idle),
+                "max_pages": self.max_pages,
+                **self._stats
+            }
+
+
+class StandardBrowserPool(BrowserPool):
+    """普通网站浏览器池"""
+
+    stealth = False
+    name = "standard"
+
+    def build_options(self):
+        chrome_options = super().build_options()
+        # 普通网站优化: 不解码图片 (--disable-images 并不是有效的Chrome参数)
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        return chrome_options
+
+
+class StealthBrowserPool(BrowserPool):
+    """反检测浏览器池 (对知乎等复杂网站必需)"""
+
+    stealth = True
+    name = "stealth"
+
+    def build_options(self):
+        chrome_options = super().build_options()
+        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        return chrome_options
+
+    def prepare(self, driver):
+        super().prepare(driver)
+        # JavaScript反检测 - 注入到之后每一次导航的新文档
+        driver.execute_script(STEALTH_JS)
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': STEALTH_JS})
+
+        # HTTP Headers设置
+        driver.execute_cdp_cmd('Network.setExtraHTTPHeaders', {'headers': STEALTH_HEADERS})
+
+
+def pool_class_for(stealth):
+    return StealthBrowserPool if stealth else StandardBrowserPool
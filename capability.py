@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 能力测试
+声明式测试集 (capability_corpus.json) 中的每个用例按获取层级 (http / browser) 并发执行，
+记录延迟、正文长度和提取质量评分，与保存的基准比较并标记退化。
+
+模式:
+    live    实时抓取
+    record  实时抓取，并把页面HTML存入归档
+    replay  从归档读取页面只做提取，不访问网络 (离线环境、CI)
+
+用法 (命令行只做离线回放；实时抓取和录制通过 GET /test?mode=live|record 运行):
+    python3 capability.py --cases fixture-static
+    python3 capability.py --cases zhihu-law --update-baseline
+    python3 capability.py --allow-missing
+
+用例未录制、没有基准、提取出错或出现退化时退出码为1 (未录制和没有基准可用 --allow-missing 放行)
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import asyncio
+import argparse
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CAPABILITY_CORPUS = os.environ.get("FOXREAD_CAPABILITY_CORPUS", os.path.join(ROOT, "capability_corpus.json"))
+CAPABILITY_ARCHIVE = os.environ.get("FOXREAD_CAPABILITY_ARCHIVE", os.path.join(ROOT, "capability_archive"))
+CAPABILITY_BASELINES = os.environ.get("FOXREAD_CAPABILITY_BASELINES", os.path.join(ROOT, "capability_baselines.json"))
+CAPABILITY_CONCURRENCY = int(os.environ.get("FOXREAD_CAPABILITY_CONCURRENCY", "4"))
+
+MODES = ("live", "record", "replay")
+TIERS = ("http", "browser")
+
+# 退化判定阈值
+QUALITY_DROP = 0.1          # 质量评分下降超过该值
+LENGTH_DROP = 0.2           # 正文长度减少超过该比例
+LATENCY_FACTOR = 1.5        # 延迟超过基准的倍数 ...
+LATENCY_SLACK_MS = 500      # ... 且至少慢这么多毫秒 (避免小数值抖动)
+
+
+def load_corpus(path=CAPABILITY_CORPUS):
+    """读取测试集，补全默认值"""
+    with open(path, encoding="utf-8") as f:
+        cases = json.load(f)["cases"]
+    for case in cases:
+        case.setdefault("description", case["url"])
+        case.setdefault("difficulty", "")
+        case.setdefault("tiers", list(TIERS))
+        case.setdefault("expect", {})
+    return cases
+
+
+class Archive:
+    """录制的页面: 每个 (用例, 层级) 一个gzip JSON文件"""
+
+    def __init__(self, directory=CAPABILITY_ARCHIVE):
+        self.directory = directory
+
+    def _path(self, case_id, tier):
+        return os.path.join(self.directory, f"{case_id}.{tier}.json.gz")
+
+    def save(self, case_id, tier, page):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(case_id, tier)
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as f:
+            json.dump({**page, "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")}, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def load(self, case_id, tier):
+        try:
+            with gzip.open(self._path(case_id, tier), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+
+def score(result, expect):
+    """提取质量评分 0~1: 长度、标题、必须包含的片段、不应出现的噪音各占一份"""
+    content = result.get("content", "") or ""
+    title = result.get("title", "") or ""
+    checks = {}
+    min_length = expect.get("min_length", 200)
+    checks["length"] = min(1.0, len(content) / min_length) if min_length else 1.0
+    if expect.get("title_contains"):
+        checks["title"] = 1.0 if expect["title_contains"] in title else 0.0
+    if expect.get("must_contain"):
+        found = sum(1 for phrase in expect["must_contain"] if phrase in content)
+        checks["must_contain"] = found / len(expect["must_contain"])
+    if expect.get("must_not_contain"):
+        leaked = sum(1 for phrase in expect["must_not_contain"] if phrase in content)
+        checks["must_not_contain"] = 1 - leaked / len(expect["must_not_contain"])
+    return round(sum(checks.values()) / len(checks), 3), {key: round(value, 3) for key, value in checks.items()}
+
+
+def load_baselines(path=CAPABILITY_BASELINES):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(baselines, path=CAPABILITY_BASELINES):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def regressions(measurement, baseline):
+    """与基准比较，返回退化说明列表 (回放模式的延迟只含提取，分开保存基准)"""
+    if not baseline:
+        return []
+    flags = []
+    if measurement["quality"] < baseline["quality"] - QUALITY_DROP:
+        flags.append(f"quality {baseline['quality']} -> {measurement['quality']}")
+    if baseline["content_length"] and measurement["content_length"] < baseline["content_length"] * (1 - LENGTH_DROP):
+        flags.append(f"content_length {baseline['content_length']} -> {measurement['content_length']}")
+    if measurement["latency_ms"] > max(baseline["latency_ms"] * LATENCY_FACTOR, baseline["latency_ms"] + LATENCY_SLACK_MS):
+        flags.append(f"latency {baseline['latency_ms']}ms -> {measurement['latency_ms']}ms")
+    return flags
+
+
+def baseline_key(tier, mode):
+    return f"{tier}:replay" if mode == "replay" else tier
+
+
+class CapabilityRunner:
+    """并发执行测试集。
+    fetch(url, tier, timeout) -> {"html", "title", ...}，页面无法获取时 html 为None；
+    extract(html, url, title) -> 与 /api 相同的结果字典"""
+
+    def __init__(self, fetch, extract, archive=None, concurrency=CAPABILITY_CONCURRENCY, succeeded=None):
+        self.fetch = fetch
+        self.extract = extract
+        self.archive = archive or Archive()
+        self.concurrency = max(1, concurrency)
+        self.succeeded = succeeded or (lambda result: bool(result.get("content")))
+
+    async def run_one(self, case, tier, mode, timeout, baselines):
+        report = {"id": case["id"], "url": case["url"], "description": case["description"],
+                  "difficulty": case["difficulty"], "tier": tier, "mode": mode}
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            if mode == "replay":
+                page = await loop.run_in_executor(None, self.archive.load, case["id"], tier)
+                if page is None:
+                    return {**report, "status": "missing", "success": False, "error": "页面未录制 (先用 mode=record 运行)"}
+                started = time.perf_counter()
+            else:
+                page = await asyncio.wait_for(self.fetch(case["url"], tier, timeout), timeout=timeout)
+            result = await self.extract(page.get("html"), case["url"], page.get("title", ""))
+        except asyncio.TimeoutError:
+            return {**report, "status": "error", "success": False, "error": "timeout",
+                    "latency_ms": round((time.perf_counter() - started) * 1000)}
+        except Exception as e:
+            return {**report, "status": "error", "success": False, "error": str(getattr(e, "detail", None) or e)}
+        latency_ms = round((time.perf_counter() - started) * 1000)
+
+        if mode == "record" and page.get("html"):
+            await loop.run_in_executor(None, self.archive.save, case["id"], tier, page)
+
+        quality, checks = score(result, case["expect"])
+        content = result.get("content", "") or ""
+        measurement = {
+            "latency_ms": latency_ms,
+            "content_length": len(content),
+            "quality": quality,
+        }
+        baseline = baselines.get(case["id"], {}).get(baseline_key(tier, mode))
+        flags = regressions(measurement, baseline)
+        return {
+            **report,
+            **measurement,
+            "status": "regressed" if flags else "ok",
+            "success": self.succeeded(result),
+            "title": result.get("title", ""),
+            "checks": checks,
+            "baseline": baseline,
+            "regressions": flags,
+            "recorded_at": page.get("recorded_at"),
+            "preview": content[:200] + "..." if content else "",
+        }
+
+    async def run(self, cases, mode="live", tiers=None, timeout=30):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        baselines = load_baselines()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(case, tier):
+            async with semaphore:
+                return await self.run_one(case, tier, mode, timeout, baselines)
+
+        jobs = [(case, tier) for case in cases for tier in case["tiers"] if not tiers or tier in tiers]
+        started = time.perf_counter()
+        results = await asyncio.gather(*(bounded(case, tier) for case, tier in jobs))
+        return results, round(time.perf_counter() - started, 3)
+
+
+def update_baselines(results, mode):
+    """把本次成功的测量写入基准 (只在显式要求时调用)"""
+    baselines = load_baselines()
+    for item in results:
+        if item["status"] in ("missing", "error"):
+            continue
+        baselines.setdefault(item["id"], {})[baseline_key(item["tier"], item["mode"])] = {
+            "latency_ms": item["latency_ms"],
+            "content_length": item["content_length"],
+            "quality": item["quality"],
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+    save_baselines(baselines)
+
+
+def summarize(results, elapsed):
+    counted = [item for item in results if item["status"] != "missing"]
+    successful = sum(1 for item in counted if item["success"])
+    by_tier = {}
+    for item in counted:
+        tier = by_tier.setdefault(item["tier"], {"tests": 0, "successful": 0, "latency_ms": [], "quality": []})
+        tier["tests"] += 1
+        tier["successful"] += item["success"]
+        if "quality" in item:
+            tier["latency_ms"].append(item["latency_ms"])
+            tier["quality"].append(item["quality"])
+    for tier in by_tier.values():
+        latencies, qualities = tier.pop("latency_ms"), tier.pop("quality")
+        tier["avg_latency_ms"] = round(sum(latencies) / len(latencies)) if latencies else None
+        tier["avg_quality"] = round(sum(qualities) / len(qualities), 3) if qualities else None
+    return {
+        "total_tests": len(counted),
+        "successful": successful,
+        "success_rate": f"{successful / len(counted) * 100:.1f}%" if counted else "n/a",
+        "missing": len(results) - len(counted),
+        "regressions": sum(1 for item in results if item["status"] == "regressed"),
+        "elapsed_seconds": elapsed,
+        "by_tier": by_tier,
+    }
+
+
+async def extract_in_thread(html, url, title):
+    """命令行回放使用的进程内提取"""
+    import web_agent
+    return await asyncio.get_running_loop().run_in_executor(None, web_agent.extract_content, html, url, title)
+
+
+async def fetch_unavailable(url, tier, timeout):
+    raise RuntimeError("命令行只支持回放，实时抓取请通过 GET /test 运行")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FoxRead 能力测试 (离线回放)')
+    parser.add_argument('--cases', help='只运行这些用例ID，逗号分隔')
+    parser.add_argument('--tiers', help='只运行这些层级，逗号分隔')
+    parser.add_argument('--update-baseline', action='store_true', help='把本次结果写入基准')
+    parser.add_argument('--allow-missing', action='store_true', help='未录制或没有基准的用例不算失败')
+    parser.add_argument('-o', '--output', help='结果JSON输出路径')
+    args = parser.parse_args()
+
+    cases = load_corpus()
+    if args.cases:
+        wanted = set(args.cases.split(','))
+        cases = [case for case in cases if case["id"] in wanted]
+    runner = CapabilityRunner(fetch_unavailable, extract_in_thread)
+    results, elapsed = asyncio.run(runner.run(cases, "replay", args.tiers.split(',') if args.tiers else None))
+    if args.update_baseline:
+        update_baselines(results, "replay")
+
+    for item in results:
+        print(f"🦊 {item['id']:<24} {item['tier']:<8} {item['status']:<10} "
+              f"{item.get('latency_ms', '-'):>6} ms  {item.get('content_length', '-'):>7} chars  "
+              f"q={item.get('quality', '-')}  {'; '.join(item.get('regressions') or [])}")
+    summary = summarize(results, elapsed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"summary": summary, "results": results}, f, ensure_ascii=False, indent=2)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    sys.exit(exit_code(results, summary, args.allow_missing, args.update_baseline))
+
+
+def exit_code(results, summary, allow_missing=False, baselined=False):
+    """退化或出错时失败；未录制或没有基准的用例回放时什么也没检查，同样算失败。
+    baselined: 本次运行已把结果写入基准"""
+    failures = summary["regressions"] + sum(1 for item in results if item["status"] == "error")
+    unchecked = [item for item in results if item["status"] == "missing" or
+                 (item["status"] == "ok" and not item.get("baseline") and not baselined)]
+    for item in unchecked:
+        reason = "未录制" if item["status"] == "missing" else "没有基准"
+        print(f"⚠️  {item['id']} ({item['tier']}) {reason}", file=sys.stderr)
+    if not results:
+        print("⚠️  没有可运行的用例", file=sys.stderr)
+        return 1
+    return 1 if failures or (unchecked and not allow_missing) else 0
+
+
+if __name__ == "__main__":
+    main()
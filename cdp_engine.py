@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead CDP 引擎
+直接通过 DevTools 协议 (websocket) 驱动 Chrome，在 uvicorn 事件循环内并发运行多个标签页，
+没有 WebDriver HTTP 中转，也不占用线程
+"""
+
+import os
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+import subprocess
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from bootstrap import settings
+from browser_pool import (USER_AGENT, STEALTH_JS, STEALTH_HEADERS, PoolExhausted,
+                          blocked_url_patterns, summarize_network_log)
+from readiness import MUTATION_TRACKER_JS, PROBE_JS, readiness_stats, async_wait_until_ready
+from metrics import BROWSER_LAUNCH, span
+from session_store import CAPTURE_STORAGE_JS, restore_script
+
+CDP_BROWSERS = int(os.environ.get("FOXREAD_CDP_BROWSERS", "1"))
+CDP_TABS_PER_BROWSER = int(os.environ.get("FOXREAD_CDP_TABS", "8"))
+CDP_MAX_PAGES = int(os.environ.get("FOXREAD_CDP_MAX_PAGES", "500"))
+CDP_LAUNCH_TIMEOUT = 20
+CDP_COMMAND_TIMEOUT = 30
+
+CHROME_ARGS = [
+    '--headless=new',
+    '--remote-debugging-port=0',
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-blink-features=AutomationControlled',
+    '--blink-settings=imagesEnabled=false',
+    f'--user-agent={USER_AGENT}',
+]
+
+
+class CDPError(Exception):
+    """CDP命令返回错误"""
+
+
+class BrowserCrashed(CDPError):
+    """浏览器进程退出或websocket断开"""
+
+
+class TabCrashed(CDPError):
+    """标签页渲染进程崩溃 (浏览器本身仍然可用)"""
+
+
+class CDPLaunchError(CDPError):
+    """无法启动Chrome (未安装、缺少websockets等)"""
+
+
+class CDPConnection:
+    """一条到浏览器的websocket连接，按 sessionId 分发各标签页的事件"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.closed = False
+        self._next_id = 0
+        self._pending = {}
+        self._listeners = {}
+        self._reader = asyncio.ensure_future(self._read_loop())
+
+    @classmethod
+    async def connect(cls, url):
+        ws = await websockets.connect(url, max_size=None, ping_interval=None, compression=None)
+        return cls(ws)
+
+    async def send(self, method, params=None, session_id=None, timeout=CDP_COMMAND_TIMEOUT):
+        if self.closed:
+            raise BrowserCrashed("CDP connection closed")
+        self._next_id += 1
+        message_id = self._next_id
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            await self.ws.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        except websockets.ConnectionClosed:
+            raise BrowserCrashed("CDP connection closed")
+        finally:
+            self._pending.pop(message_id, None)
+
+    def subscribe(self, session_id, callback):
+        self._listeners[session_id] = callback
+
+    def unsubscribe(self, session_id):
+        self._listeners.pop(session_id, None)
+
+    async def _read_loop(self):
+        try:
+            async for raw in self.ws:
+                message = json.loads(raw)
+                if "id" in message:
+                    future = self._pending.get(message["id"])
+                    if future is None or future.done():
+                        continue
+                    if "error" in message:
+                        future.set_exception(CDPError(message["error"].get("message", "CDP error")))
+                    else:
+                        future.set_result(message.get("result", {}))
+                else:
+                    listener = self._listeners.get(message.get("sessionId"))
+                    if listener is not None:
+                        listener(message)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(BrowserCrashed("CDP connection closed"))
+
+    async def close(self):
+        self.closed = True
+        try:
+            await self.ws.close()
+        except Exception:
+            pass
+        self._reader.cancel()
+
+
+class CDPPage:
+    """浏览器上下文中的一个标签页 (cookie和存储与其他标签页隔离)"""
+
+    def __init__(self, browser, context_id, target_id, session_id):
+        self.browser = browser
+        self.context_id = context_id
+        self.target_id = target_id
+        self.session_id = session_id
+        self.crashed = asyncio.Event()
+        self._events = []
+        browser.connection.subscribe(session_id, self._on_event)
+
+    def _on_event(self, message):
+        method = message.get("method", "")
+        if method.startswith("Network."):
+            # 与Selenium performance日志同样的格式，复用 NetworkTracker / summarize_network_log
+            self._events.append({"message": json.dumps({"message": {"method": method, "params": message.get("params", {})}})})
+        elif method == "Inspector.targetCrashed":
+            self.crashed.set()
+
+    def drain_events(self):
+        events, self._events = self._events, []
+        return events
+
+    async def send(self, method, params=None):
+        if self.crashed.is_set():
+            raise TabCrashed("Tab crashed")
+        return await self.browser.connection.send(method, params, session_id=self.session_id)
+
+    async def evaluate(self, expression):
+        result = await self.send('Runtime.evaluate', {'expression': expression, 'returnByValue': True})
+        if result.get('exceptionDetails'):
+            raise CDPError(result['exceptionDetails'].get('text', 'evaluate failed'))
+        return result.get('result', {}).get('value')
+
+    async def probe(self, selectors, min_text):
+        arguments = json.dumps([selectors, min_text], ensure_ascii=False)
+        return await self.evaluate(f"(function() {{{PROBE_JS}}}).apply(null, {arguments})")
+
+    async def load(self, url, stealth, snapshot=None, capture=False):
+        """打开页面并等待就绪，返回 (page_source, title, 加载信息)。
+        snapshot 为保存的域名会话 (导航前恢复cookie和localStorage)；capture 时在加载信息中带回新的会话状态"""
+        setup = [
+            self.send('Network.enable'),
+            self.send('Page.enable'),
+            self.send('Inspector.enable'),
+            self.send('Network.setBlockedURLs', {'urls': blocked_url_patterns(url)}),
+            self.send('Page.addScriptToEvaluateOnNewDocument', {'source': MUTATION_TRACKER_JS}),
+        ]
+        if stealth:
+            setup.append(self.send('Page.addScriptToEvaluateOnNewDocument', {'source': STEALTH_JS}))
+            setup.append(self.send('Network.setExtraHTTPHeaders', {'headers': STEALTH_HEADERS}))
+        if snapshot and snapshot.get("cookies"):
+            setup.append(self.send('Network.setCookies', {'cookies': snapshot["cookies"]}))
+        if snapshot and snapshot.get("storage"):
+            setup.append(self.send('Page.addScriptToEvaluateOnNewDocument', {'source': restore_script(snapshot["storage"])}))
+        await asyncio.gather(*setup)
+
+        navigation_started = time.monotonic()
+        with span("navigate"):
+            navigation = await self.send('Page.navigate', {'url': url})
+        if navigation.get('errorText'):
+            raise CDPError(navigation['errorText'])
+
+        # ⏱️ 与Selenium路径相同的就绪信号
+        with span("readiness"):
+            timings, entries = await self._until_crash(
+                async_wait_until_ready(self.probe, url, stealth, self.drain_events))
+        readiness_stats.record(url, timings)
+        navigation_seconds = time.monotonic() - navigation_started
+
+        with span("page_source"):
+            page_source, title = await asyncio.gather(
+                self.evaluate("document.documentElement.outerHTML"),
+                self.evaluate("document.title")
+            )
+        load_info = {
+            "resources": summarize_network_log(entries + self.drain_events()),
+            "readiness": timings,
+            "navigation_seconds": navigation_seconds
+        }
+        if capture:
+            load_info["session_state"] = await self.session_state()
+        return page_source, title or "", load_info
+
+    async def session_state(self):
+        """当前上下文的全部cookie和当前源的localStorage，读取失败时返回None"""
+        try:
+            cookies, storage = await asyncio.gather(
+                self.browser.connection.send('Storage.getCookies', {'browserContextId': self.context_id}),
+                self.evaluate(CAPTURE_STORAGE_JS)
+            )
+        except CDPError:
+            return None
+        return {"cookies": cookies.get('cookies', []), "storage": storage}
+
+    async def _until_crash(self, coroutine):
+        """等待coroutine，标签页崩溃时立即中止而不是等到就绪上限"""
+        work = asyncio.ensure_future(coroutine)
+        crashed = asyncio.ensure_future(self.crashed.wait())
+        try:
+            await asyncio.wait({work, crashed}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            crashed.cancel()
+        if not work.done():
+            work.cancel()
+            raise TabCrashed("Tab crashed")
+        return work.result()
+
+    async def close(self):
+        """关闭标签页: 直接销毁整个浏览器上下文，cookie和存储随之清空"""
+        self.browser.connection.unsubscribe(self.session_id)
+        try:
+            await self.browser.connection.send('Target.disposeBrowserContext', {'browserContextId': self.context_id},
+                                               timeout=5)
+        except CDPError:
+            pass
+
+
+class CDPBrowser:
+    """一个Chrome进程"""
+
+    def __init__(self):
+        self.process = None
+        self.connection = None
+        self.user_data_dir = None
+        self.pages_served = 0
+        self._stderr_task = None
+
+    async def launch(self):
+        if websockets is None:
+            raise CDPLaunchError("websockets is not installed")
+        chrome = settings()["chrome_binary"]
+        if not chrome:
+            raise CDPLaunchError("Chrome binary not found")
+
+        started = time.monotonic()
+        self.user_data_dir = tempfile.mkdtemp(prefix="foxread-cdp-")
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                chrome, *CHROME_ARGS, f'--user-data-dir={self.user_data_dir}', 'about:blank',
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+        except OSError as e:
+            self.cleanup()
+            raise CDPLaunchError(f"Chrome failed to start: {e}")
+
+        try:
+            ws_url = await asyncio.wait_for(self._devtools_url(), CDP_LAUNCH_TIMEOUT)
+            self.connection = await CDPConnection.connect(ws_url)
+        except Exception as e:
+            await self.close()
+            raise CDPLaunchError(f"Chrome DevTools unavailable: {e}")
+        # 持续读取stderr，避免管道写满阻塞Chrome
+        self._stderr_task = asyncio.ensure_future(self._drain_stderr())
+        BROWSER_LAUNCH.observe(time.monotonic() - started, "cdp")
+        return self
+
+    async def _devtools_url(self):
+        while True:
+            line = await self.process.stderr.readline()
+            if not line:
+                raise CDPLaunchError("Chrome exited before DevTools was ready")
+            text = line.decode('utf-8', 'replace').strip()
+            if text.startswith("DevTools listening on "):
+                return text[len("DevTools listening on "):]
+
+    async def _drain_stderr(self):
+        while await self.process.stderr.readline():
+            pass
+
+    def alive(self):
+        return (self.process is not None and self.process.returncode is None
+                and self.connection is not None and not self.connection.closed)
+
+    async def new_page(self):
+        """新建独立的浏览器上下文和标签页并附加会话"""
+        context = await self.connection.send('Target.createBrowserContext', {'disposeOnDetach': True})
+        context_id = context['browserContextId']
+        target = await self.connection.send('Target.createTarget',
+                                             {'url': 'about:blank', 'browserContextId': context_id})
+        attached = await self.connection.send('Target.attachToTarget',
+                                              {'targetId': target['targetId'], 'flatten': True})
+        return CDPPage(self, context_id, target['targetId'], attached['sessionId'])
+
+    async def close(self):
+        if self.connection is not None:
+            await self.connection.close()
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        if self._stderr_task is not None:
+            self._stderr_task.cancel()
+        self.cleanup()
+
+    def cleanup(self):
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            self.user_data_dir = None
+
+
+class BrowserSlot:
+    """引擎中的一个浏览器位置: 崩溃或达到页数上限时原地重启"""
+
+    def __init__(self, index):
+        self.index = index
+        self.browser = None
+        self.active = 0
+        self.lock = asyncio.Lock()
+        self.retiring = False
+
+    def usable(self):
+        return self.browser is not None and self.browser.alive()
+
+
+class CDPEngine:
+    """在少量Chrome进程中并发运行多个标签页的提取引擎"""
+
+    name = "cdp"
+
+    def __init__(self, browsers=CDP_BROWSERS, tabs_per_browser=CDP_TABS_PER_BROWSER, max_pages=CDP_MAX_PAGES,
+                 acquire_timeout=30):
+        self.browsers = max(1, browsers)
+        self.tabs_per_browser = max(1, tabs_per_browser)
+        self.max_pages = max_pages
+        self.acquire_timeout = acquire_timeout
+        self._slots = None
+        self._cond = None
+        self._closed = False
+        self._stats = {"launched": 0, "crashes": 0, "tab_crashes": 0, "retries": 0, "recycled": 0, "pages": 0}
+
+    def _ensure_state(self):
+        # asyncio对象在事件循环内创建 (兼容Python 3.8)
+        if self._slots is None:
+            self._slots = [BrowserSlot(i) for i in range(self.browsers)]
+            self._cond = asyncio.Condition()
+
+    async def start(self):
+        """预热: 启动全部浏览器"""
+        self._ensure_state()
+        for slot in self._slots:
+            await self._ensure_browser(slot)
+
+    async def _ensure_browser(self, slot):
+        async with slot.lock:
+            if slot.usable():
+                return slot.browser
+            if slot.browser is not None:
+                self._stats["crashes"] += 1
+                await slot.browser.close()
+                slot.browser = None
+            with span("browser_launch"):
+                slot.browser = await CDPBrowser().launch()
+            self._stats["launched"] += 1
+            return slot.browser
+
+    def _pick(self):
+        """选择标签页最少、未满且不在退役中的浏览器"""
+        candidates = [s for s in self._slots if not s.retiring and s.active < self.tabs_per_browser]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda s: (not s.usable(), s.active))
+
+    async def _acquire(self, timeout):
+        self._ensure_state()
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        async with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolExhausted("cdp engine is closed")
+                slot = self._pick()
+                if slot is not None:
+                    slot.active += 1
+                    return slot
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted("No free cdp tab within timeout")
+                try:
+                    await asyncio.wait_for(self._cond.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release(self, slot):
+        async with self._cond:
+            slot.active -= 1
+            if slot.retiring and slot.active == 0:
+                # 页数达到上限: 没有进行中的标签页后重启该浏览器，释放累积的内存
+                browser, slot.browser = slot.browser, None
+                slot.retiring = False
+                self._stats["recycled"] += 1
+                if browser is not None:
+                    asyncio.ensure_future(browser.close())
+            self._cond.notify_all()
+
+    async def fetch(self, url, timeout=None, stealth=False, snapshot=None, capture=False):
+        """在独立上下文的新标签页中打开页面，返回 (page_source, title, 加载信息)；
+        标签页或浏览器崩溃时只丢弃受影响的上下文，在新上下文中重试一次"""
+        try:
+            return await self._fetch_once(url, timeout, stealth, snapshot, capture)
+        except (TabCrashed, BrowserCrashed) as e:
+            # 浏览器崩溃在重新启动时计数 (_ensure_browser)
+            if isinstance(e, TabCrashed):
+                self._stats["tab_crashes"] += 1
+            self._stats["retries"] += 1
+            return await self._fetch_once(url, timeout, stealth, snapshot, capture)
+
+    async def _fetch_once(self, url, timeout, stealth, snapshot=None, capture=False):
+        with span("pool_acquire"):
+            slot = await self._acquire(timeout)
+        page = None
+        try:
+            with span("pool_acquire"):
+                browser = await self._ensure_browser(slot)
+                page = await browser.new_page()
+            result = await page.load(url, stealth, snapshot, capture)
+            browser.pages_served += 1
+            self._stats["pages"] += 1
+            if browser.pages_served >= self.max_pages:
+                slot.retiring = True
+            return result
+        finally:
+            if page is not None:
+                with span("session_release"):
+                    await asyncio.shield(page.close())
+            await self._release(slot)
+
+    async def close(self):
+        self._closed = True
+        if self._slots is None:
+            return
+        for slot in self._slots:
+            if slot.browser is not None:
+                await slot.browser.close()
+                slot.browser = None
+
+    def stats(self):
+        slots = self._slots or []
+        return {
+            "browsers": self.browsers,
+            "tabs_per_browser": self.tabs_per_browser,
+            "running": sum(1 for s in slots if s.usable()),
+            "active_tabs": sum(s.active for s in slots),
+            "max_pages": self.max_pages,
+            **self._stats
+        }
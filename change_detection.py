@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 变化检测
+频繁轮询的URL先做一次便宜的HTTP探测 (条件请求的304、ETag、Last-Modified、页面可见文本哈希)，
+能确定内容未变时不再启动浏览器渲染；内容变化时与之前提取的版本做差异比较。
+每个URL保存最近 FOXREAD_CHANGE_VERSIONS 个提取版本 (SQLite)，多个worker进程可以共用。
+
+探测只在页面HTML本身包含正文时可信 (http_fetcher.assess_completeness)；
+JS外壳页面、验证页面和探测失败一律视为 unknown，交给完整提取后再比较正文。
+"""
+
+import os
+import time
+import zlib
+import sqlite3
+import difflib
+import hashlib
+import threading
+
+import http_fetcher
+from content_cache import normalize_url
+from politeness import looks_like_challenge
+from shared_state import data_path, ensure_parent
+
+CHANGE_DB = os.environ.get("FOXREAD_CHANGE_DB", data_path("foxread_changes.db"))
+CHANGE_VERSIONS = int(os.environ.get("FOXREAD_CHANGE_VERSIONS", "5"))  # 每个URL保留的提取版本数
+CHANGE_PROBE_TIMEOUT = float(os.environ.get("FOXREAD_CHANGE_PROBE_TIMEOUT", "8"))
+DIFF_MAX_LINES = int(os.environ.get("FOXREAD_CHANGE_DIFF_MAX_LINES", "2000"))
+DIFF_CONTEXT = 1
+
+
+def fingerprint(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def probe_page(url, previous=None, timeout=CHANGE_PROBE_TIMEOUT, static_site=False):
+    """🔍 HTTP探测，返回 (结论, 依据, 探测信号)；结论为 unchanged / changed / unknown。
+    previous 为上次保存的探测信号，上次页面不完整时不发条件请求 (外壳页面的304不代表正文未变)"""
+    trusted = bool(previous and previous.get("complete"))
+    headers = http_fetcher.conditional_headers(previous.get("etag"), previous.get("last_modified")) if trusted else None
+    try:
+        page = http_fetcher.fetch(url, timeout=timeout, headers=headers)
+    except Exception:
+        return "unknown", "probe_error", {}
+    if page is None:
+        return "unknown", "not_html", {}
+    if page.status_code == 304 and trusted:
+        return "unchanged", "not_modified", dict(previous)
+    if page.status_code != 200:
+        return "unknown", f"http_{page.status_code}", {}
+
+    etag, last_modified = http_fetcher.validators(page)
+    text = http_fetcher.visible_text(page.html)
+    complete, reason = http_fetcher.assess_completeness(page.html, static_site=static_site)
+    complete = complete and not looks_like_challenge("", text)
+    signals = {
+        "etag": etag,
+        "last_modified": last_modified,
+        "content_length": len(page.html),
+        "fingerprint": fingerprint(text),
+        "complete": complete,
+    }
+    if not complete:
+        return "unknown", reason if reason != "complete" else "challenge", signals
+    if not trusted:
+        return "unknown", "first_probe", signals
+    if etag and etag == previous.get("etag"):
+        return "unchanged", "etag", signals
+    if signals["fingerprint"] == previous.get("fingerprint"):
+        return "unchanged", "fingerprint", signals
+    return "changed", "fingerprint", signals
+
+
+def content_diff(old, new, old_version, new_version, max_lines=DIFF_MAX_LINES):
+    """正文的逐行统一差异 (unified diff)，过长时截断"""
+    added = removed = 0
+    lines = []
+    truncated = False
+    for line in difflib.unified_diff(old.splitlines(), new.splitlines(), f"v{old_version}", f"v{new_version}",
+                                     n=DIFF_CONTEXT, lineterm=""):
+        if line.startswith("+") and not line.startswith("+++"):
+            added += 1
+        elif line.startswith("-") and not line.startswith("---"):
+            removed += 1
+        if len(lines) < max_lines:
+            lines.append(line)
+        else:
+            truncated = True
+    return {
+        "format": "unified",
+        "from_version": old_version,
+        "to_version": new_version,
+        "added_lines": added,
+        "removed_lines": removed,
+        "patch": "\n".join(lines),
+        "truncated": truncated,
+    }
+
+
+class ChangeStore:
+    """每个URL的最新探测信号和最近几个提取版本"""
+
+    def __init__(self, path=CHANGE_DB, keep=CHANGE_VERSIONS):
+        self.path = path
+        self.keep = max(2, keep)
+        self._lock = threading.Lock()
+        ensure_parent(path)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS watches ("
+            "key TEXT PRIMARY KEY, url TEXT, version INTEGER, etag TEXT, last_modified TEXT, content_length INTEGER, "
+            "fingerprint TEXT, complete INTEGER, checked_at REAL, changed_at REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS versions ("
+            "key TEXT, version INTEGER, content_hash TEXT, title TEXT, content BLOB, seen_at REAL, "
+            "PRIMARY KEY (key, version))"
+        )
+
+    def _transaction(self, func):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._db)
+                self._db.execute("COMMIT")
+                return result
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def get(self, url):
+        """上次检查的状态，从未检查过返回None"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM watches WHERE key = ?", (normalize_url(url),)).fetchone()
+        if row is None:
+            return None
+        watch = dict(row)
+        watch["complete"] = bool(watch["complete"])
+        return watch
+
+    def content(self, url, version):
+        """保存的某个版本的 (标题, 正文)，已被淘汰时返回None"""
+        with self._lock:
+            row = self._db.execute("SELECT title, content FROM versions WHERE key = ? AND version = ?",
+                                   (normalize_url(url), version)).fetchone()
+        if row is None:
+            return None
+        return row["title"], zlib.decompress(row["content"]).decode("utf-8")
+
+    def checked(self, url, signals):
+        """探测表明未变化: 只更新探测信号和检查时间"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE watches SET etag = ?, last_modified = ?, content_length = ?, fingerprint = ?, complete = ?, "
+                "checked_at = ? WHERE key = ?",
+                (signals.get("etag"), signals.get("last_modified"), signals.get("content_length"),
+                 signals.get("fingerprint"), int(bool(signals.get("complete"))), time.time(), normalize_url(url))
+            )
+
+    def record(self, url, title, content, signals):
+        """保存一次完整提取的结果，返回 (版本号, 是否与上一版本不同)"""
+        key = normalize_url(url)
+        content_hash = fingerprint(content)
+
+        def record(db):
+            now = time.time()
+            row = db.execute("SELECT version FROM watches WHERE key = ?", (key,)).fetchone()
+            latest = row["version"] if row is not None else 0
+            previous = db.execute("SELECT content_hash FROM versions WHERE key = ? AND version = ?",
+                                  (key, latest)).fetchone()
+            changed = previous is None or previous["content_hash"] != content_hash
+            version = latest + 1 if changed else latest
+            if changed:
+                db.execute("INSERT OR REPLACE INTO versions (key, version, content_hash, title, content, seen_at) "
+                           "VALUES (?, ?, ?, ?, ?, ?)",
+                           (key, version, content_hash, title, zlib.compress(content.encode("utf-8")), now))
+                db.execute("DELETE FROM versions WHERE key = ? AND version <= ?", (key, version - self.keep))
+            db.execute(
+                "INSERT INTO watches (key, url, version, etag, last_modified, content_length, fingerprint, complete, "
+                "checked_at, changed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET version = excluded.version, etag = excluded.etag, "
+                "last_modified = excluded.last_modified, content_length = excluded.content_length, "
+                "fingerprint = excluded.fingerprint, complete = excluded.complete, checked_at = excluded.checked_at, "
+                "changed_at = CASE WHEN ? THEN excluded.changed_at ELSE watches.changed_at END",
+                (key, url, version, signals.get("etag"), signals.get("last_modified"), signals.get("content_length"),
+                 signals.get("fingerprint"), int(bool(signals.get("complete"))), now, now, changed)
+            )
+            return version, changed
+        return self._transaction(record)
+
+    def stats(self):
+        with self._lock:
+            watched = self._db.execute("SELECT COUNT(*) FROM watches").fetchone()[0]
+            versions = self._db.execute("SELECT COUNT(*) FROM versions").fetchone()[0]
+        return {"path": self.path, "watched_urls": watched, "stored_versions": versions, "keep_versions": self.keep}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 响应压缩与校验器
+按 Accept-Encoding 协商 zstd / br / gzip (brotli、zstandard 未安装时只用gzip)，
+按提取内容计算强ETag，处理 If-None-Match
+"""
+
+import os
+import zlib
+import hashlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_ENABLED = os.environ.get("FOXREAD_COMPRESSION", "1") == "1"
+COMPRESS_MIN_BYTES = int(os.environ.get("FOXREAD_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("FOXREAD_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("FOXREAD_BROTLI_QUALITY", "5"))
+ZSTD_LEVEL = int(os.environ.get("FOXREAD_ZSTD_LEVEL", "3"))
+
+# 客户端同样接受时按此顺序优先 (压缩率和速度都更好的在前)
+PREFERENCE = [name for name, available in (("zstd", zstandard is not None), ("br", brotli is not None), ("gzip", True))
+              if available]
+
+
+def parse_accept_encoding(header):
+    """Accept-Encoding -> {编码: q值}"""
+    accepted = {}
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def negotiate(header):
+    """选出响应使用的编码，不压缩时返回None"""
+    if not COMPRESSION_ENABLED or not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates = [(accepted.get(name, wildcard), -rank, name) for rank, name in enumerate(PREFERENCE)]
+    q, _, name = max(candidates)
+    return name if q > 0 else None
+
+
+def compress(body, encoding):
+    if encoding == "gzip":
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        return compressor.compress(body) + compressor.flush()
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+class StreamCompressor:
+    """分块传输时逐块压缩，每块结束都刷新，客户端可以立即解出已收到的内容"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        else:
+            raise ValueError(f"unsupported encoding: {encoding}")
+
+    def compress(self, chunk):
+        if self.encoding == "gzip":
+            return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def content_etag(*parts):
+    """由提取内容计算强ETag (内容相同则ETag相同，与缓存状态、耗时等元数据无关)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def encoded_etag(etag, encoding):
+    """不同压缩编码是不同的表示，强ETag加编码后缀区分"""
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match 使用弱比较: 忽略 W/ 前缀和编码后缀"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    base = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate == base or candidate.split("-", 1)[0] == base:
+            return True
+    return False
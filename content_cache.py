@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 内容缓存
+按规范化URL缓存提取结果: 内存LRU + 可选共享层 (SQLite文件或Redis，多个worker共用)，按域名设置TTL
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+from shared_state import sqlite_path
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+DEFAULT_TTL = 600
+
+# 按域名的缓存时间(秒)，匹配域名后缀
+DOMAIN_TTLS = {
+    'zhihu.com': 3600,
+    'jianshu.com': 3600,
+    'csdn.net': 3600,
+    'weibo.com': 300,
+    'twitter.com': 300,
+    'x.com': 300,
+}
+
+# 过期后仍可先返回旧内容、后台重新验证的时间窗口 (TTL的倍数)
+STALE_FACTOR = 2
+# 共享层条目数 (SQLite COUNT(*) / Redis SCAN) 的复用时间(秒)
+DISK_COUNT_TTL = 30
+
+TRACKING_PARAMS = ('utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'spm')
+
+
+def normalize_url(url):
+    """规范化URL作为缓存键: 小写scheme/host、去掉默认端口、片段和跟踪参数、排序查询参数"""
+    parsed = urlparse(url.strip())
+    scheme = (parsed.scheme or 'https').lower()
+    host = (parsed.hostname or '').lower()
+    port = parsed.port
+    netloc = host if port is None or (scheme, port) in (('http', 80), ('https', 443)) else f"{host}:{port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS
+    )
+    return urlunparse((scheme, netloc, parsed.path or '/', '', urlencode(query), ''))
+
+
+def ttl_for(url):
+    host = (urlparse(url).hostname or '').lower()
+    for domain, ttl in DOMAIN_TTLS.items():
+        if host == domain or host.endswith('.' + domain):
+            return ttl
+    return DEFAULT_TTL
+
+
+class CacheEntry:
+    """一条缓存的提取结果"""
+
+    def __init__(self, result, stored_at, ttl, etag=None, last_modified=None):
+        self.result = result
+        self.stored_at = stored_at
+        self.ttl = ttl
+        self.etag = etag
+        self.last_modified = last_modified
+        self.variants = {}  # 预先压缩好的响应正文 (只在内存层)
+
+    @property
+    def age(self):
+        return time.time() - self.stored_at
+
+    @property
+    def fresh(self):
+        return self.age <= self.ttl
+
+    @property
+    def revalidatable(self):
+        """HTTP快速通道提供的内容且带有校验器，可以做条件请求"""
+        return self.result.get('tier') == 'http' and bool(self.etag or self.last_modified)
+
+    @property
+    def size(self):
+        return (len(self.result.get('content', '')) + len(self.result.get('title', ''))
+                + len(self.result.get('markdown') or '') + 256
+                + sum(len(body) for _, body in self.variants.values()))
+
+    def to_row(self):
+        payload = zlib.compress(json.dumps(self.result, ensure_ascii=False).encode('utf-8'))
+        return self.stored_at, self.ttl, self.etag, self.last_modified, payload
+
+    @classmethod
+    def from_row(cls, row):
+        stored_at, ttl, etag, last_modified, payload = row
+        result = json.loads(zlib.decompress(payload).decode('utf-8'))
+        return cls(result, stored_at, ttl, etag, last_modified)
+
+
+class SQLiteTier:
+    """磁盘缓存层"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")  # 多个worker进程共用同一个文件
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, stored_at REAL, ttl REAL, etag TEXT, last_modified TEXT, payload BLOB)"
+        )
+        self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT stored_at, ttl, etag, last_modified, payload FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        return CacheEntry.from_row(row) if row else None
+
+    def put(self, key, entry):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, stored_at, ttl, etag, last_modified, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (key, *entry.to_row())
+            )
+            self._db.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._db.commit()
+
+    def purge_expired(self):
+        """删除超过陈旧窗口的条目"""
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE stored_at + ttl * ? < ?", (STALE_FACTOR, time.time()))
+            self._db.commit()
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class RedisTier:
+    """跨机器共享的缓存层 (Redis兼容存储)，过期由Redis按陈旧窗口自动删除"""
+
+    def __init__(self, url, prefix="foxread:cache:"):
+        if redis is None:
+            raise RuntimeError("Redis缓存层需要安装 redis: pip install redis")
+        self.path = url
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        row = self._redis.hmget(self.prefix + key, "stored_at", "ttl", "etag", "last_modified", "payload")
+        if row[0] is None:
+            return None
+        stored_at, ttl, etag, last_modified, payload = row
+        return CacheEntry.from_row((float(stored_at), float(ttl), etag and etag.decode(),
+                                    last_modified and last_modified.decode(), payload))
+
+    def put(self, key, entry):
+        stored_at, ttl, etag, last_modified, payload = entry.to_row()
+        fields = {"stored_at": stored_at, "ttl": ttl, "payload": payload}
+        fields.update({name: value for name, value in (("etag", etag), ("last_modified", last_modified)) if value})
+        pipe = self._redis.pipeline()
+        pipe.delete(self.prefix + key)
+        pipe.hset(self.prefix + key, mapping=fields)
+        pipe.expire(self.prefix + key, int(ttl * STALE_FACTOR) + 1)
+        pipe.execute()
+
+    def delete(self, key):
+        self._redis.delete(self.prefix + key)
+
+    def purge_expired(self):
+        pass
+
+    def count(self):
+        return sum(1 for _ in self._redis.scan_iter(match=self.prefix + "*", count=1000))
+
+    def close(self):
+        self._redis.close()
+
+
+def open_tier(path):
+    """共享缓存层: redis:// 使用Redis，其余为SQLite文件路径"""
+    if not path:
+        return None
+    if path.startswith(("redis://", "rediss://", "unix://")):
+        return RedisTier(path)
+    return SQLiteTier(sqlite_path(path))
+
+
+class ContentCache:
+    """内存LRU + 可选共享层的内容缓存"""
+
+    def __init__(self, max_entries=1000, max_bytes=256 * 1024 * 1024, disk_path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.disk = open_tier(disk_path)
+        self._disk_count = None
+        self._disk_counted = None
+        self._stats = {"hits": 0, "stale_hits": 0, "disk_hits": 0, "misses": 0,
+                       "stores": 0, "evictions": 0, "revalidated": 0, "refreshed": 0,
+                       "precompressed_hits": 0, "precompressed_stores": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, url, max_age=None):
+        """查找缓存，返回 (entry, state)；state 为 hit / stale / miss"""
+        key = normalize_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self._count("disk_hits")
+                self._remember(key, entry)
+
+        if entry is None or entry.age > entry.ttl * STALE_FACTOR:
+            self._count("misses")
+            return None, "miss"
+
+        if max_age is not None and entry.age > max_age:
+            self._count("misses")
+            return None, "miss"
+
+        if entry.fresh:
+            self._count("hits")
+            return entry, "hit"
+
+        if entry.revalidatable:
+            self._count("stale_hits")
+            return entry, "stale"
+
+        self._count("misses")
+        return None, "miss"
+
+    def get_shared(self, url):
+        """只查共享层 (其他worker写入的结果)，不计入命中统计；新鲜的条目放入内存层"""
+        if self.disk is None:
+            return None
+        key = normalize_url(url)
+        entry = self.disk.get(key)
+        if entry is None or not entry.fresh:
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def put(self, url, result, etag=None, last_modified=None):
+        key = normalize_url(url)
+        entry = CacheEntry(result, time.time(), ttl_for(url), etag, last_modified)
+        self._remember(key, entry)
+        if self.disk is not None:
+            self.disk.put(key, entry)
+        self._count("stores")
+        return entry
+
+    def refresh(self, url, result, etag=None, last_modified=None):
+        """后台重新验证得到了新内容"""
+        self._count("refreshed")
+        return self.put(url, result, etag, last_modified)
+
+    def touch(self, url):
+        """条件请求返回304: 内容未变，重置缓存时间；内存层已淘汰时从共享层取回"""
+        key = normalize_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.stored_at = time.time()
+            self._stats["revalidated"] += 1
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is None:
+                return
+            entry.stored_at = time.time()
+            self._remember(key, entry)
+        if entry is not None and self.disk is not None:
+            self.disk.put(key, entry)
+
+    def variant(self, url, result, name):
+        """取出与该结果对应的预压缩响应 (原始大小, 压缩正文)"""
+        with self._lock:
+            entry = self._entries.get(normalize_url(url))
+            if entry is None or entry.result is not result or name not in entry.variants:
+                return None
+            self._stats["precompressed_hits"] += 1
+            return entry.variants[name]
+
+    def store_variant(self, url, result, name, variant):
+        """把压缩好的响应 (原始大小, 压缩正文) 存到缓存条目旁，之后的命中不再重复压缩；条目已被替换时丢弃"""
+        with self._lock:
+            entry = self._entries.get(normalize_url(url))
+            if entry is None or entry.result is not result or name in entry.variants:
+                return
+            entry.variants[name] = variant
+            self._bytes += len(variant[1])
+            self._stats["precompressed_stores"] += 1
+            self._evict()
+
+    def invalidate(self, url):
+        key = normalize_url(url)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._stats["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["max_bytes"] = self.max_bytes
+        if self.disk is not None:
+            stats["disk_entries"] = self._disk_count
+            stats["disk_path"] = self.disk.path
+        return stats
+
+    def count_disk(self):
+        """统计共享层条目数 (较慢，在线程池中调用)；DISK_COUNT_TTL 秒内不重复统计，stats() 只读上次的结果"""
+        now = time.monotonic()
+        if self.disk is None or (self._disk_counted is not None and now - self._disk_counted < DISK_COUNT_TTL):
+            return
+        self._disk_counted = now
+        self._disk_count = self.disk.count()
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 正文提取工作进程
+常驻进程通过Unix socket接收HTML并返回提取结果 (ipc.py 二进制帧)，CPU密集的lxml解析不占用API进程。
+较大的HTML经共享内存传递；每个任务有尽力而为的CPU时间上限，可靠的兜底是API进程的墙钟超时: 超时即杀掉并重启工作进程
+
+用法 (由 foxread_api 按 FOXREAD_EXTRACT_WORKERS 自动启动):
+    python3 extract_worker.py --socket /tmp/foxread-extract-0.sock
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+import argparse
+import tempfile
+from contextlib import contextmanager
+from multiprocessing import shared_memory, resource_tracker
+
+import extractor
+from ipc import read_message, write_message
+
+WORKER_SCRIPT = os.path.abspath(__file__)
+WORKER_START_TIMEOUT = 15
+EXTRACT_CPU_TIMEOUT = float(os.environ.get("FOXREAD_EXTRACT_CPU_TIMEOUT", "10"))  # 单个任务的CPU时间上限(秒)，尽力而为，C代码中途不会被打断
+SHM_MIN_BYTES = 256 * 1024  # 超过该大小的HTML经共享内存传递
+
+
+class WorkerFailed(Exception):
+    """工作进程退出、超时或返回错误"""
+
+
+class ExtractionLimit(Exception):
+    """文档超过CPU时间上限 (换到其他进程提取也一样，不应重试)"""
+
+
+def default_pool_size(http_workers=1):
+    """按CPU核数确定提取进程数，多个uvicorn worker平分"""
+    return max(1, (os.cpu_count() or 1) // max(1, http_workers))
+
+
+# ---- 工作进程 ----
+
+class CPUTimeExceeded(Exception):
+    pass
+
+
+def _cpu_time_exceeded(signum, frame):
+    raise CPUTimeExceeded()
+
+
+class CPUBudget:
+    """一个任务的CPU时间预算 (尽力而为)。ITIMER_PROF 只统计本进程的CPU时间，用完时在解释器中抛出 CPUTimeExceeded。
+    Python信号处理函数只在字节码之间运行，卡在lxml的C代码里时要等它返回才会生效，因此这不是硬上限；
+    硬保证是 ExtractWorkerPool 的墙钟超时 (FOXREAD_EXTRACT_TIMEOUT)，超时后工作进程被杀掉重启。
+    计时只在 running() 内进行: 流式提取在分块之间等待写入 (事件循环) 时暂停，异常不会落到事件循环里"""
+
+    def __init__(self, seconds):
+        self.remaining = seconds
+
+    @contextmanager
+    def running(self):
+        if not self.remaining:
+            yield
+            return
+        previous = signal.signal(signal.SIGPROF, _cpu_time_exceeded)
+        signal.setitimer(signal.ITIMER_PROF, self.remaining)
+        try:
+            yield
+        finally:
+            # 返回值为剩余时间；刚好用完时为0，下次进入立即超时
+            self.remaining = signal.setitimer(signal.ITIMER_PROF, 0)[0] or 1e-6
+            signal.signal(signal.SIGPROF, previous)
+
+
+def request_html(request):
+    """取出请求中的HTML: 直接携带，或在API进程创建的共享内存中"""
+    if "shm" not in request:
+        return request["html"]
+    segment = shared_memory.SharedMemory(name=request["shm"])
+    # 共享内存由API进程负责释放，工作进程的resource_tracker不要接管
+    resource_tracker.unregister(segment._name, "shared_memory")
+    try:
+        return str(segment.buf[:request["size"]], "utf-8", "replace")
+    finally:
+        segment.close()
+
+
+async def handle_connection(reader, writer):
+    while True:
+        request = await read_message(reader)
+        if request is None:
+            break
+        if request.get("stream"):
+            await stream_extraction(request, writer)
+            continue
+        try:
+            with CPUBudget(request.get("cpu_timeout")).running():
+                article = extractor.extract(request_html(request), request["url"])
+            response = {"id": request["id"], "article": vars(article)}
+        except CPUTimeExceeded:
+            response = {"id": request["id"], "error": "cpu time limit exceeded", "limit": True}
+        except Exception as e:
+            response = {"id": request["id"], "error": f"{type(e).__name__}: {e}"}
+        # 释放请求中的HTML后再编码响应，降低峰值内存
+        del request
+        await write_message(writer, response)
+    writer.close()
+
+
+async def stream_extraction(request, writer):
+    """流式提取: 依次发送 article (不含正文)、若干 chunk 帧和 done 帧；drain 使写入速度跟随API进程的读取"""
+    request_id = request["id"]
+    try:
+        budget = CPUBudget(request.get("cpu_timeout"))
+        with budget.running():
+            chunks = extractor.extract_stream(request_html(request), request["url"], request.get("chunk_chars", 65536))
+            del request
+            message = {"id": request_id, "article": vars(next(chunks))}
+        while message is not None:
+            await write_message(writer, message)
+            with budget.running():
+                chunk = next(chunks, None)
+            message = {"id": request_id, "chunk": list(chunk)} if chunk is not None else None
+        await write_message(writer, {"id": request_id, "done": True})
+    except CPUTimeExceeded:
+        await write_message(writer, {"id": request_id, "error": "cpu time limit exceeded", "limit": True})
+    except Exception as e:
+        await write_message(writer, {"id": request_id, "error": f"{type(e).__name__}: {e}"})
+
+
+async def serve(socket_path):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(handle_connection, path=socket_path, limit=2 ** 20)
+    async with server:
+        await server.serve_forever()
+
+
+# ---- API进程侧 ----
+
+class ExtractWorker:
+    """一个常驻工作进程及其连接 (同一时间只处理一个请求)"""
+
+    def __init__(self, index, socket_dir):
+        self.index = index
+        self.socket_path = os.path.join(socket_dir, f"extract-{index}.sock")
+        self.process = None
+        self.reader = None
+        self.writer = None
+        self.served = 0
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_SCRIPT, "--socket", self.socket_path,
+            cwd=os.path.dirname(WORKER_SCRIPT)
+        )
+        deadline = time.monotonic() + WORKER_START_TIMEOUT
+        while True:
+            try:
+                self.reader, self.writer = await asyncio.open_unix_connection(self.socket_path, limit=2 ** 20)
+                return self
+            except OSError:
+                if self.process.returncode is not None or time.monotonic() > deadline:
+                    await self.stop()
+                    raise WorkerFailed(f"extract worker {self.index} failed to start")
+                await asyncio.sleep(0.05)
+
+    async def call(self, request):
+        if self.writer is None:
+            raise WorkerFailed(f"extract worker {self.index} is not running")
+        await write_message(self.writer, request)
+        response = await read_message(self.reader)
+        if response is None:
+            raise WorkerFailed(f"extract worker {self.index} exited")
+        return response
+
+    async def stop(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+            await self.process.wait()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def html_request(request_id, url, html):
+    """组装提取请求；较大的HTML编码后放入共享内存，返回 (请求, 共享内存或None)"""
+    data = html.encode("utf-8")
+    if len(data) < SHM_MIN_BYTES:
+        return {"id": request_id, "url": url, "html": html}, None
+    segment = shared_memory.SharedMemory(create=True, size=len(data))
+    segment.buf[:len(data)] = data
+    return {"id": request_id, "url": url, "shm": segment.name, "size": len(data)}, segment
+
+
+def release_segment(segment):
+    if segment is not None:
+        segment.close()
+        segment.unlink()
+
+
+class ExtractWorkerPool:
+    """常驻提取进程池: 空闲进程排队借用，出错或超时的进程直接重启"""
+
+    def __init__(self, size, timeout=30, cpu_timeout=EXTRACT_CPU_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self.cpu_timeout = cpu_timeout
+        self.socket_dir = tempfile.mkdtemp(prefix="foxread-extract-")
+        self._idle = None
+        self._next_id = 0
+        self._replacing = set()
+        self._stats = {"requests": 0, "errors": 0, "restarts": 0, "cpu_limited": 0, "shared_memory": 0}
+
+    async def start(self):
+        """启动工作进程；部分进程启动失败时用已启动的进程继续，全部失败时抛出 WorkerFailed，下次调用重试"""
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        workers = await asyncio.gather(*(ExtractWorker(i, self.socket_dir).start() for i in range(self.size)),
+                                       return_exceptions=True)
+        started = [worker for worker in workers if isinstance(worker, ExtractWorker)]
+        for worker in started:
+            self._idle.put_nowait(worker)
+        failed = [error for error in workers if not isinstance(error, ExtractWorker)]
+        if failed and not started:
+            self._idle = None
+            raise WorkerFailed(f"no extract worker started ({failed[0]})")
+        if failed:
+            print(f"⚠️  {len(failed)}/{self.size} 个提取工作进程启动失败: {failed[0]}", file=sys.stderr)
+
+    async def _borrow(self, timeout):
+        """借一个空闲工作进程；等待超时 (进程都在重启或卡住) 时抛出 WorkerFailed，调用方改为进程内提取"""
+        await self.start()
+        try:
+            return await asyncio.wait_for(self._idle.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise WorkerFailed("no idle extract worker")
+
+    async def extract(self, html, url, timeout=None):
+        """在工作进程中提取正文，返回 extractor.Article"""
+        worker = await self._borrow(self.timeout if timeout is None else timeout)
+        self._next_id += 1
+        self._stats["requests"] += 1
+        healthy = False
+        request, segment = html_request(self._next_id, url, html)
+        request["cpu_timeout"] = self.cpu_timeout
+        self._stats["shared_memory"] += segment is not None
+        try:
+            response = await asyncio.wait_for(worker.call(request), timeout=self.timeout if timeout is None else timeout)
+            healthy = True
+        except asyncio.TimeoutError:
+            raise WorkerFailed(f"extraction timed out in worker {worker.index}")
+        finally:
+            self._give_back(worker, healthy)
+            release_segment(segment)
+
+        self._check(response)
+        return extractor.Article(**response["article"])
+
+    def _check(self, response):
+        if "error" not in response:
+            return
+        if response.get("limit"):
+            self._stats["cpu_limited"] += 1
+            raise ExtractionLimit(response["error"])
+        self._stats["errors"] += 1
+        raise WorkerFailed(response["error"])
+
+    async def extract_stream(self, html, url, chunk_chars=65536, timeout=None):
+        """在工作进程中流式提取: 先产出不含正文的 extractor.Article，再产出 (纯文本, Markdown) 分块。
+        中途放弃迭代时该进程的连接里还有未读的帧，直接重启"""
+        timeout = self.timeout if timeout is None else timeout
+        worker = await self._borrow(timeout)
+        self._next_id += 1
+        self._stats["requests"] += 1
+        finished = False
+        request, segment = html_request(self._next_id, url, html)
+        request.update(stream=True, chunk_chars=chunk_chars, cpu_timeout=self.cpu_timeout)
+        self._stats["shared_memory"] += segment is not None
+        del html
+        try:
+            if worker.writer is None:
+                raise WorkerFailed(f"extract worker {worker.index} is not running")
+            await write_message(worker.writer, request)
+            del request
+            while True:
+                response = await asyncio.wait_for(read_message(worker.reader), timeout=timeout)
+                if response is None:
+                    raise WorkerFailed(f"extract worker {worker.index} exited")
+                if segment is not None:
+                    # 工作进程已读出HTML
+                    release_segment(segment)
+                    segment = None
+                if "error" in response:
+                    finished = True
+                    self._check(response)
+                if response.get("done"):
+                    finished = True
+                    return
+                if "article" in response:
+                    yield extractor.Article(**response["article"])
+                else:
+                    yield tuple(response["chunk"])
+        except asyncio.TimeoutError:
+            raise WorkerFailed(f"extraction timed out in worker {worker.index}")
+        finally:
+            self._give_back(worker, finished)
+            release_segment(segment)
+
+    def _give_back(self, worker, healthy):
+        """归还工作进程；连接状态不可信时在独立任务中重启 (调用方可能正被取消，这里不能await)"""
+        worker.served += 1
+        if healthy:
+            self._idle.put_nowait(worker)
+            return
+        self._stats["errors"] += 1
+        task = asyncio.ensure_future(self._replace(worker))
+        self._replacing.add(task)
+        task.add_done_callback(self._replacing.discard)
+
+    async def _replace(self, worker):
+        self._idle.put_nowait(await self._restart(worker))
+
+    async def _restart(self, worker):
+        """连接状态已不可信，杀掉进程重新启动"""
+        self._stats["restarts"] += 1
+        await worker.stop()
+        replacement = ExtractWorker(worker.index, self.socket_dir)
+        try:
+            return await replacement.start()
+        except WorkerFailed:
+            return replacement
+
+    async def close(self):
+        if self._idle is None:
+            return
+        if self._replacing:
+            await asyncio.gather(*self._replacing, return_exceptions=True)
+        while not self._idle.empty():
+            await self._idle.get_nowait().stop()
+        try:
+            os.rmdir(self.socket_dir)
+        except OSError:
+            pass
+
+    def stats(self):
+        return {
+            "workers": self.size,
+            "cpu_timeout": self.cpu_timeout,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            **self._stats
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FoxRead 正文提取工作进程')
+    parser.add_argument('--socket', required=True, help='Unix socket路径')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
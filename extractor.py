@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 正文提取引擎
+lxml解析 + 文本密度/链接密度打分去除导航、页脚、评论等噪声，输出纯文本和结构化Markdown
+"""
+
+import re
+from urllib.parse import urljoin, urlparse
+
+import lxml.html
+from lxml import etree
+
+# 与正文无关、直接删除的标签
+REMOVE_TAGS = [
+    'script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object', 'embed',
+    'form', 'button', 'input', 'select', 'textarea', 'nav', 'aside', 'footer', 'dialog',
+]
+
+# class/id 命中即视为噪声 (除非同时命中正向特征)
+NEGATIVE_PATTERN = re.compile(
+    r'(?:^|[\s_-])(?:comments?|comment-\w+|footer|sidebar|side|nav|navbar|menu|share|social|related|'
+    r'recommend\w*|advert\w*|ads?|banner|popup|modal|login|signup|breadcrumbs?|pagination|pager|'
+    r'toolbar|copyright|disclaimer|widget|hot-?list|tags?)(?:$|[\s_-])', re.I
+)
+POSITIVE_PATTERN = re.compile(
+    r'(?:^|[\s_-])(?:article|content|post|entry|main|body|text|rich\w*|story|blog|detail)(?:$|[\s_-])', re.I
+)
+
+# 站点专用正文节点 (XPath)，对应 web_agent.is_complex_site 中的网站
+SITE_EXTRACTORS = {
+    'zhihu.com': [
+        '//div[contains(concat(" ", normalize-space(@class), " "), " Post-RichText ")]',
+        '//div[contains(concat(" ", normalize-space(@class), " "), " RichContent-inner ")]',
+    ],
+    'csdn.net': ['//div[@id="content_views"]', '//article'],
+    'jianshu.com': ['//article'],
+    'weibo.com': ['//div[contains(@class, "detail_wbtext")]', '//div[contains(@class, "WB_text")]'],
+}
+
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+BLOCK_TAGS = {
+    'p', 'div', 'section', 'article', 'main', 'header', 'figure', 'figcaption', 'table', 'thead',
+    'tbody', 'tfoot', 'tr', 'dl', 'dt', 'dd', 'address', 'details', 'summary', 'hr', 'body', 'html',
+}
+PARAGRAPH_TAGS = ('p', 'pre', 'td', 'blockquote', 'li')
+MIN_PARAGRAPH_CHARS = 25
+_SPACES = re.compile(r'[ \t\r\n\f\v]+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+class Article:
+    """提取结果"""
+
+    def __init__(self, title, text, markdown, method):
+        self.title = title
+        self.text = text
+        self.markdown = markdown
+        self.method = method
+
+
+def parse_html(html):
+    """解析HTML，失败时返回None"""
+    parser = lxml.html.HTMLParser(remove_comments=True, remove_pis=True)
+    try:
+        return lxml.html.document_fromstring(html, parser=parser)
+    except ValueError:
+        # 带 <?xml encoding=...?> 声明的字符串需要以字节解析
+        return lxml.html.document_fromstring(html.encode('utf-8'), parser=lxml.html.HTMLParser(
+            encoding='utf-8', remove_comments=True, remove_pis=True))
+    except etree.ParserError:
+        return None
+
+
+def normalize_text(text):
+    return _SPACES.sub(' ', text or '').strip()
+
+
+def find_title(doc):
+    for xpath in ('//meta[@property="og:title"]/@content', '//title/text()', '//h1'):
+        found = doc.xpath(xpath)
+        if found:
+            value = found[0] if isinstance(found[0], str) else found[0].text_content()
+            value = normalize_text(value)
+            if value:
+                return value
+    return ""
+
+
+def class_weight(el):
+    """class/id 的正负特征权重"""
+    names = f"{el.get('class', '')} {el.get('id', '')}"
+    if not names.strip():
+        return 0
+    weight = 0
+    if NEGATIVE_PATTERN.search(names):
+        weight -= 25
+    if POSITIVE_PATTERN.search(names):
+        weight += 25
+    return weight
+
+
+def remove_boilerplate(doc):
+    """删除噪声标签和命中负向特征的节点"""
+    etree.strip_elements(doc, *REMOVE_TAGS, with_tail=False)
+    for el in list(doc.iter('header')):
+        if not el.xpath('ancestor::article | ancestor::main'):
+            el.drop_tree()
+    for el in list(doc.iter()):
+        if not isinstance(el.tag, str) or el.tag in ('html', 'body', 'article', 'main'):
+            continue
+        names = f"{el.get('class', '')} {el.get('id', '')}"
+        if names.strip() and NEGATIVE_PATTERN.search(names) and not POSITIVE_PATTERN.search(names):
+            if el.getparent() is not None:
+                el.drop_tree()
+
+
+def link_density(el, text_length=None):
+    text_length = len(normalize_text(el.text_content())) if text_length is None else text_length
+    if not text_length:
+        return 1.0
+    link_length = sum(len(normalize_text(a.text_content())) for a in el.iter('a'))
+    return min(1.0, link_length / text_length)
+
+
+def initial_score(el):
+    tag = el.tag
+    score = class_weight(el)
+    if tag == 'div':
+        score += 5
+    elif tag in ('pre', 'td', 'blockquote'):
+        score += 3
+    elif tag in ('address', 'ol', 'ul', 'dl', 'dd', 'dt', 'li', 'form'):
+        score -= 3
+    elif tag in HEADING_TAGS or tag == 'th':
+        score -= 5
+    return score
+
+
+def paragraph_score(text):
+    """段落得分: 标点越多、文字越长越像正文"""
+    punctuation = text.count(',') + text.count('，') + text.count('。') + text.count('、')
+    return 1 + punctuation + min(len(text) // 100, 3)
+
+
+def score_candidates(body):
+    scores = {}
+
+    def credit(el, text):
+        value = paragraph_score(text)
+        parent = el.getparent()
+        for node, weight in ((parent, 1.0), (parent.getparent() if parent is not None else None, 0.5)):
+            if node is None or not isinstance(node.tag, str):
+                continue
+            if node not in scores:
+                scores[node] = initial_score(node)
+            scores[node] += value * weight
+
+    for el in body.iter(*PARAGRAPH_TAGS):
+        text = normalize_text(el.text_content())
+        if len(text) >= MIN_PARAGRAPH_CHARS:
+            credit(el, text)
+
+    # 不用<p>、直接在<div>里用文字和<br>排版的页面
+    for el in body.iter('div'):
+        direct = normalize_text((el.text or '') + ''.join(child.tail or '' for child in el))
+        if len(direct) >= MIN_PARAGRAPH_CHARS:
+            credit(el, direct)
+
+    for node in scores:
+        scores[node] *= 1 - link_density(node)
+    return scores
+
+
+def select_main_nodes(doc):
+    """打分选出正文节点，连同得分接近的兄弟节点按原顺序返回"""
+    body = doc.find('body')
+    if body is None:
+        body = doc
+    scores = score_candidates(body)
+    if not scores:
+        return [body]
+
+    best = max(scores, key=scores.get)
+    parent = best.getparent()
+    if parent is None:
+        return [best]
+
+    threshold = max(10, scores[best] * 0.2)
+    nodes = []
+    for sibling in parent:
+        if not isinstance(sibling.tag, str):
+            continue
+        if sibling is best or scores.get(sibling, 0) >= threshold:
+            nodes.append(sibling)
+        elif sibling.tag == 'p':
+            text = normalize_text(sibling.text_content())
+            if len(text) > 80 and link_density(sibling, len(text)) < 0.25:
+                nodes.append(sibling)
+    return nodes
+
+
+def site_nodes(doc, url):
+    host = (urlparse(url).hostname or '').lower()
+    for domain, xpaths in SITE_EXTRACTORS.items():
+        if host == domain or host.endswith('.' + domain):
+            for xpath in xpaths:
+                nodes = doc.xpath(xpath)
+                if nodes and sum(len(normalize_text(n.text_content())) for n in nodes) >= 100:
+                    return nodes
+    return None
+
+
+class MarkdownRenderer:
+    """把DOM子树渲染为Markdown (plain=True 时输出纯文本)"""
+
+    def __init__(self, base_url, plain=False):
+        self.base_url = base_url
+        self.plain = plain
+        self.blocks = []
+        self.inline = []
+
+    def flush(self):
+        text = ''.join(self.inline)
+        lines = [normalize_text(line) for line in text.split('\n')]
+        text = '\n'.join(line for line in lines if line)
+        if text:
+            self.blocks.append(text)
+        self.inline = []
+
+    def sub_render(self, el, include_text=True):
+        renderer = MarkdownRenderer(self.base_url, self.plain)
+        renderer.render_children(el, include_text)
+        renderer.flush()
+        return renderer.blocks
+
+    def inline_text(self, el):
+        return ' '.join(self.sub_render(el)).replace('\n', ' ')
+
+    def render_children(self, el, include_text=True):
+        if include_text and el.text:
+            self.inline.append(el.text)
+        for child in el:
+            self.render(child)
+            if child.tail:
+                self.inline.append(child.tail)
+
+    def url(self, value):
+        return urljoin(self.base_url, value.strip()) if value else ''
+
+    def render(self, el):
+        tag = el.tag if isinstance(el.tag, str) else None
+        if tag is None:
+            return
+
+        if tag in HEADING_TAGS:
+            self.flush()
+            text = self.inline_text(el)
+            if text:
+                self.blocks.append(text if self.plain else f"{'#' * HEADING_TAGS[tag]} {text}")
+        elif tag == 'pre':
+            self.flush()
+            code = el.text_content().strip('\n')
+            if code.strip():
+                if self.plain:
+                    self.blocks.append(code)
+                else:
+                    match = re.search(r'(?:lang|language)-([\w+#-]+)', f"{el.get('class', '')} " + ' '.join(
+                        c.get('class', '') for c in el.iter('code')))
+                    self.blocks.append(f"```{match.group(1) if match else ''}\n{code}\n```")
+        elif tag in ('ul', 'ol'):
+            self.flush()
+            items = []
+            number = 1
+            for li in el:
+                if not isinstance(li.tag, str):
+                    continue
+                lines = '\n'.join(self.sub_render(li)).split('\n')
+                if not lines or not lines[0]:
+                    continue
+                marker = f"{number}." if tag == 'ol' else '-'
+                number += 1
+                items.append(f"{marker} {lines[0]}" + ''.join(f"\n   {line}" for line in lines[1:]))
+            if items:
+                self.blocks.append('\n'.join(items))
+        elif tag == 'blockquote':
+            self.flush()
+            blocks = self.sub_render(el)
+            if blocks:
+                text = '\n\n'.join(blocks)
+                self.blocks.append(text if self.plain else '\n'.join(f"> {line}" if line else '>' for line in text.split('\n')))
+        elif tag == 'br':
+            self.inline.append('\n')
+        elif tag == 'hr':
+            self.flush()
+            if not self.plain:
+                self.blocks.append('---')
+        elif tag == 'a':
+            text = self.inline_text(el)
+            href = self.url(el.get('href'))
+            if self.plain or not href or href.startswith('javascript:') or not text:
+                self.inline.append(text)
+            else:
+                self.inline.append(f"[{text}]({href})")
+        elif tag == 'img':
+            if not self.plain:
+                src = el.get('data-original') or el.get('data-actualsrc') or el.get('data-src') or el.get('src')
+                if src and not src.startswith('data:'):
+                    self.inline.append(f"![{normalize_text(el.get('alt', ''))}]({self.url(src)})")
+        elif tag in ('strong', 'b'):
+            text = self.inline_text(el)
+            self.inline.append(text if self.plain or not text else f"**{text}**")
+        elif tag in ('em', 'i'):
+            text = self.inline_text(el)
+            self.inline.append(text if self.plain or not text else f"*{text}*")
+        elif tag == 'code':
+            text = el.text_content()
+            self.inline.append(text if self.plain or not text else f"`{text}`")
+        elif tag in ('td', 'th'):
+            self.inline.append(' ')
+            self.render_children(el)
+            self.inline.append(' ')
+        elif tag in BLOCK_TAGS or tag == 'li':
+            self.flush()
+            self.render_children(el)
+            self.flush()
+        else:
+            self.render_children(el)
+
+    def drain(self):
+        blocks, self.blocks = self.blocks, []
+        return blocks
+
+    def iter_render(self, el):
+        """与 render 输出相同，但逐层进入容器节点，每渲染一个子节点产出一次已完成的块"""
+        tag = el.tag if isinstance(el.tag, str) else None
+        if tag not in BLOCK_TAGS or tag == 'hr':
+            self.render(el)
+            yield self.drain()
+            return
+        self.flush()
+        if el.text:
+            self.inline.append(el.text)
+        for child in el:
+            yield from self.iter_render(child)
+            if child.tail:
+                self.inline.append(child.tail)
+        self.flush()
+        yield self.drain()
+
+    def iter_steps(self, nodes):
+        """逐步产出块列表；纯文本和Markdown渲染器的步数相同，可以并行迭代"""
+        for node in nodes:
+            yield from self.iter_render(node)
+        self.flush()
+        yield self.drain()
+
+    def output(self, nodes):
+        blocks = [block for step in self.iter_steps(nodes) for block in step]
+        if self.plain:
+            return '\n'.join(blocks).strip()
+        return _BLANK_LINES.sub('\n\n', '\n\n'.join(blocks)).strip()
+
+
+def main_content(html, url):
+    """解析并定位正文，返回 (标题, 正文节点, 方法)；无法解析时返回None"""
+    doc = parse_html(html) if html else None
+    if doc is None:
+        return None
+
+    title = find_title(doc)
+    nodes = site_nodes(doc, url)
+    method = "site"
+    if nodes is None:
+        remove_boilerplate(doc)
+        nodes = select_main_nodes(doc)
+        method = "density"
+    return title, nodes, method
+
+
+def extract(html, url):
+    """提取正文，返回 Article"""
+    found = main_content(html, url)
+    if found is None:
+        return Article("", "", "", "empty")
+
+    title, nodes, method = found
+    markdown = MarkdownRenderer(url).output(nodes)
+    text = MarkdownRenderer(url, plain=True).output(nodes)
+    return Article(title, text, markdown, method)
+
+
+def extract_stream(html, url, chunk_chars=65536):
+    """流式提取: 先产出不含正文的 Article，再按DOM顺序产出 (纯文本, Markdown) 分块。
+    分块依次拼接后与 extract() 的结果相同 (首尾空白除外)，每次只保留一个分块大小的已渲染文本"""
+    found = main_content(html, url)
+    if found is None:
+        yield Article("", "", "", "empty")
+        return
+
+    title, nodes, method = found
+    yield Article(title, "", "", method)
+
+    text_parts, markdown_parts, size = [], [], 0
+    text_separator = markdown_separator = ''
+    steps = zip(MarkdownRenderer(url, plain=True).iter_steps(nodes), MarkdownRenderer(url).iter_steps(nodes))
+    for text_blocks, markdown_blocks in steps:
+        for block in text_blocks:
+            text_parts.append(text_separator + block)
+            text_separator = '\n'
+            size += len(block)
+        for block in markdown_blocks:
+            markdown_parts.append(markdown_separator + _BLANK_LINES.sub('\n\n', block))
+            markdown_separator = '\n\n'
+            size += len(block)
+        if size >= chunk_chars:
+            yield ''.join(text_parts), ''.join(markdown_parts)
+            text_parts, markdown_parts, size = [], [], 0
+    if text_parts or markdown_parts:
+        yield ''.join(text_parts), ''.join(markdown_parts)
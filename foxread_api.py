@@ -9,61 +9,1008 @@
 import sys
 import os
 import json
+import time
+import uuid
+import socket
 import asyncio
-from typing import Optional
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from urllib.parse import urlparse
 import base64
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi import FastAPI, HTTPException, Header
+from fastapi.responses import Response, JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
 import uvicorn
 
+import web_agent
+import extractor
+import http_fetcher
+import compression
+import bootstrap
+from content_cache import ContentCache, normalize_url
+from scheduler import AdmissionController, Overloaded, default_worker_count, Lane
+from politeness import PolitenessScheduler, Throttled, looks_like_challenge
+from readiness import readiness_stats
+from metrics import (registry, Gauge, CACHE_LOOKUPS, SERIALIZE_DURATION, COMPRESS_DURATION, RESPONSE_BYTES, NOT_MODIFIED,
+                     CHANGE_CHECKS, start_timings, span, observe, in_context, capped_domain)
+from browser_pool import StandardBrowserPool, StealthBrowserPool, PoolExhausted
+from cdp_engine import CDPEngine, CDPLaunchError
+from extract_worker import ExtractWorkerPool, WorkerFailed, ExtractionLimit, default_pool_size
+from shared_state import open_state, SharedBuckets, data_path
+from jobs import JobStore, JobRunner, JOB_DB, JOB_CONCURRENCY, JOB_TIMEOUT
+from page_archive import open_archive, ARCHIVE_DIR
+from session_store import open_sessions
+from change_detection import ChangeStore, probe_page, content_diff, CHANGE_DB, CHANGE_PROBE_TIMEOUT
+from capability import CapabilityRunner, load_corpus, update_baselines, summarize, MODES as CAPABILITY_MODES
+
 # 🦊 FoxRead 配置
 WEB_AGENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_agent.py")
-PORT = 8900
-HOST = "0.0.0.0"
+PORT = int(os.environ.get("FOXREAD_PORT", "8900"))
+HOST = os.environ.get("FOXREAD_HOST", "0.0.0.0")
+TIMEOUT = int(os.environ.get("FOXREAD_TIMEOUT", "30"))
+HTTP_WORKERS = int(os.environ.get("FOXREAD_HTTP_WORKERS", "1"))
 VERSION = "1.0.0"
 
+# 🌐 横向扩展: all = HTTP和浏览器在同一进程；frontend = 只处理HTTP，浏览器任务放入共享队列；
+# worker = 浏览器节点，从共享队列领取任务 (python3 foxread_api.py --role worker)
+ROLE = os.environ.get("FOXREAD_ROLE", "all")
+SHARED_STATE = os.environ.get("FOXREAD_SHARED_STATE", "")
+SHARED_POLL = float(os.environ.get("FOXREAD_SHARED_POLL", "0.1"))
+SHARED_POLL_MAX = float(os.environ.get("FOXREAD_SHARED_POLL_MAX", "1"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+shared_state = open_state(SHARED_STATE)
+if ROLE != "all" and shared_state is None:
+    raise RuntimeError(f"FOXREAD_ROLE={ROLE} 需要配置 FOXREAD_SHARED_STATE")
+
+# 🦊 浏览器池配置
+POOL_SIZE = int(os.environ.get("FOXREAD_POOL_SIZE", "2"))
+POOL_MAX_PAGES = int(os.environ.get("FOXREAD_POOL_MAX_PAGES", "50"))
+POOL_PREWARM = os.environ.get("FOXREAD_POOL_PREWARM", "1") == "1"
+
+# ⚡ HTTP快速通道配置
+FAST_PATH = os.environ.get("FOXREAD_FAST_PATH", "1") == "1"
+FAST_PATH_TIMEOUT = float(os.environ.get("FOXREAD_FAST_PATH_TIMEOUT", "8"))
+
+# 🗃️ 内容缓存配置
+CACHE_ENABLED = os.environ.get("FOXREAD_CACHE", "1") == "1"
+CACHE_MAX_ENTRIES = int(os.environ.get("FOXREAD_CACHE_MAX_ENTRIES", "1000"))
+CACHE_MAX_MB = int(os.environ.get("FOXREAD_CACHE_MAX_MB", "256"))
+# 配置了共享状态时缓存的第二层默认放在同一个存储里，各worker共用
+CACHE_DB = os.environ.get("FOXREAD_CACHE_DB", "") or SHARED_STATE
+
+content_cache = ContentCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_MB * 1024 * 1024,
+    disk_path=CACHE_DB or None
+)
+revalidating = set()
+
+# 🗄️ 页面归档: 抓取到的原始HTML去重压缩后保存 (FOXREAD_ARCHIVE_DIR)，单线程顺序写入
+page_archive = open_archive(ARCHIVE_DIR)
+archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="foxread-archive")
+
+# 🍪 浏览器会话: 按域名保存并恢复cookie和localStorage，跳过反检测网站的首次访问 (FOXREAD_SESSIONS)
+browser_sessions = open_sessions()
+
+# 🔍 变化检测 (/api?changes=true): 每个URL的探测信号和最近几个提取版本
+change_store = ChangeStore(CHANGE_DB)
+
+# 🧪 能力测试默认模式 (离线环境设为 replay)
+CAPABILITY_MODE = os.environ.get("FOXREAD_CAPABILITY_MODE", "live")
+
+# 📦 批量提取配置
+BATCH_MAX_URLS = int(os.environ.get("FOXREAD_BATCH_MAX_URLS", "500"))
+BATCH_CONCURRENCY = int(os.environ.get("FOXREAD_BATCH_CONCURRENCY", "8"))
+BATCH_DOMAIN_CONCURRENCY = int(os.environ.get("FOXREAD_BATCH_DOMAIN_CONCURRENCY", "2"))
+batch_limits = {}  # 键 -> [信号量, 使用中的请求数]，没有请求使用时删除
+
+# 📮 异步任务 (SQLite持久化，多个worker进程共同消费)
+job_store = JobStore(JOB_DB)
+job_runner = JobRunner(job_store, lambda job: run_job(job), JOB_CONCURRENCY)
+
+class SingleFlight:
+    """🦊 同一URL的并发提取只执行一次，其余请求等待同一个结果"""
+
+    def __init__(self):
+        self._inflight = {}
+        self.stats = {"leaders": 0, "coalesced": 0, "shared_coalesced": 0, "waiter_timeouts": 0, "waiter_cancelled": 0}
+
+    def _forget(self, key, task):
+        if key in self._inflight and self._inflight[key][0] is task:
+            del self._inflight[key]
+        # 没有等待者时也要取走异常，避免 "exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, key: str, factory, timeout: float, lane: str = "interactive"):
+        """factory(Lane) 创建共享的提取任务；交互式请求加入 bulk 任务发起的提取时提升其通道"""
+        flight = self._inflight.get(key)
+        if flight is None:
+            shared_lane = Lane(lane)
+            task = asyncio.ensure_future(factory(shared_lane))
+            self._inflight[key] = flight = (task, shared_lane)
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["coalesced"] += 1
+            if lane == "interactive":
+                flight[1].promote()
+        task = flight[0]
+
+        # shield: 单个等待者超时或断开不会取消共享的提取任务
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.stats["waiter_timeouts"] += 1
+            raise HTTPException(status_code=408, detail="⏰ FoxRead timeout - 狐狸需要更多时间")
+        except asyncio.CancelledError:
+            self.stats["waiter_cancelled"] += 1
+            raise
+
+    def snapshot(self):
+        return {"in_flight": len(self._inflight), **self.stats}
+
+single_flight = SingleFlight()
+
+# 🧭 浏览器引擎: cdp (asyncio直连DevTools，默认) 或 selenium (线程池+WebDriver，CDP不可用时的后备)
+ENGINE = os.environ.get("FOXREAD_ENGINE", "cdp")
+cdp_engine = CDPEngine()
+cdp_fallback = {"active": False, "reason": None}
+
+standard_pool = StandardBrowserPool(size=POOL_SIZE, max_pages=POOL_MAX_PAGES)
+stealth_pool = StealthBrowserPool(size=POOL_SIZE, max_pages=POOL_MAX_PAGES)
+browser_executor = ThreadPoolExecutor(max_workers=POOL_SIZE * 2, thread_name_prefix="foxread-browser")
+
+# 🧮 正文提取工作进程: auto = 按CPU核数 (多个uvicorn worker平分)；0 = 在API进程的线程池中提取；
+# N = N个常驻进程，经二进制帧 (ipc.py) 和共享内存传输HTML和结果
+EXTRACT_WORKERS = os.environ.get("FOXREAD_EXTRACT_WORKERS", "auto")
+EXTRACT_WORKERS = default_pool_size(HTTP_WORKERS) if EXTRACT_WORKERS == "auto" else int(EXTRACT_WORKERS)
+EXTRACT_TIMEOUT = float(os.environ.get("FOXREAD_EXTRACT_TIMEOUT", "30"))
+EXTRACT_MAX_MB = float(os.environ.get("FOXREAD_EXTRACT_MAX_MB", "20"))  # 超过该大小的HTML截断后提取
+extract_workers = ExtractWorkerPool(EXTRACT_WORKERS, timeout=EXTRACT_TIMEOUT) if EXTRACT_WORKERS else None
+
+# 🌊 流式响应: 先发送标题和元数据，再按提取进度分块发送正文
+STREAM_CHUNK_KB = int(os.environ.get("FOXREAD_STREAM_CHUNK_KB", "64"))
+STREAM_CACHE_MAX_MB = int(os.environ.get("FOXREAD_STREAM_CACHE_MAX_MB", "8"))  # 超过该大小的流式结果不写入缓存
+
+# 🚦 准入控制: 浏览器并发数默认由CPU和内存推算，不超过浏览器池容量 (CDP引擎为 浏览器数 × 每个浏览器的标签页数)
+if ENGINE == "cdp":
+    WORKERS = int(os.environ.get("FOXREAD_WORKERS", "0")) or cdp_engine.browsers * cdp_engine.tabs_per_browser
+else:
+    WORKERS = int(os.environ.get("FOXREAD_WORKERS", "0")) or min(default_worker_count(), POOL_SIZE * 2)
+QUEUE_SIZE = int(os.environ.get("FOXREAD_QUEUE_SIZE", str(WORKERS * 4)))
+QUEUE_TIMEOUT = float(os.environ.get("FOXREAD_QUEUE_TIMEOUT", "10"))
+
+admission = AdmissionController(WORKERS, QUEUE_SIZE, QUEUE_TIMEOUT)
+
+# 🐾 域名礼貌调度 (策略见 politeness.DOMAIN_POLICIES，可用 FOXREAD_DOMAIN_POLICIES 覆盖)
+# 配置共享状态时各worker共用域名令牌桶
+politeness = PolitenessScheduler(shared=SharedBuckets(shared_state) if shared_state is not None else None)
+
+# 📈 瞬时状态指标 (抓取 /metrics 时读取)
+registry.register(Gauge(
+    "foxread_browser_sessions", "Browser sessions by pool and state", ("pool", "state"),
+    collect=lambda: [((pool.name, state), pool.stats()[state])
+                     for pool in (standard_pool, stealth_pool) for state in ("idle", "in_use")]))
+registry.register(Gauge(
+    "foxread_admission", "Admission controller running and queued requests", ("state",),
+    collect=lambda: [(("running",), admission.stats()["running"]), (("queued",), admission.stats()["queue_depth"]),
+                     (("queued_bulk",), admission.stats()["bulk_queue_depth"])]))
+registry.register(Gauge(
+    "foxread_single_flight_in_flight", "Distinct URLs currently being extracted",
+    collect=lambda: [((), single_flight.snapshot()["in_flight"])]))
+registry.register(Gauge(
+    "foxread_jobs", "Asynchronous jobs by status", ("status",),
+    collect=lambda: [((status,), count) for status, count in job_store.stats().items()]))
+def session_saved_samples():
+    """按域名标签汇总会话复用节省的导航时间 (超过上限的域名合并为 other)"""
+    totals = {}
+    for domain, seconds in browser_sessions.saved_seconds().items():
+        label = capped_domain(domain)
+        totals[label] = totals.get(label, 0.0) + seconds
+    return [((label,), round(seconds, 3)) for label, seconds in totals.items()]
+
+registry.register(Gauge(
+    "foxread_session_navigation_saved_seconds", "Estimated navigation time saved by reusing browser sessions",
+    ("domain",), collect=lambda: session_saved_samples() if browser_sessions is not None else []))
+registry.register(Gauge(
+    "foxread_cache_entries", "Entries in the in-memory content cache",
+    collect=lambda: [((), content_cache.stats()["entries"])] if CACHE_ENABLED else []))
+
+# ⏱️ 启动耗时与首个请求延迟 (见 /health)
+startup = {"bootstrap_seconds": None, "first_request_seconds": None}
+
+def report_environment(environment: dict):
+    """🧰 启动时输出固定的浏览器环境，缺少依赖或驱动时提前告警"""
+    print(f"🧰 Chrome: {environment['chrome_version'] or environment['chrome_binary'] or '未找到'}")
+    print(f"🧰 ChromeDriver: {environment['chromedriver'] or '未找到'} ({environment['source']}, "
+          f"{environment['bootstrap_seconds']}s)")
+    if environment["missing_dependencies"]:
+        print(f"⚠️  缺少依赖: {', '.join(environment['missing_dependencies'])}，请运行: python3 install.py", file=sys.stderr)
+    if environment.get("chromedriver_error"):
+        print(f"⚠️  ChromeDriver解析失败: {environment['chromedriver_error']}", file=sys.stderr)
+
+def use_cdp() -> bool:
+    return ENGINE == "cdp" and not cdp_fallback["active"]
+
+def fall_back_to_selenium(reason: str):
+    """CDP引擎无法启动Chrome时改用Selenium浏览器池"""
+    if not cdp_fallback["active"]:
+        print(f"⚠️  CDP引擎不可用 ({reason})，改用Selenium", file=sys.stderr)
+    cdp_fallback.update(active=True, reason=reason)
+
+async def prewarm_cdp():
+    """🔥 预先启动CDP引擎的浏览器"""
+    try:
+        await cdp_engine.start()
+    except CDPLaunchError as e:
+        fall_back_to_selenium(str(e))
+        if POOL_PREWARM:
+            asyncio.get_running_loop().run_in_executor(browser_executor, prewarm_pools)
+
+async def start_extract_workers():
+    """🔥 预先启动提取工作进程；全部启动失败时先在进程内提取，下次提取时重试"""
+    try:
+        await extract_workers.start()
+    except WorkerFailed as e:
+        print(f"⚠️  提取工作进程启动失败，暂时改为进程内提取: {e}", file=sys.stderr)
+
+def prewarm_pools():
+    """🔥 预先启动浏览器会话"""
+    for pool in (standard_pool, stealth_pool):
+        try:
+            pool.start()
+        except Exception as e:
+            print(f"⚠️  {pool.name} 浏览器池预热失败: {e}", file=sys.stderr)
+
+@asynccontextmanager
+async def lifespan(app):
+    # 🧰 一次性检查依赖并固定浏览器/驱动路径，请求路径上不再做查找
+    environment = await asyncio.get_running_loop().run_in_executor(None, bootstrap.settings)
+    startup["bootstrap_seconds"] = environment["bootstrap_seconds"]
+    report_environment(environment)
+    # HTTP前端不启动浏览器，浏览器任务由 --role worker 节点执行
+    if ROLE == "frontend":
+        pass
+    elif POOL_PREWARM and ENGINE == "cdp":
+        asyncio.ensure_future(prewarm_cdp())
+    elif POOL_PREWARM:
+        asyncio.get_running_loop().run_in_executor(browser_executor, prewarm_pools)
+    if content_cache.disk is not None:
+        content_cache.disk.purge_expired()
+    if extract_workers is not None:
+        asyncio.ensure_future(start_extract_workers())
+    job_runner.start()
+    if browser_sessions is not None and ROLE != "frontend":
+        browser_sessions.start(warm_session)
+    yield
+    await job_runner.close()
+    if browser_sessions is not None:
+        await browser_sessions.close()
+    content_cache.close()
+    await cdp_engine.close()
+    if extract_workers is not None:
+        await extract_workers.close()
+    standard_pool.close()
+    stealth_pool.close()
+    browser_executor.shutdown(wait=False)
+    if shared_state is not None:
+        shared_state.close()
+    archive_executor.shutdown(wait=True)
+    if page_archive is not None:
+        page_archive.close()
+    change_store.close()
+
 # 创建FastAPI应用
 app = FastAPI(
     title="🦊 FoxRead API",
     description="狡黠的内容猎手 - 像狐狸一样聪明地获取网页内容",
     version=VERSION,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
-async def extract_with_webagent(url: str, timeout: int = 30):
-    """🦊 使用狐狸般的智慧提取网页内容"""
+async def thread_chunks(chunks):
+    """在线程池中逐块推进同步生成器，消费者不读取时不会继续渲染"""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        try:
+            chunks.close()
+        except ValueError:
+            # 请求被取消时线程可能仍在推进生成器，交给垃圾回收
+            pass
+
+async def first_chunks(chunks):
+    """取出 (Article, 首个分块)"""
+    article = await chunks.__anext__()
     try:
-        if not os.path.exists(WEB_AGENT_PATH):
-            raise FileNotFoundError(f"🚫 Web Agent not found at {WEB_AGENT_PATH}")
-        
-        # 🦊 狡黠地启动内容提取
-        process = await asyncio.create_subprocess_exec(
-            sys.executable, WEB_AGENT_PATH, url,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = ("", "")
+    return article, first
+
+def limit_html(html: Optional[str]):
+    """📏 超过 FOXREAD_EXTRACT_MAX_MB 的页面只提取前面的部分，返回 (HTML, 是否截断)"""
+    limit = int(EXTRACT_MAX_MB * 1024 * 1024)
+    if html and len(html) > limit:
+        return html[:limit], True
+    return html, False
+
+def too_complex(e: ExtractionLimit) -> HTTPException:
+    return HTTPException(status_code=422, detail=f"📄 页面过于复杂，提取超过CPU时间上限 ({e})")
+
+async def stream_page(html: Optional[str], url: str, title: str) -> dict:
+    """🌊 流式提取: 结果只带首个分块，其余分块在 result["stream"] 中按需生成"""
+    if not html:
+        return web_agent.extract_content(html, url, title)
+    html, truncated = limit_html(html)
+    chunk_chars = STREAM_CHUNK_KB * 1024
+    with span("extract"):
+        chunks = None
+        if extract_workers is not None:
+            chunks = extract_workers.extract_stream(html, url, chunk_chars)
+            try:
+                article, first = await first_chunks(chunks)
+            except ExtractionLimit as e:
+                raise too_complex(e)
+            except WorkerFailed as e:
+                print(f"⚠️  提取工作进程失败，改为进程内提取: {e}", file=sys.stderr)
+                chunks = None
+        if chunks is None:
+            chunks = thread_chunks(extractor.extract_stream(html, url, chunk_chars))
+            article, first = await first_chunks(chunks)
+    result = web_agent.build_result(article, url, title)
+    result["content"], result["markdown"] = first
+    result["stream"] = chunks
+    if truncated:
+        result["truncated"] = True
+    return result
+
+async def extract_page(html: Optional[str], url: str, title: str, stream: bool = False) -> dict:
+    """正文提取: 配置了工作进程时交给常驻进程，否则 (或工作进程出错时) 在线程池中进行"""
+    if stream:
+        return await stream_page(html, url, title)
+    html, truncated = limit_html(html)
+    result = None
+    if html and extract_workers is not None:
+        try:
+            with span("extract"):
+                article = await extract_workers.extract(html, url)
+            result = web_agent.build_result(article, url, title)
+        except ExtractionLimit as e:
+            raise too_complex(e)
+        except WorkerFailed as e:
+            print(f"⚠️  提取工作进程失败，改为进程内提取: {e}", file=sys.stderr)
+    if result is None:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, in_context(web_agent.extract_content, html, url, title))
+    if truncated:
+        result["truncated"] = True
+    return result
+
+def fast_fetch(url: str, timeout: float):
+    """⚡ HTTP快速通道: 返回足够完整的页面，否则返回None交给浏览器"""
+    try:
+        with span("http_fetch"):
+            page = http_fetcher.fetch(url, timeout=timeout)
+    except Exception:
+        return None, "http_error"
+    if page is None:
+        return None, "not_html"
+    if page.status_code != 200:
+        return None, f"http_{page.status_code}"
+
+    with span("completeness"):
+        complete, reason = http_fetcher.assess_completeness(page.html, static_site=web_agent.is_static_site(url))
+    if not complete:
+        return None, reason
+    return page, reason
+
+async def fast_fetch_and_extract(url: str, timeout: float, stream: bool = False):
+    loop = asyncio.get_running_loop()
+    try:
+        page, reason = await asyncio.wait_for(
+            loop.run_in_executor(None, in_context(fast_fetch, url, timeout)), timeout=timeout)
+    except asyncio.TimeoutError:
+        return None, "http_timeout"
+    if page is None:
+        return None, reason
+
+    archive_page(url, page.html, "", "http")
+    result = await extract_page(page.html, url, "", stream)
+    result["tier"] = "http"
+    etag, last_modified = http_fetcher.validators(page)
+    if etag or last_modified:
+        result["validators"] = {"etag": etag, "last_modified": last_modified}
+    return result, reason
+
+def revalidate(url: str, etag: Optional[str], last_modified: Optional[str]):
+    """🔄 条件请求重新验证缓存: 304则续期，否则用新内容替换"""
+    try:
+        page = http_fetcher.fetch(url, timeout=FAST_PATH_TIMEOUT,
+                                  headers=http_fetcher.conditional_headers(etag, last_modified))
+    except Exception:
+        return
+    if page is None:
+        return
+    if page.status_code == 304:
+        content_cache.touch(url)
+        return
+    if page.status_code != 200:
+        return
+
+    complete, _ = http_fetcher.assess_completeness(page.html, static_site=web_agent.is_static_site(url))
+    if complete:
+        result = web_agent.extract_content(page.html, url, "")
+        result["tier"] = "http"
+        new_etag, new_last_modified = http_fetcher.validators(page)
+        content_cache.refresh(url, result, new_etag, new_last_modified)
+    else:
+        content_cache.invalidate(url)
+
+def store_page(url: str, html: str, title: str, tier: str):
+    try:
+        page_archive.store(url, html, title, tier)
+    except Exception as e:
+        print(f"⚠️  页面归档失败: {e}", file=sys.stderr)
+
+def archive_page(url: str, html: Optional[str], title: str, tier: str):
+    """🗄️ 在归档线程中保存原始HTML，不等待写入完成"""
+    if page_archive is not None and html:
+        asyncio.get_running_loop().run_in_executor(archive_executor, store_page, url, html, title, tier)
+
+def selenium_fetch(url: str, timeout: float, snapshot: Optional[dict] = None, capture: bool = False):
+    """在浏览器线程中借用Selenium会话抓取页面"""
+    pool = stealth_pool if web_agent.needs_stealth(url) else standard_pool
+    try:
+        html, title, load_info = pool.fetch(url, timeout=timeout, snapshot=snapshot, capture=capture)
+    except PoolExhausted:
+        raise
+    except Exception as e:
+        print(f"访问失败: {e}", file=sys.stderr)
+        html, title, load_info = None, "", {}
+    return html, title, load_info, f"browser:{pool.name}"
+
+async def cdp_fetch(url: str, timeout: float, snapshot: Optional[dict] = None, capture: bool = False):
+    """在CDP引擎的独立标签页中抓取页面"""
+    stealth = web_agent.needs_stealth(url)
+    try:
+        html, title, load_info = await cdp_engine.fetch(url, timeout=timeout, stealth=stealth,
+                                                        snapshot=snapshot, capture=capture)
+    except (PoolExhausted, CDPLaunchError):
+        raise
+    except Exception as e:
+        print(f"访问失败: {e}", file=sys.stderr)
+        html, title, load_info = None, "", {}
+    return html, title, load_info, f"cdp:{'stealth' if stealth else 'standard'}"
+
+def poll_intervals():
+    """等待其他进程结果的轮询间隔: 从 SHARED_POLL 逐步加倍到 SHARED_POLL_MAX，等待者多时不挤占共享状态"""
+    interval = SHARED_POLL
+    while True:
+        yield interval
+        interval = min(SHARED_POLL_MAX, interval * 2)
+
+async def remote_browser_fetch(url: str, remaining: float):
+    """🌐 HTTP前端: 把浏览器任务放入共享队列，等待浏览器节点写回结果"""
+    loop = asyncio.get_running_loop()
+    job_id = uuid.uuid4().hex
+    deadline = loop.time() + remaining
+    await loop.run_in_executor(None, shared_state.push_job, job_id, {"url": url, "timeout": remaining})
+    intervals = poll_intervals()
+    try:
+        while loop.time() < deadline:
+            result = await loop.run_in_executor(None, shared_state.job_result, job_id)
+            if result is not None:
+                if "error" in result:
+                    raise HTTPException(status_code=result.get("status_code", 502),
+                                        detail=f"🖥️ 浏览器节点提取失败: {result['error']}")
+                return result
+            await asyncio.sleep(min(next(intervals), max(0.0, deadline - loop.time())))
+        raise asyncio.TimeoutError()
+    except BaseException:
+        # 超时或客户端离开: 尚未领取的任务不再执行 (尽力而为，未取消的结果会过期)
+        try:
+            await loop.run_in_executor(None, shared_state.cancel_job, job_id)
+        except Exception:
+            pass
+        raise
+
+async def engine_page(url: str, remaining: float, snapshot: Optional[dict], capture: bool):
+    """按所选引擎在浏览器中抓取页面；CDP引擎无法启动Chrome时改用Selenium"""
+    if use_cdp():
+        try:
+            return await cdp_fetch(url, remaining, snapshot, capture)
+        except CDPLaunchError as e:
+            fall_back_to_selenium(str(e))
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(browser_executor, in_context(selenium_fetch, url, remaining, snapshot, capture))
+
+def page_outcome(html: Optional[str], title: str) -> str:
+    if not html:
+        return "failure"
+    return "challenge" if looks_like_challenge(title, http_fetcher.visible_text(html)) else "success"
+
+async def browser_page(url: str, remaining: float, fresh_session: bool = False):
+    """🍪 在浏览器中抓取页面；启用会话存储时先恢复该域名保存的会话，之后按结果保存或丢弃。
+    fresh_session 时不借出已有会话 (预热新会话)"""
+    stealth = web_agent.needs_stealth(url)
+    if browser_sessions is None or not browser_sessions.applies(stealth):
+        return await engine_page(url, remaining, None, False)
+    snapshot = None if fresh_session else await browser_sessions.checkout(url, stealth)
+    html, title, load_info, tier = await engine_page(url, remaining, snapshot, True)
+    outcome = page_outcome(html, title)
+    await browser_sessions.checkin(url, snapshot, outcome, load_info)
+    load_info["session"] = {"reused": snapshot is not None, "outcome": outcome}
+    return html, title, load_info, tier
+
+async def warm_session(url: str) -> bool:
+    """🍪 后台预热一个新会话: 与批量任务一样在 bulk 通道等待浏览器名额，并遵守域名限速。
+    只有页面正常打开 (会话已保存) 时返回True"""
+    if not browser_sessions.applies(web_agent.needs_stealth(url)):
+        return False
+    limiter = await politeness.acquire(url, time.monotonic() + TIMEOUT)
+    outcome = "failure"
+    try:
+        await admission.acquire(timeout=TIMEOUT, lane="bulk")
+        started = time.monotonic()
+        try:
+            _, _, load_info, _ = await browser_page(url, TIMEOUT, fresh_session=True)
+        finally:
+            admission.release(time.monotonic() - started)
+        outcome = load_info.get("session", {}).get("outcome", "failure")
+    finally:
+        await limiter.release(outcome)
+    return outcome == "success"
+
+async def browser_fetch(url: str, remaining: float, stream: bool = False):
+    """在浏览器中抓取并提取"""
+    if ROLE == "frontend":
+        return await remote_browser_fetch(url, remaining)
+    html, title, load_info, tier = await browser_page(url, remaining)
+    archive_page(url, html, title, tier)
+
+    result = await extract_page(html, url, title, stream)
+    result["tier"] = tier
+    for key in ("resources", "readiness", "session"):
+        if load_info.get(key):
+            result[key] = load_info[key]
+    return result
+
+async def run_browser_job(job_id: str, payload: dict, slots: asyncio.Semaphore):
+    """🖥️ 浏览器节点执行一个任务，结果或错误写回共享队列"""
+    try:
+        result = await asyncio.wait_for(browser_fetch(payload["url"], payload["timeout"]), timeout=payload["timeout"])
+        result["node"] = WORKER_ID
+    except asyncio.TimeoutError:
+        result = {"error": "timeout", "status_code": 408}
+    except PoolExhausted as e:
+        result = {"error": str(e), "status_code": 503}
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        slots.release()
+    await asyncio.get_running_loop().run_in_executor(None, shared_state.finish_job, job_id, result)
+
+async def run_browser_node():
+    """🖥️ 浏览器节点 (--role worker): 从共享队列领取浏览器任务，最多同时执行 WORKERS 个"""
+    loop = asyncio.get_running_loop()
+    report_environment(await loop.run_in_executor(None, bootstrap.settings))
+    if POOL_PREWARM and ENGINE == "cdp":
+        await prewarm_cdp()
+    elif POOL_PREWARM:
+        await loop.run_in_executor(browser_executor, prewarm_pools)
+    print(f"🖥️ 浏览器节点 {WORKER_ID} 已就绪 ({WORKERS} 个并发任务)")
+    if browser_sessions is not None:
+        browser_sessions.start(warm_session)
+
+    slots = asyncio.Semaphore(WORKERS)
+    running = set()
+    try:
+        while True:
+            await slots.acquire()
+            job = await loop.run_in_executor(None, shared_state.claim_job, WORKER_ID)
+            if job is None:
+                slots.release()
+                await asyncio.sleep(SHARED_POLL)
+                continue
+            task = asyncio.ensure_future(run_browser_job(*job, slots))
+            running.add(task)
+            task.add_done_callback(running.discard)
+    finally:
+        for task in running:
+            task.cancel()
+        if browser_sessions is not None:
+            await browser_sessions.close()
+        await cdp_engine.close()
+        standard_pool.close()
+        stealth_pool.close()
+        browser_executor.shutdown(wait=False)
+        shared_state.close()
+
+async def extract_tiered(url: str, deadline: float, stream: bool = False, lane="interactive"):
+    """分层提取: HTTP快速通道 -> 准入控制 -> 浏览器池"""
+    loop = asyncio.get_running_loop()
+    timeout = max(deadline - loop.time(), 0)
+    escalation = None
+
+    # ⚡ 先走HTTP快速通道，反检测网站直接使用浏览器
+    if FAST_PATH and not web_agent.needs_stealth(url):
+        result, escalation = await fast_fetch_and_extract(url, min(FAST_PATH_TIMEOUT, timeout), stream)
+        if result is not None:
+            return result
+
+    # 🚦 先获得浏览器准入名额，队列已满或排队超时则快速拒绝
+    try:
+        with span("admission_wait"):
+            await admission.acquire(timeout=max(deadline - loop.time(), 0), lane=lane)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=f"🚦 FoxRead overloaded ({e.reason}) - 狐狸太忙了，请稍后再来",
+            headers={"Retry-After": str(e.retry_after)}
         )
-        
+
+    # 🦊 狡黠地借用常驻浏览器提取内容
+    remaining = max(deadline - loop.time(), 1)
+    future = asyncio.ensure_future(browser_fetch(url, remaining, stream))
+    admission.release_when_done(future)
+    try:
+        result = await asyncio.wait_for(asyncio.shield(future), timeout=remaining)
+        if escalation:
+            result["escalation_reason"] = escalation
+        return result
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=408, detail="⏰ FoxRead timeout - 狐狸需要更多时间")
+    except PoolExhausted as e:
+        raise HTTPException(status_code=503, detail=f"🚫 FoxRead busy: {e}", headers={"Retry-After": "5"})
+
+async def extract_with_webagent(url: str, timeout: int = 30, stream: bool = False, lane="interactive"):
+    """🦊 使用狐狸般的智慧提取网页内容"""
+    # ⏱️ 分阶段计时 (导出到 /metrics，也可随响应返回)
+    timings = start_timings()
+    result = {}
+    status = "error"
+    try:
+        deadline = asyncio.get_running_loop().time() + timeout
+
+        # 🐾 按域名礼貌限速，避免突发请求触发反爬
         try:
-            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
-        except asyncio.TimeoutError:
-            process.kill()
-            raise HTTPException(status_code=408, detail="⏰ FoxRead timeout - 狐狸需要更多时间")
-        
-        if process.returncode != 0:
-            error_msg = stderr.decode('utf-8') if stderr else "Unknown error"
-            raise HTTPException(status_code=500, detail=f"🚫 FoxRead failed: {error_msg}")
-        
+            with span("politeness_wait"):
+                limiter = await politeness.acquire(url, time.monotonic() + timeout)
+        except Throttled as e:
+            raise HTTPException(
+                status_code=429,
+                detail=f"🐾 {e.domain} 请求过于频繁 - 狐狸放慢了脚步",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+
+        outcome = "failure"
         try:
-            result = json.loads(stdout.decode('utf-8'))
+            result = await extract_tiered(url, deadline, stream, lane)
+            outcome = status = hunt_outcome(result)
+            result["timings"] = timings.as_dict()
             return result
-        except json.JSONDecodeError as e:
-            raise HTTPException(status_code=500, detail=f"🔧 Failed to parse content: {e}")
+        except HTTPException as e:
+            # 本服务过载不是目标网站的问题，不调整该域名速率
+            if e.status_code in (429, 503):
+                outcome = "skipped"
+            raise
+        finally:
+            await limiter.release(outcome)
             
+    except HTTPException as e:
+        status = f"http_{e.status_code}"
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"🦊 FoxRead extraction failed: {str(e)}")
+    finally:
+        observe(url, result.get("tier"), status, timings)
+
+def hunt_succeeded(result: dict) -> bool:
+    """提取结果是否成功"""
+    content = result.get('content', '')
+    return not (result.get('blocked') or content.startswith('访问失败') or '荒原' in content)
+
+def hunt_outcome(result: dict) -> str:
+    """提取结果分类，用于域名自适应限速"""
+    if looks_like_challenge(result.get('title', ''), result.get('content', '')):
+        result["blocked"] = True
+        return "challenge"
+    return "success" if hunt_succeeded(result) else "failure"
+
+async def run_revalidation(url: str, etag: Optional[str], last_modified: Optional[str]):
+    key = normalize_url(url)
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, revalidate, url, etag, last_modified)
+    finally:
+        revalidating.discard(key)
+
+async def extract_and_store(url: str, timeout: int, lane: Lane):
+    """提取并写入缓存 (由single-flight的共享任务执行，等待者全部离开也会完成)"""
+    result = await extract_with_webagent(url, timeout, lane=lane)
+    if CACHE_ENABLED and hunt_succeeded(result):
+        validators = result.get('validators') or {}
+        content_cache.put(url, result, validators.get('etag'), validators.get('last_modified'))
+    return result
+
+async def extract_coalesced(url: str, timeout: int, lane: Lane):
+    """🌐 跨worker单飞: 其他进程正在提取同一URL时等待它写入共享缓存，而不是重复打开浏览器"""
+    if shared_state is None or not CACHE_ENABLED or content_cache.disk is None:
+        return await extract_and_store(url, timeout, lane)
+    loop = asyncio.get_running_loop()
+    key = f"extract:{normalize_url(url)}"
+    deadline = loop.time() + timeout
+    intervals = poll_intervals()
+    while True:
+        if await loop.run_in_executor(None, shared_state.try_lease, key, WORKER_ID, timeout + 5):
+            try:
+                return await extract_and_store(url, timeout, lane)
+            finally:
+                await loop.run_in_executor(None, shared_state.release_lease, key, WORKER_ID)
+        if loop.time() >= deadline:
+            raise HTTPException(status_code=408, detail="⏰ FoxRead timeout - 狐狸需要更多时间")
+        await asyncio.sleep(min(next(intervals), max(0.0, deadline - loop.time())))
+        entry = await loop.run_in_executor(None, content_cache.get_shared, url)
+        if entry is not None:
+            single_flight.stats["shared_coalesced"] += 1
+            return entry.result
+
+async def cached_extract(url: str, timeout: int = 30, max_age: Optional[int] = None, no_cache: bool = False,
+                        stream: bool = False, lane: str = "interactive"):
+    """🗃️ 带缓存的内容提取，返回 (result, 缓存状态)；lane 为等待浏览器名额的通道"""
+    if CACHE_ENABLED and not no_cache:
+        loop = asyncio.get_running_loop()
+        if content_cache.disk is not None:
+            entry, state = await loop.run_in_executor(None, content_cache.get, url, max_age)
+        else:
+            entry, state = content_cache.get(url, max_age)
+
+        if state == "stale":
+            # 先返回旧内容，后台用ETag/Last-Modified重新验证
+            key = normalize_url(url)
+            if key not in revalidating:
+                revalidating.add(key)
+                asyncio.ensure_future(run_revalidation(url, entry.etag, entry.last_modified))
+        if entry is not None:
+            CACHE_LOOKUPS.inc(state)
+            return entry.result, state
+
+    state = "miss" if CACHE_ENABLED and not no_cache else "bypass"
+    CACHE_LOOKUPS.inc(state)
+    if stream:
+        # 流式提取的分块只属于本次请求，不与其他请求合并；写入缓存在发送完成后进行 (见 stream_body)
+        return await extract_with_webagent(url, timeout, stream=True), state
+    result = await single_flight.run(normalize_url(url), lambda shared_lane: extract_coalesced(url, timeout, shared_lane),
+                                     timeout, lane)
+    return result, state
+
+def build_response_data(result: dict, url: str, cache_state: str) -> dict:
+    """组装 /api 的JSON响应"""
+    success = hunt_succeeded(result)
+    content = result.get('content', '')
+    return {
+        "service": "🦊 FoxRead",
+        "title": result.get('title', ''),
+        "url": result.get('url', url),
+        "content": content,
+        "success": success,
+        "content_length": len(content),
+        "tier": result.get('tier', ''),
+        "cache": cache_state,
+        "resources": result.get('resources'),
+        "readiness": result.get('readiness'),
+        "node": result.get('node'),
+        "truncated": result.get('truncated', False),
+        "fox_status": "🦊 Successfully hunted!" if success else "🦊 Prey escaped this time",
+        "extraction_quality": "🔥 Excellent" if len(content) > 1000 else "⚡ Good" if len(content) > 200 else "📝 Basic"
+    }
+
+def response_timings(result: dict, cache_state: str, started: float) -> dict:
+    """?timings=true 时返回的耗时: 本次请求总耗时，未命中缓存时附带提取各阶段耗时"""
+    timings = {"request": round(time.perf_counter() - started, 4)}
+    if cache_state in ("miss", "bypass") and result.get('timings'):
+        timings["extraction"] = result['timings']
+    return timings
+
+async def probe_changes(url: str, watch: Optional[dict]):
+    """🔍 变化检测的HTTP探测，同样遵守域名限速"""
+    try:
+        limiter = await politeness.acquire(url, time.monotonic() + CHANGE_PROBE_TIMEOUT)
+    except Throttled as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"🐾 {e.domain} 请求过于频繁 - 狐狸放慢了脚步",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    verdict, evidence = "unknown", ""
+    try:
+        verdict, evidence, signals = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: probe_page(url, watch, static_site=web_agent.is_static_site(url)))
+        return verdict, evidence, signals
+    finally:
+        await limiter.release("challenge" if evidence == "challenge" else "success" if verdict != "unknown" else "skipped")
+
+def unchanged_response(url: str, watch: dict, evidence: str) -> dict:
+    return {
+        "service": "🦊 FoxRead",
+        "url": url,
+        "changed": False,
+        "version": watch["version"],
+        "evidence": evidence,
+        "changed_at": watch["changed_at"],
+        "fox_status": "🦊 Nothing new in the forest"
+    }
+
+async def changed_response(url: str, response_data: dict, content: str, version: int, base: int,
+                           evidence: str) -> dict:
+    """内容与客户端持有的版本 base 不同: 返回当前结果和差异；base 已被淘汰或不存在时 evidence 为 unknown_base，不带差异"""
+    loop = asyncio.get_running_loop()
+    previous = await loop.run_in_executor(None, change_store.content, url, base) if base else None
+    if base and previous is None:
+        CHANGE_CHECKS.inc("unknown_base")
+        return {**response_data, "changed": True, "version": version, "evidence": "unknown_base", "diff": None}
+    CHANGE_CHECKS.inc("changed" if base else "first_seen")
+    diff = await loop.run_in_executor(None, content_diff, previous[1], content, base, version) if previous else None
+    return {**response_data, "changed": True, "version": version, "evidence": evidence, "diff": diff}
+
+async def detect_changes(url: str, since: Optional[int]) -> dict:
+    """🔍 变化检测: 探测能确定内容未变时不渲染，直接返回 changed=false (或与 since 版本比较保存的正文)；
+    否则完整提取，与客户端持有的版本 (since，默认上一版本) 比较正文并返回差异"""
+    loop = asyncio.get_running_loop()
+    watch = await loop.run_in_executor(None, change_store.get, url)
+    if since is not None and (since < 1 or (watch is not None and since > watch["version"])):
+        latest = watch["version"] if watch is not None else None
+        raise HTTPException(status_code=400, detail=f"🚫 since={since} 不是该URL的版本 (最新版本: {latest})")
+    verdict, evidence, signals = await probe_changes(url, watch)
+    if verdict == "unchanged" and (since is None or since == watch["version"]):
+        await loop.run_in_executor(None, change_store.checked, url, signals)
+        CHANGE_CHECKS.inc("probe_unchanged")
+        return unchanged_response(url, watch, evidence)
+    if verdict == "unchanged":
+        # 页面没变，客户端的版本较旧: 用保存的当前版本正文做差异，不再渲染
+        stored = await loop.run_in_executor(None, change_store.content, url, watch["version"])
+        if stored is not None:
+            await loop.run_in_executor(None, change_store.checked, url, signals)
+            title, content = stored
+            response_data = build_response_data({"title": title, "url": url, "content": content}, url, "stored")
+            return await changed_response(url, response_data, content, watch["version"], since, evidence)
+
+    result, cache_state = await cached_extract(url, TIMEOUT, no_cache=True)
+    response_data = build_response_data(result, url, cache_state)
+    if not response_data["success"]:
+        # 失败或验证页面不算新版本
+        CHANGE_CHECKS.inc("failed")
+        return {**response_data, "changed": None, "evidence": evidence}
+
+    content = result.get('content', '')
+    version, changed = await loop.run_in_executor(
+        None, change_store.record, url, response_data["title"], content, signals)
+    base = since if since is not None else (version - 1 if changed else version)
+    if base == version:
+        # 用记录之后的状态作答 (首次见到的URL此前没有watch)
+        CHANGE_CHECKS.inc("render_unchanged")
+        watch = await loop.run_in_executor(None, change_store.get, url)
+        return unchanged_response(url, watch, "content")
+    return await changed_response(url, response_data, content, version, base, evidence)
+
+MARKDOWN_FOOTER = "\n\n---\n*Extracted by 🦊 FoxRead - 狡黠的内容猎手*"
+
+def render_markdown(response_data: dict, markdown: Optional[str] = None) -> str:
+    """Markdown输出: 优先使用提取引擎生成的结构化Markdown"""
+    body = markdown or response_data['content']
+    if body.startswith('# '):
+        return body + MARKDOWN_FOOTER
+    return f"# {response_data['title']}\n\n{body}{MARKDOWN_FOOTER}"
+
+RESPONSE_MEDIA_TYPES = {"json": "application/json", "text": "text/plain", "markdown": "text/markdown"}
+
+def response_etag(result: dict, url: str, format: str) -> str:
+    """🏷️ 由提取内容计算的强ETag，缓存状态、耗时等元数据变化不影响"""
+    markdown = result.get('markdown') if format == "markdown" else ""
+    return compression.content_etag(format, result.get('url', url), result.get('title', ''), result.get('content', ''), markdown)
+
+async def compress_body(body: bytes, encoding: str) -> bytes:
+    """🗜️ 压缩响应正文，较大的正文放到线程池避免阻塞事件循环"""
+    started = time.perf_counter()
+    if len(body) >= 256 * 1024:
+        compressed = await asyncio.get_running_loop().run_in_executor(None, compression.compress, body, encoding)
+    else:
+        compressed = compression.compress(body, encoding)
+    COMPRESS_DURATION.observe(time.perf_counter() - started, encoding)
+    return compressed
+
+async def compress_stream(chunks, encoding: str):
+    """流式响应逐块压缩"""
+    compressor = compression.StreamCompressor(encoding)
+    try:
+        async for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        await chunks.aclose()
+
+async def content_chunks(result: dict):
+    """(纯文本, Markdown) 分块: 流式结果按提取进度产出，缓存中的完整结果按分块大小切片"""
+    if "stream" in result:
+        yield result["content"], result["markdown"]
+        async for chunk in result["stream"]:
+            yield chunk
+        return
+    size = STREAM_CHUNK_KB * 1024
+    text, markdown = result.get('content', ''), result.get('markdown') or ''
+    for offset in range(0, max(len(text), len(markdown)), size):
+        yield text[offset:offset + size], markdown[offset:offset + size]
+
+async def stream_body(result: dict, url: str, cache_state: str, format: str, started: float, timings: bool):
+    """🌊 流式响应: 先发送标题和元数据，再逐块发送正文。
+    每次只持有一个分块；流式提取的结果不超过 STREAM_CACHE_MAX_MB 时顺便写入缓存"""
+    response_data = build_response_data(result, url, cache_state)
+    has_markdown = "stream" in result or bool(result.get('markdown'))
+    cacheable = CACHE_ENABLED and "stream" in result and hunt_succeeded(result)
+    kept, kept_size, content_length = ([], []), 0, 0
+
+    if format == "json":
+        meta = {key: value for key, value in response_data.items()
+                if key not in ("content", "content_length", "extraction_quality")}
+        yield json.dumps({"event": "meta", **meta}, ensure_ascii=False) + "\n"
+    elif format == "markdown" and not (result.get('markdown') or result.get('content', '')).startswith('# '):
+        yield f"# {response_data['title']}\n\n"
+
+    error = None
+    try:
+        async for text, markdown in content_chunks(result):
+            content_length += len(text)
+            if cacheable:
+                kept_size += len(text) + len(markdown)
+                if kept_size > STREAM_CACHE_MAX_MB * 1024 * 1024:
+                    cacheable, kept = False, ([], [])
+                else:
+                    kept[0].append(text)
+                    kept[1].append(markdown)
+            if format == "json":
+                if text:
+                    yield json.dumps({"event": "content", "content": text}, ensure_ascii=False) + "\n"
+            elif format == "markdown":
+                yield markdown if has_markdown else text
+            else:
+                yield text
+    except WorkerFailed as e:
+        print(f"⚠️  流式提取中断: {e}", file=sys.stderr)
+        error = str(e)
+    finally:
+        if "stream" in result:
+            await result["stream"].aclose()
+
+    if format == "json":
+        done = {"event": "done", "content_length": content_length,
+                "success": response_data["success"] and error is None,
+                "extraction_quality": "🔥 Excellent" if content_length > 1000 else "⚡ Good" if content_length > 200 else "📝 Basic"}
+        if error:
+            done["error"] = error
+        if timings:
+            done["timings"] = response_timings(result, cache_state, started)
+        yield json.dumps(done, ensure_ascii=False) + "\n"
+    elif format == "markdown":
+        yield MARKDOWN_FOOTER
+
+    if cacheable and error is None:
+        complete = {key: value for key, value in result.items() if key != "stream"}
+        complete["content"], complete["markdown"] = "".join(kept[0]), "".join(kept[1])
+        validators = result.get('validators') or {}
+        content_cache.put(url, complete, validators.get('etag'), validators.get('last_modified'))
 
 @app.get("/")
 async def foxread_home():
@@ -83,9 +1030,13 @@ async def foxread_home():
         },
         "endpoints": {
             "extract": "GET /extract/{url:path}?format={format}",
-            "api": "GET /api?url={url}&format={format}",
-            "test": "GET /test - 🧪 测试FoxRead能力",
-            "health": "GET /health - 💚 健康检查"
+            "api": "GET /api?url={url}&format={format}&max_age={seconds}&no_cache={bool}&timings={bool}&stream={bool}",
+            "batch": "POST /batch {urls: [...], format} - 📦 NDJSON流式批量提取",
+            "archive": "GET /archive?url={url} / GET /archive/extract?url={url}&at={timestamp} - 🗄️ 归档版本与重新提取",
+            "jobs": "POST /jobs {url, format, priority, webhook} / GET /jobs/{id} - 📮 异步任务",
+            "test": "GET /test?mode={live|record|replay}&cases={ids}&tiers={http,browser}&update_baseline={bool} - 🧪 测试FoxRead能力",
+            "health": "GET /health - 💚 健康检查",
+            "metrics": "GET /metrics - 📈 Prometheus指标"
         },
         "fox_wisdom": "🦊 在信息的森林里，做最聪明的猎手"
     }
@@ -94,17 +1045,50 @@ async def foxread_home():
 async def foxread_health():
     """💚 FoxRead 健康检查"""
     web_agent_available = os.path.exists(WEB_AGENT_PATH)
+    if CACHE_ENABLED and content_cache.disk is not None:
+        await asyncio.get_running_loop().run_in_executor(None, content_cache.count_disk)
     return {
         "status": "🟢 Healthy" if web_agent_available else "🟡 Limited", 
         "service": "🦊 FoxRead API",
         "web_agent_available": web_agent_available,
         "web_agent_path": WEB_AGENT_PATH,
+        "cache": content_cache.stats() if CACHE_ENABLED else {"enabled": False},
+        "single_flight": single_flight.snapshot(),
+        "admission": admission.stats(),
+        "politeness": politeness.stats(),
+        "readiness": readiness_stats.snapshot(),
+        "startup": startup,
+        "environment": {key: bootstrap.settings().get(key) for key in
+                        ("source", "chrome_version", "chromedriver", "chromedriver_version", "missing_dependencies")},
+        "engine": "selenium" if not use_cdp() else "cdp",
+        "cdp_engine": {**cdp_engine.stats(), "fallback": cdp_fallback},
+        "extract_workers": extract_workers.stats() if extract_workers is not None else {"workers": 0},
+        "jobs": job_runner.stats(),
+        "archive": page_archive.stats() if page_archive is not None else {"enabled": False},
+        "changes": change_store.stats(),
+        "sessions": await browser_sessions.stats() if browser_sessions is not None else {"mode": "off"},
+        "role": ROLE,
+        "worker_id": WORKER_ID,
+        "shared_state": shared_state.stats() if shared_state is not None else None,
+        "browser_pools": {
+            "standard": standard_pool.stats(),
+            "stealth": stealth_pool.stats()
+        },
         "fox_status": "🦊 Ready to hunt!" if web_agent_available else "🦊 Missing hunting tools"
     }
 
+@app.get("/metrics")
+async def foxread_metrics():
+    """📈 Prometheus 指标"""
+    return PlainTextResponse(content=registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api")
-async def foxread_extract_api(url: str, format: str = "json"):
+async def foxread_extract_api(url: str, format: str = "json", max_age: Optional[int] = None, no_cache: bool = False,
+                              timings: bool = False, stream: bool = False, changes: bool = False,
+                              since: Optional[int] = None,
+                              accept_encoding: Optional[str] = Header(None), if_none_match: Optional[str] = Header(None)):
     """🦊 FoxRead API方式内容提取"""
+    started = time.perf_counter()
     # URL 智能处理
     try:
         parsed = urlparse(url)
@@ -112,33 +1096,89 @@ async def foxread_extract_api(url: str, format: str = "json"):
             url = f"https://{url}"
     except:
         raise HTTPException(status_code=400, detail="🚫 Invalid URL - 狐狸看不懂这个地址")
-    
+
+    # 🔍 变化检测模式总是返回JSON (未变化时只有 changed=false 和版本号)
+    if changes:
+        response_data = await detect_changes(url, since)
+        if timings:
+            response_data["timings"] = {"request": round(time.perf_counter() - started, 4)}
+        return JSONResponse(content=response_data)
+
     # 🦊 狡黠地提取内容
-    result = await extract_with_webagent(url, 30)
-    success = not (result.get('content', '').startswith('访问失败') or '荒原' in result.get('content', ''))
-    
-    response_data = {
-        "service": "🦊 FoxRead",
-        "title": result.get('title', ''),
-        "url": result.get('url', url),
-        "content": result.get('content', ''),
-        "success": success,
-        "content_length": len(result.get('content', '')),
-        "fox_status": "🦊 Successfully hunted!" if success else "🦊 Prey escaped this time",
-        "extraction_quality": "🔥 Excellent" if len(result.get('content', '')) > 1000 else "⚡ Good" if len(result.get('content', '')) > 200 else "📝 Basic"
-    }
+    result, cache_state = await cached_extract(url, TIMEOUT, max_age=max_age, no_cache=no_cache, stream=stream)
+    if startup["first_request_seconds"] is None:
+        startup["first_request_seconds"] = round(time.perf_counter() - started, 3)
+
+    if format not in ("text", "markdown"):
+        format = "json"
+    # 🗜️ 按 Accept-Encoding 协商压缩
+    encoding = compression.negotiate(accept_encoding)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    # 🌊 流式响应 (分块传输): json 格式按行输出 meta / content / done 事件
+    if stream:
+        media_type = {"text": "text/plain; charset=utf-8", "markdown": "text/markdown; charset=utf-8",
+                      "json": "application/x-ndjson"}[format]
+        body = stream_body(result, url, cache_state, format, started, timings)
+        if encoding:
+            body = compress_stream(body, encoding)
+        return StreamingResponse(body, media_type=media_type, headers=headers)
+
+    # 🏷️ 内容未变时返回304 (?timings=true 的响应每次不同，不带ETag)
+    if not timings:
+        etag = response_etag(result, url, format)
+        headers["ETag"] = compression.encoded_etag(etag, encoding)
+        if compression.etag_matches(if_none_match, etag):
+            NOT_MODIFIED.inc()
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=headers)
+
+    # 命中缓存时直接使用缓存条目旁预先压缩好的正文
+    variant = f"{format}:{cache_state}:{encoding}"
+    reusable = CACHE_ENABLED and encoding is not None and cache_state in ("hit", "stale") and not timings
+    stored = content_cache.variant(url, result, variant) if reusable else None
+    if stored is not None:
+        raw_size, body = stored
+        RESPONSE_BYTES.inc(encoding, "raw", amount=raw_size)
+        RESPONSE_BYTES.inc(encoding, "sent", amount=len(body))
+        return Response(content=body, media_type=RESPONSE_MEDIA_TYPES[format], headers=headers)
+
+    response_data = build_response_data(result, url, cache_state)
+    if timings:
+        response_data["timings"] = response_timings(result, cache_state, started)
     
     # 根据格式返回
+    serialize_started = time.perf_counter()
     if format == "text":
-        return PlainTextResponse(content=response_data['content'])
+        response = PlainTextResponse(content=response_data['content'])
     elif format == "markdown":
-        markdown_content = f"# {response_data['title']}\n\n{response_data['content']}\n\n---\n*Extracted by 🦊 FoxRead - 狡黠的内容猎手*"
-        return PlainTextResponse(content=markdown_content, media_type="text/markdown")
+        response = PlainTextResponse(content=render_markdown(response_data, result.get('markdown')), media_type="text/markdown")
     else:
-        return JSONResponse(content=response_data)
+        response = JSONResponse(content=response_data)
+    SERIALIZE_DURATION.observe(time.perf_counter() - serialize_started, format)
+
+    raw_size = len(response.body)
+    if encoding and raw_size >= compression.COMPRESS_MIN_BYTES:
+        response.body = await compress_body(response.body, encoding)
+        response.headers["content-length"] = str(len(response.body))
+        if reusable:
+            content_cache.store_variant(url, result, variant, (raw_size, response.body))
+    else:
+        headers.pop("Content-Encoding", None)
+        if "ETag" in headers:
+            headers["ETag"] = compression.encoded_etag(etag, None)
+    response.headers.update(headers)
+    RESPONSE_BYTES.inc(headers.get("Content-Encoding", "identity"), "raw", amount=raw_size)
+    RESPONSE_BYTES.inc(headers.get("Content-Encoding", "identity"), "sent", amount=len(response.body))
+    return response
 
 @app.get("/extract/{url:path}")
-async def foxread_extract_direct(url: str, format: str = "markdown"):
+async def foxread_extract_direct(url: str, format: str = "markdown", max_age: Optional[int] = None, no_cache: bool = False,
+                                 timings: bool = False, stream: bool = False, changes: bool = False,
+                                 since: Optional[int] = None,
+                                 accept_encoding: Optional[str] = Header(None), if_none_match: Optional[str] = Header(None)):
     """🦊 FoxRead 直接路径方式提取 (类似jina.ai)"""
     if not url.startswith(('http://', 'https://')):
         if url.startswith('//'):
@@ -146,88 +1186,273 @@ async def foxread_extract_direct(url: str, format: str = "markdown"):
         else:
             url = f"https://{url}"
     
-    return await foxread_extract_api(url=url, format=format)
+    return await foxread_extract_api(url=url, format=format, max_age=max_age, no_cache=no_cache, timings=timings,
+                                     stream=stream, changes=changes, since=since,
+                                     accept_encoding=accept_encoding, if_none_match=if_none_match)
 
-@app.get("/test")
-async def foxread_capability_test():
-    """🧪 FoxRead 能力测试 - 展示狐狸的狡黠"""
-    test_urls = [
-        {
-            "url": "https://zhuanlan.zhihu.com/p/579628061",
-            "description": "知乎专栏 - 法律类文章",
-            "difficulty": "🔥 困难 (反爬虫)"
-        },
-        {
-            "url": "https://zhuanlan.zhihu.com/p/400000000", 
-            "description": "知乎专栏 - 技术类文章",
-            "difficulty": "🔥 困难 (反爬虫)"
-        }
-    ]
-    
-    results = []
-    total_success = 0
-    
-    for test_case in test_urls:
-        url = test_case["url"]
+class BatchRequest(BaseModel):
+    urls: List[str]
+    format: str = "json"
+    max_age: Optional[int] = None
+    no_cache: bool = False
+    timeout: int = TIMEOUT
+
+@asynccontextmanager
+async def batch_slot(key: str, limit: int):
+    """批量提取的并发限制 (全局 + 每个域名)，所有批次共享；该域名没有请求时删除条目，长尾域名不会累积"""
+    entry = batch_limits.get(key)
+    if entry is None:
+        entry = batch_limits[key] = [asyncio.Semaphore(limit), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and batch_limits.get(key) is entry:
+            del batch_limits[key]
+
+async def extract_batch_item(index: int, url: str, request: BatchRequest) -> dict:
+    """提取批量中的一项，错误写在结果里而不是中断整个批次"""
+    if not url.startswith(('http://', 'https://')):
+        url = f"https:{url}" if url.startswith('//') else f"https://{url}"
+    domain = urlparse(url).netloc.lower()
+
+    try:
+        async with batch_slot("*", BATCH_CONCURRENCY), batch_slot(domain, BATCH_DOMAIN_CONCURRENCY):
+            result, cache_state = await cached_extract(url, request.timeout, max_age=request.max_age, no_cache=request.no_cache)
+    except HTTPException as e:
+        return {"index": index, "url": url, "success": False, "status_code": e.status_code, "error": e.detail}
+    except Exception as e:
+        return {"index": index, "url": url, "success": False, "status_code": 500, "error": f"🦊 FoxRead extraction failed: {e}"}
+
+    item = build_response_data(result, url, cache_state)
+    item["index"] = index
+    if request.format == "markdown":
+        item["content"] = render_markdown(item, result.get('markdown'))
+    return item
+
+@app.post("/batch")
+async def foxread_batch(request: BatchRequest):
+    """📦 批量提取 - 按完成顺序以NDJSON流式返回"""
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="🚫 Empty batch - 狐狸没有猎物")
+    if len(request.urls) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=413, detail=f"🚫 Batch too large - 最多 {BATCH_MAX_URLS} 个URL")
+
+    async def stream():
+        tasks = [asyncio.ensure_future(extract_batch_item(i, url, request)) for i, url in enumerate(request.urls)]
+        successful = 0
         try:
-            result = await extract_with_webagent(url, 30)
-            success = not (result.get('content', '').startswith('访问失败') or '荒原' in result.get('content', ''))
-            content_length = len(result.get('content', ''))
-            
-            if success:
-                total_success += 1
-                
-            quality = "🔥 Excellent" if content_length > 1000 else "⚡ Good" if content_length > 200 else "📝 Basic"
-            
-            results.append({
-                "url": url,
-                "description": test_case["description"],
-                "difficulty": test_case["difficulty"],
-                "title": result.get('title', ''),
-                "content_length": content_length,
-                "success": success,
-                "quality": quality,
-                "fox_result": "🦊 Hunted successfully!" if success else "🦊 Prey was too clever",
-                "preview": result.get('content', '')[:200] + "..." if result.get('content') else ""
-            })
-        except Exception as e:
-            results.append({
-                "url": url,
-                "description": test_case["description"], 
-                "difficulty": test_case["difficulty"],
-                "error": str(e),
-                "success": False,
-                "fox_result": f"🦊 Encountered obstacle: {str(e)[:50]}..."
-            })
-    
-    success_rate = (total_success / len(test_urls)) * 100
-    
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                successful += bool(item.get("success"))
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+            yield json.dumps({
+                "done": True,
+                "total": len(tasks),
+                "successful": successful,
+                "failed": len(tasks) - successful
+            }, ensure_ascii=False) + "\n"
+        finally:
+            # 客户端断开时取消尚未完成的项目
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+def require_archive():
+    if page_archive is None:
+        raise HTTPException(status_code=404, detail="🗄️ 页面归档未启用 (设置 FOXREAD_ARCHIVE_DIR)")
+
+@app.get("/archive")
+async def foxread_archive_versions(url: str):
+    """🗄️ 某个URL的所有归档版本"""
+    require_archive()
+    versions = await asyncio.get_running_loop().run_in_executor(archive_executor, page_archive.versions, url)
+    return {"url": url, "versions": versions}
+
+@app.get("/archive/extract")
+async def foxread_archive_extract(url: str, at: Optional[float] = None, format: str = "json"):
+    """🗄️ 用当前提取器重新提取归档中的页面 (at 时刻之前最近的版本，默认最新)，不访问网络"""
+    require_archive()
+    page = await asyncio.get_running_loop().run_in_executor(archive_executor, page_archive.load, url, at)
+    if page is None:
+        raise HTTPException(status_code=404, detail="🗄️ 没有该URL的归档 - 狐狸没存过这只猎物")
+    result = await extract_page(page["html"], page["url"], page["title"])
+    response_data = build_response_data(result, page["url"], "archive")
+    response_data.update(tier=f"archive:{page['tier']}", archived_at=page["fetched_at"], digest=page["digest"])
+    if format == "markdown":
+        return PlainTextResponse(content=render_markdown(response_data, result.get('markdown')),
+                                 media_type="text/markdown; charset=utf-8")
+    return response_data
+
+class JobRequest(BaseModel):
+    url: str
+    format: str = "json"
+    max_age: Optional[int] = None
+    no_cache: bool = False
+    timeout: int = JOB_TIMEOUT
+    priority: int = 0
+    webhook: Optional[str] = None
+
+async def run_job(job: dict) -> dict:
+    """📮 执行异步任务: 走 bulk 通道，浏览器名额空出时交互式请求先得到"""
+    options = job["options"]
+    result, cache_state = await cached_extract(job["url"], int(job["timeout"]), max_age=options.get("max_age"),
+                                               no_cache=options.get("no_cache", False), lane="bulk")
+    item = build_response_data(result, job["url"], cache_state)
+    if options.get("format") == "markdown":
+        item["content"] = render_markdown(item, result.get('markdown'))
+    return item
+
+@app.post("/jobs", status_code=202)
+async def foxread_create_job(request: JobRequest):
+    """📮 创建异步提取任务，立即返回任务ID"""
+    url = request.url
+    if not url.startswith(('http://', 'https://')):
+        url = f"https:{url}" if url.startswith('//') else f"https://{url}"
+    if request.webhook and not request.webhook.startswith(('http://', 'https://')):
+        raise HTTPException(status_code=400, detail="🚫 webhook必须是http(s)地址")
+    options = {"format": request.format, "max_age": request.max_age, "no_cache": request.no_cache}
+    job_id = await asyncio.get_running_loop().run_in_executor(
+        None, lambda: job_store.create(url, options, request.priority, request.timeout, request.webhook))
+    job_runner.notify()
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "url": url, "status_url": f"/jobs/{job_id}"},
+        headers={"Location": f"/jobs/{job_id}"}
+    )
+
+@app.get("/jobs/{job_id}")
+async def foxread_get_job(job_id: str):
+    """📮 查询任务状态，完成后带提取结果"""
+    job = await asyncio.get_running_loop().run_in_executor(None, job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="🚫 Job not found - 狐狸没找到这个任务")
+    return job
+
+@app.delete("/jobs/{job_id}")
+async def foxread_cancel_job(job_id: str):
+    """📮 取消尚未开始的任务"""
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(None, job_store.cancel, job_id):
+        job = await loop.run_in_executor(None, job_store.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="🚫 Job not found - 狐狸没找到这个任务")
+        raise HTTPException(status_code=409, detail=f"🚫 Job is {job['status']} - 只能取消排队中的任务")
+    return {"job_id": job_id, "status": "cancelled"}
+
+async def capability_fetch(url: str, tier: str, timeout: float) -> dict:
+    """🧪 能力测试按指定层级获取页面 (不经过缓存)，同样遵守域名限速和准入控制"""
+    loop = asyncio.get_running_loop()
+    limiter = await politeness.acquire(url, time.monotonic() + timeout)
+    outcome = "failure"
+    try:
+        if tier == "http":
+            page = await loop.run_in_executor(None, http_fetcher.fetch, url, timeout)
+            html = page.html if page is not None and page.status_code == 200 else None
+            info = {"title": "", "status_code": page.status_code if page is not None else None}
+            if html:
+                info["complete"] = http_fetcher.assess_completeness(html, static_site=web_agent.is_static_site(url))[1]
+        else:
+            await admission.acquire(timeout=timeout)
+            started = time.monotonic()
+            try:
+                html, title, load_info, tier_name = await browser_page(url, timeout)
+            finally:
+                admission.release(time.monotonic() - started)
+            info = {"title": title, "engine": tier_name, "readiness": load_info.get("readiness")}
+        outcome = "success" if html else "failure"
+        return {"html": html, **info}
+    finally:
+        await limiter.release(outcome)
+
+capability_runner = CapabilityRunner(capability_fetch, extract_page, succeeded=hunt_succeeded)
+
+@app.get("/test")
+async def foxread_capability_test(mode: str = CAPABILITY_MODE, cases: Optional[str] = None, tiers: Optional[str] = None,
+                                  update_baseline: bool = False):
+    """🧪 FoxRead 能力测试 - 展示狐狸的狡黠
+    mode: live (实时) / record (实时并录制页面) / replay (从归档回放，不访问网络)"""
+    if mode not in CAPABILITY_MODES:
+        raise HTTPException(status_code=400, detail=f"🚫 mode 必须是 {', '.join(CAPABILITY_MODES)}")
+    corpus = load_corpus()
+    if cases:
+        wanted = set(cases.split(','))
+        corpus = [case for case in corpus if case["id"] in wanted]
+    results, elapsed = await capability_runner.run(corpus, mode, tiers.split(',') if tiers else None, TIMEOUT)
+    if update_baseline:
+        await asyncio.get_running_loop().run_in_executor(None, update_baselines, results, mode)
+
+    for item in results:
+        if item["status"] in ("ok", "regressed"):
+            item["fox_result"] = "🦊 Hunted successfully!" if item["success"] else "🦊 Prey was too clever"
+        elif item["status"] == "error":
+            item["fox_result"] = f"🦊 Encountered obstacle: {item['error'][:50]}..."
+
+    summary = summarize(results, elapsed)
+    counted = summary["total_tests"]
+    success_rate = summary["successful"] / counted * 100 if counted else 0
+    summary["fox_performance"] = ("🏆 Master Hunter" if success_rate == 100 else
+                                  "⭐ Skilled Hunter" if success_rate >= 80 else "🌱 Learning Hunter")
     return {
         "service": "🦊 FoxRead API",
         "test_name": "🧪 FoxRead 狡黠能力测试",
+        "mode": mode,
         "test_results": results,
-        "summary": {
-            "total_tests": len(test_urls),
-            "successful": total_success,
-            "success_rate": f"{success_rate:.1f}%",
-            "fox_performance": "🏆 Master Hunter" if success_rate == 100 else "⭐ Skilled Hunter" if success_rate >= 80 else "🌱 Learning Hunter"
-        },
+        "summary": summary,
         "fox_wisdom": "🦊 每一次成功的狩猎，都源于智慧和耐心的结合",
-        "timestamp": "2025-10-18"
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
     }
 
 # 🦊 启动入口
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='🦊 FoxRead API')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=HTTP_WORKERS, help='uvicorn worker进程数')
+    parser.add_argument('--timeout', type=int, default=TIMEOUT, help='默认提取超时 (秒)')
+    parser.add_argument('--role', choices=['all', 'frontend', 'worker'], default=ROLE)
+    parser.add_argument('--shared-state', default=SHARED_STATE, help='sqlite:///路径 或 redis://地址')
+    args = parser.parse_args()
+
+    # 多个worker必须共享缓存、单飞和令牌桶，未指定时使用本机SQLite
+    shared = args.shared_state
+    if not shared and (args.workers > 1 or args.role != "all"):
+        shared = "sqlite:///" + data_path("foxread_state.db")
+    # worker进程重新导入本模块，配置通过环境变量传递
+    os.environ.update({
+        "FOXREAD_HOST": args.host,
+        "FOXREAD_PORT": str(args.port),
+        "FOXREAD_TIMEOUT": str(args.timeout),
+        "FOXREAD_HTTP_WORKERS": str(args.workers),
+        "FOXREAD_ROLE": args.role,
+        "FOXREAD_SHARED_STATE": shared,
+    })
+
+    if args.role == "worker":
+        import foxread_api
+        print(f"🖥️ FoxRead 浏览器节点 - 共享状态: {shared}")
+        try:
+            asyncio.run(foxread_api.run_browser_node())
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
     print("🦊" + "="*60 + "🦊")
     print("🦊 FoxRead API - 狡黠的内容猎手")
     print("🦊 \"像狐狸一样聪明地获取网页内容\"")
     print("🦊" + "="*60 + "🦊")
-    print(f"🌟 服务地址: http://{HOST}:{PORT}")
-    print(f"📚 API文档: http://{HOST}:{PORT}/docs") 
-    print(f"🧪 能力测试: http://{HOST}:{PORT}/test")
-    print(f"💚 健康检查: http://{HOST}:{PORT}/health")
+    print(f"🌟 服务地址: http://{args.host}:{args.port}")
+    print(f"📚 API文档: http://{args.host}:{args.port}/docs") 
+    print(f"🧪 能力测试: http://{args.host}:{args.port}/test")
+    print(f"💚 健康检查: http://{args.host}:{args.port}/health")
     print(f"🔧 Web Agent: {WEB_AGENT_PATH}")
+    if args.workers > 1 or args.role != "all":
+        print(f"🌐 {args.workers} 个worker ({args.role}) - 共享状态: {shared}")
     print("🦊" + "="*60 + "🦊")
     print("🦊 FoxRead is ready to hunt! 🏹")
     
-    uvicorn.run(app, host=HOST, port=PORT, reload=False)
+    uvicorn.run("foxread_api:app", host=args.host, port=args.port, workers=args.workers, reload=False,
+                app_dir=os.path.dirname(os.path.abspath(__file__)))
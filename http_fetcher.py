@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead HTTP快速通道
+静态页面直接用长连接HTTP获取，内容足够完整时无需启动浏览器
+"""
+
+import re
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from browser_pool import USER_AGENT
+
+HTTP_POOL_SIZE = 32
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# 完整度判断阈值
+MIN_TEXT_LENGTH = 300
+MIN_TEXT_DENSITY = 0.015
+
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+# JS外壳页面的典型提示
+JS_SHELL_MARKERS = [
+    'enable javascript',
+    'javascript is required',
+    'javascript is disabled',
+    'requires javascript',
+    '请启用javascript',
+    '请开启javascript',
+    '需要启用 javascript',
+]
+
+_STRIP_BLOCKS = re.compile(r'<(script|style|noscript|template|svg)\b[^>]*>.*?</\1\s*>', re.I | re.S)
+_NOSCRIPT = re.compile(r'<noscript\b[^>]*>(.*?)</noscript\s*>', re.I | re.S)
+_TAGS = re.compile(r'<[^>]+>')
+_SPACES = re.compile(r'\s+')
+_EMPTY_APP_ROOT = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt|main-app)["\'][^>]*>\s*</div>', re.I
+)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+_local = threading.local()
+
+
+class HttpPage:
+    """HTTP快速通道获取到的页面"""
+
+    def __init__(self, url, status_code, html, headers):
+        self.url = url
+        self.status_code = status_code
+        self.html = html
+        self.headers = headers
+
+
+def get_session():
+    """每个线程一个长连接Session (requests.Session 非线程安全)"""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update(DEFAULT_HEADERS)
+        _local.session = session
+    return session
+
+
+def fetch(url, timeout=10, headers=None):
+    """HTTP GET获取页面，非HTML或过大的响应返回None"""
+    response = get_session().get(url, timeout=timeout, headers=headers, stream=True)
+    try:
+        content_type = response.headers.get('Content-Type', '').lower()
+        if content_type and 'html' not in content_type:
+            return None
+
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > MAX_BODY_BYTES:
+            return None
+
+        body = response.raw.read(MAX_BODY_BYTES + 1, decode_content=True)
+        if len(body) > MAX_BODY_BYTES:
+            return None
+
+        # requests 对未声明编码的 text/html 默认 ISO-8859-1，中文站点需要重新探测
+        encoding = response.encoding
+        if not encoding or encoding.lower() == 'iso-8859-1':
+            match = _META_CHARSET.search(body[:4096])
+            encoding = match.group(1).decode('ascii') if match else 'utf-8'
+        try:
+            html = body.decode(encoding, errors='replace')
+        except LookupError:
+            html = body.decode('utf-8', errors='replace')
+
+        return HttpPage(response.url, response.status_code, html, response.headers)
+    finally:
+        response.close()
+
+
+def validators(page):
+    """响应的缓存校验器 (ETag, Last-Modified)"""
+    return page.headers.get('ETag'), page.headers.get('Last-Modified')
+
+
+def conditional_headers(etag=None, last_modified=None):
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
+def visible_text(html):
+    """粗略提取可见文本 (仅用于完整度判断)"""
+    text = _STRIP_BLOCKS.sub(' ', html)
+    text = _TAGS.sub(' ', text)
+    return _SPACES.sub(' ', text).strip()
+
+
+def assess_completeness(html, static_site=False):
+    """判断HTTP获取的页面是否足够完整，返回 (是否完整, 原因)"""
+    if not html:
+        return False, "empty"
+
+    text = visible_text(html)
+    if static_site:
+        return (True, "static_site") if text else (False, "empty_text")
+
+    for noscript in _NOSCRIPT.findall(html):
+        lowered = noscript.lower()
+        if any(marker in lowered for marker in JS_SHELL_MARKERS):
+            return False, "noscript_js_required"
+
+    if _EMPTY_APP_ROOT.search(html) and len(text) < MIN_TEXT_LENGTH * 3:
+        return False, "js_app_shell"
+
+    if len(text) < MIN_TEXT_LENGTH:
+        return False, "too_little_text"
+
+    if len(text) / len(html) < MIN_TEXT_DENSITY:
+        return False, "low_text_density"
+
+    return True, "complete"
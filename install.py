@@ -21,7 +21,8 @@ class FoxReadInstaller:
             'selenium>=4.15.0',
             'beautifulsoup4>=4.12.0',
             'webdriver-manager>=4.0.0',
-            'requests>=2.31.0'
+            'requests>=2.31.0',
+            'lxml>=4.9.0'
         ]
         self.install_log = []
         
@@ -191,6 +192,15 @@ except Exception as e:
         self.log("所有功能测试通过！")
         return True
     
+    def pin_browser_environment(self):
+        """解析Chrome和ChromeDriver路径并写入配置文件，服务启动时直接读取"""
+        self.log("📌 固定浏览器和驱动路径...")
+        bootstrap_script = Path(__file__).parent / "bootstrap.py"
+        success, output = self.run_command(f'{sys.executable} "{bootstrap_script}" --write', "写入 foxread_config.json")
+        if not success:
+            self.log("浏览器路径固定失败，服务启动时会重新解析", False)
+        return success
+    
     def create_startup_script(self):
         """创建启动脚本"""
         self.log("📝 创建启动脚本...")
@@ -298,6 +308,10 @@ pause
         if success and not self.test_installation():
             success = False
         
+        # 固定浏览器路径
+        if success:
+            self.pin_browser_environment()
+        
         # 创建启动脚本
         if success:
             self.create_startup_script()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 进程间通信协议
+长度前缀的二进制帧: 5字节头部 (正文长度 + 标志位) + 正文。
+正文优先用 msgpack 编码；未安装时用 JSON 头部 + 原始字节块，大段文本和 bytes 不经过JSON转义。
+较大的帧可选 zstd (未安装时 zlib) 压缩。
+"""
+
+import os
+import json
+import zlib
+import struct
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+HEADER = struct.Struct("!IB")
+FLAG_MSGPACK = 1
+FLAG_ZSTD = 2
+FLAG_ZLIB = 4
+
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+COMPRESS_MIN_BYTES = 64 * 1024
+BLOB_MIN_CHARS = 4096  # JSON后备编码中超过该长度的字符串作为原始字节块传输
+
+# none (默认，本机Unix socket不值得压缩) / zstd / zlib
+COMPRESSION = os.environ.get("FOXREAD_IPC_COMPRESSION", "none")
+
+
+class ProtocolError(Exception):
+    """帧格式错误或超过大小上限"""
+
+
+def _split_blobs(value, blobs):
+    """把 bytes 和长字符串替换成 {"__blob__": i} 引用，原始数据放入 blobs"""
+    if isinstance(value, dict):
+        return {key: _split_blobs(item, blobs) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_split_blobs(item, blobs) for item in value]
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        blobs.append(value)
+        return {"__blob__": len(blobs) - 1}
+    if isinstance(value, str) and len(value) >= BLOB_MIN_CHARS:
+        blobs.append(value.encode('utf-8'))
+        return {"__text__": len(blobs) - 1}
+    return value
+
+
+def _join_blobs(value, blobs):
+    if isinstance(value, dict):
+        if len(value) == 1:
+            if "__blob__" in value:
+                return bytes(blobs[value["__blob__"]])
+            if "__text__" in value:
+                return str(blobs[value["__text__"]], 'utf-8')
+        return {key: _join_blobs(item, blobs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_join_blobs(item, blobs) for item in value]
+    return value
+
+
+def encode(message):
+    """消息 -> (标志位, 正文分段列表)；分段直接交给 writelines/sendmsg，避免拼接复制"""
+    if msgpack is not None:
+        return FLAG_MSGPACK, [msgpack.packb(message, use_bin_type=True)]
+    blobs = []
+    head = json.dumps({"m": _split_blobs(message, blobs), "b": [len(b) for b in blobs]},
+                      ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return 0, [struct.pack("!I", len(head)), head, *blobs]
+
+
+def decode(flags, body):
+    body = memoryview(body)
+    if flags & FLAG_MSGPACK:
+        if msgpack is None:
+            raise ProtocolError("peer sent msgpack but msgpack is not installed")
+        return msgpack.unpackb(body, raw=False)
+    (head_length,) = struct.unpack_from("!I", body)
+    head = json.loads(bytes(body[4:4 + head_length]))
+    blobs, offset = [], 4 + head_length
+    for length in head["b"]:
+        blobs.append(body[offset:offset + length])
+        offset += length
+    return _join_blobs(head["m"], blobs)
+
+
+def compress(flags, parts, compression=None):
+    compression = COMPRESSION if compression is None else compression
+    size = sum(len(p) for p in parts)
+    if compression == "none" or size < COMPRESS_MIN_BYTES:
+        return flags, parts
+    if compression == "zstd" and zstandard is not None:
+        return flags | FLAG_ZSTD, [zstandard.ZstdCompressor(level=3).compress(b"".join(parts))]
+    compressor = zlib.compressobj(1)
+    return flags | FLAG_ZLIB, [compressor.compress(b"".join(parts)) + compressor.flush()]
+
+
+def decompress(flags, body):
+    if flags & FLAG_ZSTD:
+        if zstandard is None:
+            raise ProtocolError("peer sent zstd but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(body, max_output_size=MAX_FRAME_BYTES)
+    if flags & FLAG_ZLIB:
+        return zlib.decompress(body)
+    return body
+
+
+def pack(message, compression=None):
+    """完整的帧 (头部 + 正文分段)"""
+    flags, parts = compress(*encode(message), compression=compression)
+    size = sum(len(p) for p in parts)
+    if size > MAX_FRAME_BYTES:
+        raise ProtocolError(f"frame too large: {size} bytes")
+    return [HEADER.pack(size, flags), *parts]
+
+
+def unpack_header(header):
+    size, flags = HEADER.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ProtocolError(f"frame too large: {size} bytes")
+    return size, flags
+
+
+async def read_message(reader):
+    """从 asyncio.StreamReader 读取一条消息，连接关闭时返回 None"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except EOFError:
+        return None
+    size, flags = unpack_header(header)
+    body = await reader.readexactly(size)
+    return decode(flags, decompress(flags, body))
+
+
+async def write_message(writer, message, compression=None):
+    writer.writelines(pack(message, compression))
+    await writer.drain()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 异步任务
+耗时较长的提取 (如反检测网站) 先返回任务ID，结果通过 GET /jobs/{id} 轮询或webhook回调获取。
+任务保存在SQLite中，服务重启后中断的任务重新排队；同一个任务库可以由多个worker进程共同消费。
+"""
+
+import os
+import hmac
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import hashlib
+import threading
+
+import requests
+
+from shared_state import data_path, ensure_parent
+
+JOB_DB = os.environ.get("FOXREAD_JOB_DB", data_path("foxread_jobs.db"))
+JOB_CONCURRENCY = int(os.environ.get("FOXREAD_JOB_CONCURRENCY", "2"))  # 每个进程同时执行的任务数
+JOB_TIMEOUT = int(os.environ.get("FOXREAD_JOB_TIMEOUT", "120"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("FOXREAD_JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION = int(os.environ.get("FOXREAD_JOB_RETENTION", "86400"))  # 已结束任务的保留时间(秒)
+JOB_POLL = 1.0
+WEBHOOK_TIMEOUT = 10
+WEBHOOK_RETRIES = 3
+WEBHOOK_SECRET = os.environ.get("FOXREAD_WEBHOOK_SECRET", "")
+
+# 这些状态码是暂时性的 (过载、浏览器池耗尽)，任务稍后重试
+RETRYABLE_STATUS = (429, 503)
+# 任务领取后超过 超时+LEASE_GRACE 仍未结束，视为执行它的进程已退出
+LEASE_GRACE = 30
+
+
+class JobStore:
+    """SQLite任务表: queued -> running -> done / failed / cancelled"""
+
+    def __init__(self, path=JOB_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        ensure_parent(path)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, url TEXT, options TEXT, priority INTEGER, timeout REAL, webhook TEXT, "
+            "status TEXT, attempts INTEGER DEFAULT 0, owner TEXT, not_before REAL DEFAULT 0, lease_until REAL, "
+            "created_at REAL, started_at REAL, finished_at REAL, status_code INTEGER, result TEXT, error TEXT, "
+            "webhook_status TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at)")
+
+    def _transaction(self, func):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._db)
+                self._db.execute("COMMIT")
+                return result
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).rowcount
+
+    def create(self, url, options, priority=0, timeout=JOB_TIMEOUT, webhook=None):
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, url, options, priority, timeout, webhook, status, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?)",
+            (job_id, url, json.dumps(options, ensure_ascii=False), priority, timeout, webhook, time.time())
+        )
+        return job_id
+
+    def claim(self, owner):
+        """领取优先级最高、最早创建的任务；租约过期的运行中任务先重新排队"""
+        def claim(db):
+            now = time.time()
+            db.execute("UPDATE jobs SET status = 'queued', owner = NULL WHERE status = 'running' AND lease_until < ?",
+                       (now,))
+            row = db.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND not_before <= ? "
+                "ORDER BY priority DESC, created_at LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, attempts = attempts + 1, started_at = ?, "
+                "lease_until = ? WHERE id = ?", (owner, now, now + row["timeout"] + LEASE_GRACE, row["id"])
+            )
+            job = self._public(row)
+            job["attempts"] += 1
+            job["timeout"] = row["timeout"]
+            job["options"] = json.loads(row["options"])
+            return job
+        return self._transaction(claim)
+
+    def recover(self, host):
+        """重启后把本机已退出进程领取的任务重新排队 (其他机器的任务等租约过期)"""
+        def recover(db):
+            requeued = 0
+            for row in db.execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall():
+                owner_host, _, pid = (row["owner"] or "").rpartition(":")
+                if owner_host == host and pid.isdigit() and not process_alive(int(pid)):
+                    db.execute("UPDATE jobs SET status = 'queued', owner = NULL WHERE id = ?", (row["id"],))
+                    requeued += 1
+            return requeued
+        return self._transaction(recover)
+
+    def finish(self, job_id, result):
+        self._execute(
+            "UPDATE jobs SET status = 'done', status_code = 200, result = ?, finished_at = ?, owner = NULL "
+            "WHERE id = ? AND status = 'running'",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id)
+        )
+
+    def fail(self, job_id, status_code, error):
+        self._execute(
+            "UPDATE jobs SET status = 'failed', status_code = ?, error = ?, finished_at = ?, owner = NULL "
+            "WHERE id = ? AND status = 'running'", (status_code, error, time.time(), job_id)
+        )
+
+    def retry(self, job_id, delay):
+        self._execute(
+            "UPDATE jobs SET status = 'queued', owner = NULL, not_before = ? WHERE id = ? AND status = 'running'",
+            (time.time() + delay, job_id)
+        )
+
+    def cancel(self, job_id):
+        """只能取消尚未开始的任务"""
+        return self._execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id)
+        ) == 1
+
+    def set_webhook_status(self, job_id, status):
+        self._execute("UPDATE jobs SET webhook_status = ? WHERE id = ?", (status, job_id))
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._public(row) if row is not None else None
+
+    def purge(self, retention=JOB_RETENTION):
+        return self._execute("DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < ?",
+                             (time.time() - retention,))
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in ("queued", "running", "done", "failed", "cancelled")}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _public(row):
+        """GET /jobs/{id} 返回的任务信息"""
+        job = {
+            "job_id": row["id"],
+            "status": row["status"],
+            "url": row["url"],
+            "priority": row["priority"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if row["webhook"]:
+            job["webhook"] = row["webhook"]
+            job["webhook_status"] = row["webhook_status"]
+        if row["status"] == "done":
+            job["result"] = json.loads(row["result"])
+        elif row["status"] == "failed":
+            job["status_code"] = row["status_code"]
+            job["error"] = row["error"]
+        return job
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def deliver_webhook(url, job):
+    """POST一次任务结果到webhook，返回 (是否成功, 状态)；配置了密钥时附带HMAC-SHA256签名"""
+    body = json.dumps(job, ensure_ascii=False).encode("utf-8")
+    headers = {"Content-Type": "application/json", "User-Agent": "FoxRead-Webhook"}
+    if WEBHOOK_SECRET:
+        signature = hmac.new(WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        headers["X-FoxRead-Signature"] = f"sha256={signature}"
+    try:
+        response = requests.post(url, data=body, headers=headers, timeout=WEBHOOK_TIMEOUT)
+    except requests.RequestException as e:
+        return False, type(e).__name__
+    if response.status_code < 300:
+        return True, f"delivered ({response.status_code})"
+    return False, f"HTTP {response.status_code}"
+
+
+class JobRunner:
+    """从任务库领取任务并执行，最多同时执行 concurrency 个。
+    execute(job) 返回结果字典，失败时抛出带 status_code / detail 的异常 (如 HTTPException)"""
+
+    def __init__(self, store, execute, concurrency=JOB_CONCURRENCY):
+        self.store = store
+        self.execute = execute
+        self.concurrency = max(1, concurrency)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._slots = None
+        self._wakeup = None
+        self._task = None
+        self._running = set()
+        self._stats = {"completed": 0, "failed": 0, "retried": 0, "recovered": 0}
+
+    def start(self):
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._loop())
+
+    def notify(self):
+        """有新任务时立即领取，不等下一次轮询"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        self._stats["recovered"] += await loop.run_in_executor(None, self.store.recover, socket.gethostname())
+        await loop.run_in_executor(None, self.store.purge)
+        while True:
+            await self._slots.acquire()
+            self._wakeup.clear()
+            job = await loop.run_in_executor(None, self.store.claim, self.owner)
+            if job is None:
+                self._slots.release()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.ensure_future(self._run(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, job):
+        loop = asyncio.get_running_loop()
+        job_id = job["job_id"]
+        try:
+            result = await asyncio.wait_for(self.execute(job), timeout=job["timeout"])
+        except asyncio.TimeoutError:
+            status_code, error = 408, "⏰ job timed out"
+        except asyncio.CancelledError:
+            # 服务关闭: 任务保持 running，重启后重新排队
+            raise
+        except Exception as e:
+            status_code = getattr(e, "status_code", 500)
+            error = getattr(e, "detail", None) or f"{type(e).__name__}: {e}"
+        else:
+            status_code, error = 200, None
+        finally:
+            self._slots.release()
+
+        if status_code in RETRYABLE_STATUS and job["attempts"] < JOB_MAX_ATTEMPTS:
+            self._stats["retried"] += 1
+            await loop.run_in_executor(None, self.store.retry, job_id, 5 * job["attempts"])
+            return
+        if error is None:
+            self._stats["completed"] += 1
+            await loop.run_in_executor(None, self.store.finish, job_id, result)
+        else:
+            self._stats["failed"] += 1
+            await loop.run_in_executor(None, self.store.fail, job_id, status_code, str(error))
+
+        if job.get("webhook"):
+            finished = await loop.run_in_executor(None, self.store.get, job_id)
+            status = await self._deliver(job["webhook"], finished)
+            await loop.run_in_executor(None, self.store.set_webhook_status, job_id, status)
+
+    async def _deliver(self, url, finished):
+        """失败按 1/2/4 秒退避重试，退避期间不占用线程池"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(WEBHOOK_RETRIES):
+            if attempt:
+                await asyncio.sleep(2 ** (attempt - 1))
+            delivered, status = await loop.run_in_executor(None, deliver_webhook, url, finished)
+            if delivered:
+                return status
+        return f"failed: {status}"
+
+    async def close(self):
+        tasks = [task for task in (self._task, *self._running) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.store.close()
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "active": len(self._running),
+            **self._stats,
+            "by_status": self.store.stats()
+        }
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 指标与计时
+每个请求按阶段记录耗时 (span)，汇总为 Prometheus 直方图；可选对采样请求做 cProfile/pyinstrument 性能剖析
+"""
+
+import os
+import time
+import random
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from politeness import registrable_domain
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+MAX_DOMAIN_LABELS = int(os.environ.get("FOXREAD_METRICS_MAX_DOMAINS", "200"))
+
+# 🔬 性能剖析: 按比例采样提取请求 (0 关闭)，输出到 FOXREAD_PROFILE_DIR
+PROFILE_RATE = float(os.environ.get("FOXREAD_PROFILE_RATE", "0"))
+PROFILE_DIR = os.environ.get("FOXREAD_PROFILE_DIR", "profiles")
+PROFILER = os.environ.get("FOXREAD_PROFILER", "cprofile")
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """单调递增计数器"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labelnames, labels), value)
+                    for labels, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """累积桶直方图"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    result.append((f"{self.name}_bucket", _format_labels(self.labelnames, labels, f'le="{bound}"'), count))
+                result.append((f"{self.name}_bucket", _format_labels(self.labelnames, labels, 'le="+Inf"'), series["count"]))
+                result.append((f"{self.name}_sum", _format_labels(self.labelnames, labels), round(series["sum"], 6)))
+                result.append((f"{self.name}_count", _format_labels(self.labelnames, labels), series["count"]))
+        return result
+
+
+class Gauge:
+    """抓取时通过回调读取的瞬时值，回调返回 [(标签值元组, 数值), ...]"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), collect=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def samples(self):
+        try:
+            values = self.collect() if self.collect else []
+        except Exception:
+            values = []
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in values]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus 文本格式 (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    "foxread_extraction_duration_seconds", "End-to-end extraction time",
+    ("domain", "tier", "outcome")))
+STAGE_DURATION = registry.register(Histogram(
+    "foxread_stage_duration_seconds", "Time spent in each extraction stage",
+    ("stage", "domain", "tier")))
+CACHE_LOOKUPS = registry.register(Counter(
+    "foxread_cache_lookups_total", "Cache lookups by result", ("state",)))
+BROWSER_LAUNCH = registry.register(Histogram(
+    "foxread_browser_launch_seconds", "Time to launch and prepare a browser session", ("pool",)))
+SERIALIZE_DURATION = registry.register(Histogram(
+    "foxread_serialize_duration_seconds", "Response rendering time", ("format",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)))
+COMPRESS_DURATION = registry.register(Histogram(
+    "foxread_compress_duration_seconds", "Response compression time", ("encoding",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)))
+RESPONSE_BYTES = registry.register(Counter(
+    "foxread_response_bytes_total", "Response body bytes before and after compression", ("encoding", "stage")))
+NOT_MODIFIED = registry.register(Counter(
+    "foxread_not_modified_total", "Requests answered with 304 Not Modified"))
+CHANGE_CHECKS = registry.register(Counter(
+    "foxread_change_checks_total", "Change detection requests by outcome", ("outcome",)))
+
+_domains = set()
+_domains_lock = threading.Lock()
+
+
+def domain_label(url):
+    """域名标签，超过上限的新域名归入 other，防止时间序列无限增长"""
+    return capped_domain(registrable_domain(url) or "unknown")
+
+
+def capped_domain(domain):
+    """已知的可注册域名作为标签，与 domain_label 共用上限"""
+    with _domains_lock:
+        if domain in _domains:
+            return domain
+        if len(_domains) < MAX_DOMAIN_LABELS:
+            _domains.add(domain)
+            return domain
+    return "other"
+
+
+class Timings:
+    """一次提取的分阶段耗时"""
+
+    def __init__(self, profile=False):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.profile = profile
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        with self._lock:
+            stages = {stage: round(seconds, 4) for stage, seconds in self.stages.items()}
+        stages["total"] = round(self.elapsed(), 4)
+        return stages
+
+
+_current = contextvars.ContextVar("foxread_timings", default=None)
+
+
+def start_timings():
+    """为当前请求开始计时，按 FOXREAD_PROFILE_RATE 决定是否做性能剖析"""
+    timings = Timings(profile=PROFILE_RATE > 0 and random.random() < PROFILE_RATE)
+    _current.set(timings)
+    return timings
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def span(stage):
+    """记录当前请求某个阶段的耗时；不在请求上下文中时不做任何事"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    with timings.span(stage):
+        yield
+
+
+def observe(url, tier, outcome, timings):
+    """提取结束时把耗时写入直方图"""
+    domain = domain_label(url)
+    tier = tier or "none"
+    REQUEST_DURATION.observe(timings.elapsed(), domain, tier, outcome)
+    with timings._lock:
+        stages = list(timings.stages.items())
+    for stage, seconds in stages:
+        STAGE_DURATION.observe(seconds, stage, domain, tier)
+
+
+def in_context(func, *args):
+    """供 run_in_executor 使用: 在线程中保留当前请求的计时上下文，采样请求同时做性能剖析"""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, _run_profiled, func, *args)
+
+
+def _run_profiled(func, *args):
+    timings = _current.get()
+    if timings is None or not timings.profile:
+        return func(*args)
+    label = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{threading.get_ident()}-{func.__name__}"
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    if PROFILER == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+        if Profiler is not None:
+            profiler = Profiler(async_mode="disabled")
+            profiler.start()
+            try:
+                return func(*args)
+            finally:
+                profiler.stop()
+                with open(os.path.join(PROFILE_DIR, label + ".html"), "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        profiler.dump_stats(os.path.join(PROFILE_DIR, label + ".prof"))
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 页面归档
+抓取到的原始HTML按内容哈希 (sha256) 去重，追加写入WARC风格的段文件 (segment-NNNNNNNN.warc)：
+新内容写 resource 记录，重复内容只写引用已有记录的 revisit 记录。
+每个域名积累足够样本后训练共享压缩字典 (zstd，未安装 zstandard 时用zlib预设字典)。
+index.bin 为定长记录 (每次抓取一条)，可以直接mmap，按URL和抓取时间查找；
+多个进程可以共用一个归档目录: 各自写自己的段文件，索引只追加定长记录。
+
+用法 (用当前的提取器重新提取归档中的页面，不启动浏览器):
+    python3 page_archive.py reextract --dir archive -o reextracted.ndjson
+    python3 page_archive.py reextract --dir archive --domain zhihu.com --workers 8
+    python3 page_archive.py stats --dir archive
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import uuid
+import zlib
+import struct
+import hashlib
+import argparse
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from content_cache import normalize_url
+from politeness import registrable_domain
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DIR = os.environ.get("FOXREAD_ARCHIVE_DIR", "")  # 留空则不归档
+SEGMENT_MB = int(os.environ.get("FOXREAD_ARCHIVE_SEGMENT_MB", "256"))
+DICT_SAMPLES = int(os.environ.get("FOXREAD_ARCHIVE_DICT_SAMPLES", "32"))  # 每个域名积累多少个页面后训练字典
+DICT_PENDING_DOMAINS = 10000  # 最多同时为这么多个域名积累样本 (超出时丢弃最久未见的域名)
+DICT_SIZE = 112 * 1024
+ZLIB_DICT_SIZE = 32 * 1024  # zlib预设字典只用最后32KB
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 9
+
+# 索引记录: URL哈希, 抓取时间, 内容sha256, 段号, 偏移, 记录长度, 原始大小, 标志 (1 = resource)
+INDEX = struct.Struct("<8sd32sIQIII")
+RESOURCE = 1
+
+
+def url_key(url):
+    return hashlib.blake2b(normalize_url(url).encode("utf-8"), digest_size=8).digest()
+
+
+def build_zlib_dictionary(samples):
+    """zlib预设字典: 各页面开头和结尾的模板HTML (越靠后的内容匹配代价越低，放公共部分)"""
+    parts = [sample[:2048] + sample[-2048:] for sample in samples]
+    return b"".join(parts)[-ZLIB_DICT_SIZE:]
+
+
+def compress(raw, kind, dictionary):
+    if kind == "zstd":
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dict_data).compress(raw)
+    if dictionary:
+        compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, 15, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(ZLIB_LEVEL)
+    return compressor.compress(raw) + compressor.flush()
+
+
+def decompress(payload, kind, dictionary):
+    if kind == "zstd":
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(payload)
+    if dictionary:
+        decompressor = zlib.decompressobj(15, zdict=dictionary)
+        return decompressor.decompress(payload) + decompressor.flush()
+    return zlib.decompress(payload)
+
+
+class PageArchive:
+    """追加写入的页面归档 (线程安全)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.dict_dir = os.path.join(directory, "dicts")
+        os.makedirs(self.dict_dir, exist_ok=True)
+        self.index_path = os.path.join(directory, "index.bin")
+        self.kind = "zstd" if zstandard is not None else "zlib"
+        self._lock = threading.Lock()
+        self._index_file = open(self.index_path, "ab", buffering=0)
+        self._index_map = None
+        self._indexed = 0
+        self._by_url = {}
+        self._by_digest = {}
+        self._segment = None
+        self._segment_no = None
+        self._readers = {}
+        self._dicts = {}
+        self._domain_dicts = {}
+        self._samples = OrderedDict()  # 域名 -> 样本页面的内容sha256 (训练时从段文件读回)
+        self._stats = {"stored": 0, "deduplicated": 0, "raw_bytes": 0, "stored_bytes": 0, "dictionaries_trained": 0}
+        self._load_dictionaries()
+        self._refresh()
+
+    # ---- 索引 ----
+
+    def _refresh(self):
+        """读取其他进程 (或本进程) 新追加的索引记录"""
+        size = os.path.getsize(self.index_path) // INDEX.size * INDEX.size
+        if size <= self._indexed * INDEX.size:
+            return
+        if self._index_map is not None:
+            self._index_map.close()
+        with open(self.index_path, "rb") as f:
+            self._index_map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        for number in range(self._indexed, size // INDEX.size):
+            key, _, digest, _, _, _, _, flags = INDEX.unpack_from(self._index_map, number * INDEX.size)
+            self._by_url.setdefault(key, []).append(number)
+            if flags & RESOURCE:
+                self._by_digest.setdefault(digest, number)
+        self._indexed = size // INDEX.size
+
+    def _entry(self, number):
+        key, fetched_at, digest, segment, offset, length, raw_size, flags = INDEX.unpack_from(
+            self._index_map, number * INDEX.size)
+        return {"fetched_at": fetched_at, "digest": digest, "segment": segment, "offset": offset,
+                "length": length, "raw_size": raw_size, "resource": bool(flags & RESOURCE)}
+
+    # ---- 字典 ----
+
+    def _load_dictionaries(self):
+        """读取 dicts/ 中的字典 (域名.字典ID.算法.dict)；其他进程正在写入的 .tmp 文件和刚被改名的文件跳过"""
+        found = []
+        for name in os.listdir(self.dict_dir):
+            if not name.endswith(".dict") or name.count(".") < 3:
+                continue
+            path = os.path.join(self.dict_dir, name)
+            try:
+                found.append((os.path.getmtime(path), name, path))
+            except FileNotFoundError:
+                continue
+        for _, name, path in sorted(found):
+            domain, dict_id, kind, _ = name.rsplit(".", 3)
+            try:
+                with open(path, "rb") as f:
+                    self._dicts[dict_id] = (kind, f.read())
+            except FileNotFoundError:
+                continue
+            if kind == self.kind:
+                self._domain_dicts[domain] = dict_id
+
+    def _add_sample(self, domain, digest):
+        """记下一个样本页面，返回该域名是否已积累够样本"""
+        samples = self._samples.pop(domain, [])
+        samples.append(digest)
+        self._samples[domain] = samples
+        while len(self._samples) > DICT_PENDING_DOMAINS:
+            self._samples.popitem(last=False)
+        return len(samples) >= DICT_SAMPLES
+
+    def _train(self, domain, samples):
+        """用该域名的样本页面训练共享字典，之后的页面都用它压缩"""
+        if self.kind == "zstd":
+            try:
+                dictionary = zstandard.train_dictionary(DICT_SIZE, samples).as_bytes()
+            except zstandard.ZstdError:
+                return
+        else:
+            dictionary = build_zlib_dictionary(samples)
+        dict_id = hashlib.blake2b(dictionary, digest_size=8).hexdigest()
+        path = os.path.join(self.dict_dir, f"{domain}.{dict_id}.{self.kind}.dict")
+        with open(path + ".tmp", "wb") as f:
+            f.write(dictionary)
+        os.replace(path + ".tmp", path)
+        self._dicts[dict_id] = (self.kind, dictionary)
+        self._domain_dicts[domain] = dict_id
+        self._stats["dictionaries_trained"] += 1
+
+    def _dictionary(self, dict_id):
+        if dict_id not in self._dicts:
+            # 其他进程训练的字典
+            self._load_dictionaries()
+        return self._dicts[dict_id][1]
+
+    # ---- 段文件 ----
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"segment-{number:08d}.warc")
+
+    def _open_segment(self):
+        """创建新的段文件 (O_EXCL: 每个进程只追加自己创建的段)"""
+        if self._segment is not None:
+            self._segment.close()
+        existing = [int(name[8:16]) for name in os.listdir(self.directory)
+                    if name.startswith("segment-") and name.endswith(".warc")]
+        number = max(existing, default=0) + 1
+        while True:
+            try:
+                fd = os.open(self._segment_path(number), os.O_CREAT | os.O_EXCL | os.O_WRONLY | os.O_APPEND, 0o644)
+                break
+            except FileExistsError:
+                number += 1
+        self._segment = os.fdopen(fd, "ab", buffering=0)
+        self._segment_no = number
+
+    def _append_record(self, headers, payload):
+        header = "WARC/1.1\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        record = header.encode("utf-8") + f"Content-Length: {len(payload)}\r\n\r\n".encode("ascii") + payload + b"\r\n\r\n"
+        if self._segment is None or self._segment.tell() + len(record) > SEGMENT_MB * 1024 * 1024:
+            self._open_segment()
+        offset = self._segment.tell()
+        self._segment.write(record)
+        return self._segment_no, offset, len(record)
+
+    def _read_record(self, segment, offset, length):
+        reader = self._readers.get(segment)
+        if reader is None:
+            reader = self._readers[segment] = os.open(self._segment_path(segment), os.O_RDONLY)
+        record = os.pread(reader, length, offset)
+        header, _, body = record.partition(b"\r\n\r\n")
+        headers = {}
+        for line in header.decode("utf-8").split("\r\n")[1:]:
+            name, _, value = line.partition(": ")
+            headers[name] = value
+        return headers, body[:int(headers["Content-Length"])]
+
+    # ---- 写入与读取 ----
+
+    def store(self, url, html, title="", tier="", fetched_at=None):
+        """归档一次抓取，返回内容sha256 (十六进制)"""
+        raw = html.encode("utf-8")
+        digest = hashlib.sha256(raw).digest()
+        fetched_at = fetched_at or time.time()
+        headers = {
+            "WARC-Type": "resource",
+            "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+            "WARC-Date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(fetched_at)),
+            "WARC-Target-URI": url,
+            "WARC-Payload-Digest": f"sha256:{digest.hex()}",
+            "Content-Type": "text/html; charset=utf-8",
+            "FoxRead-Title": json.dumps(title or "", ensure_ascii=True),
+            "FoxRead-Tier": tier or "",
+        }
+        with self._lock:
+            self._refresh()
+            self._stats["raw_bytes"] += len(raw)
+            train = False
+            if digest in self._by_digest:
+                # 内容未变: 只记录这次抓取
+                headers["WARC-Type"] = "revisit"
+                headers["WARC-Profile"] = "http://netpreserve.org/warc/1.1/revisit/identical-payload-digest"
+                payload, flags = b"", 0
+                self._stats["deduplicated"] += 1
+            else:
+                domain = registrable_domain(url) or "_"
+                dict_id = self._domain_dicts.get(domain)
+                dictionary = self._dicts[dict_id][1] if dict_id else None
+                payload = compress(raw, self.kind, dictionary)
+                headers["FoxRead-Encoding"] = self.kind
+                if dict_id:
+                    headers["FoxRead-Dictionary"] = dict_id
+                flags = RESOURCE
+                self._stats["stored"] += 1
+                train = dict_id is None and self._add_sample(domain, digest)
+            segment, offset, length = self._append_record(headers, payload)
+            self._stats["stored_bytes"] += length
+            self._index_file.write(INDEX.pack(url_key(url), fetched_at, digest, segment, offset, length, len(raw), flags))
+            self._refresh()
+            if train:
+                samples = self._samples.pop(domain)
+                self._train(domain, [self._payload(sample) for sample in samples if sample in self._by_digest])
+        return digest.hex()
+
+    def _payload(self, digest):
+        entry = self._entry(self._by_digest[digest])
+        headers, payload = self._read_record(entry["segment"], entry["offset"], entry["length"])
+        dict_id = headers.get("FoxRead-Dictionary")
+        dictionary = self._dictionary(dict_id) if dict_id else None
+        return decompress(payload, headers["FoxRead-Encoding"], dictionary)
+
+    def versions(self, url):
+        """该URL的所有归档版本 (按抓取时间)"""
+        with self._lock:
+            self._refresh()
+            entries = [self._entry(number) for number in self._by_url.get(url_key(url), [])]
+        return [{"fetched_at": entry["fetched_at"], "digest": entry["digest"].hex(), "raw_size": entry["raw_size"],
+                 "deduplicated": not entry["resource"]} for entry in sorted(entries, key=lambda e: e["fetched_at"])]
+
+    def load(self, url, at=None):
+        """读取 at 时刻 (默认最新) 之前最近的一次抓取: {url, title, tier, fetched_at, html}；没有则返回None"""
+        with self._lock:
+            self._refresh()
+            entries = [self._entry(number) for number in self._by_url.get(url_key(url), [])]
+            entries = [entry for entry in entries if at is None or entry["fetched_at"] <= at]
+            if not entries:
+                return None
+            return self._page(max(entries, key=lambda e: e["fetched_at"]))
+
+    def _page(self, entry):
+        headers, _ = self._read_record(entry["segment"], entry["offset"], entry["length"])
+        return {
+            "url": headers["WARC-Target-URI"],
+            "title": json.loads(headers.get("FoxRead-Title") or '""'),
+            "tier": headers.get("FoxRead-Tier", ""),
+            "fetched_at": entry["fetched_at"],
+            "digest": entry["digest"].hex(),
+            "html": self._payload(entry["digest"]).decode("utf-8"),
+        }
+
+    def iter_latest(self, domain=None):
+        """逐个产出每个URL最新的归档页面"""
+        with self._lock:
+            self._refresh()
+            latest = [max(numbers, key=lambda n: self._entry(n)["fetched_at"]) for numbers in self._by_url.values()]
+        for number in latest:
+            with self._lock:
+                page = self._page(self._entry(number))
+            if domain is None or registrable_domain(page["url"]) == domain:
+                yield page
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            segments = [name for name in os.listdir(self.directory) if name.endswith(".warc")]
+            return {
+                "directory": self.directory,
+                "compression": self.kind,
+                "fetches": self._indexed,
+                "urls": len(self._by_url),
+                "unique_pages": len(self._by_digest),
+                "segments": len(segments),
+                "segment_bytes": sum(os.path.getsize(os.path.join(self.directory, name)) for name in segments),
+                "dictionaries": len(self._dicts),
+                **self._stats
+            }
+
+    def close(self):
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+            self._index_file.close()
+            for reader in self._readers.values():
+                os.close(reader)
+            if self._index_map is not None:
+                self._index_map.close()
+
+
+def open_archive(directory=ARCHIVE_DIR):
+    return PageArchive(directory) if directory else None
+
+
+# ---- 重新提取 ----
+
+def reextract_page(page):
+    """在工作进程中用当前提取器重新提取一个归档页面"""
+    import extractor
+    started = time.perf_counter()
+    article = extractor.extract(page["html"], page["url"])
+    return {
+        "url": page["url"],
+        "fetched_at": page["fetched_at"],
+        "digest": page["digest"],
+        "title": page["title"] or article.title,
+        "extractor": article.method,
+        "content_length": len(article.text),
+        "content": article.text,
+        "markdown": article.markdown,
+        "html_bytes": len(page["html"].encode("utf-8")),
+        "extract_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def reextract(archive, output, domain=None, workers=None, full=False):
+    """按CPU核数并行重新提取所有URL的最新版本，结果逐行写入NDJSON"""
+    started = time.perf_counter()
+    pages = html_bytes = 0
+    workers = workers or os.cpu_count() or 1
+
+    def emit(result):
+        nonlocal pages, html_bytes
+        pages += 1
+        html_bytes += result["html_bytes"]
+        if not full:
+            result.pop("content")
+            result.pop("markdown")
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    # 最多 workers*4 个页面在途，归档再大内存也有上限
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for page in archive.iter_latest(domain):
+            pending.append(pool.submit(reextract_page, page))
+            if len(pending) >= workers * 4:
+                emit(pending.popleft().result())
+        while pending:
+            emit(pending.popleft().result())
+    elapsed = time.perf_counter() - started
+    return {
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(pages / elapsed, 1) if elapsed else None,
+        "html_mb_per_second": round(html_bytes / 1024 / 1024 / elapsed, 1) if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FoxRead 页面归档')
+    parser.add_argument('command', choices=['reextract', 'stats'])
+    parser.add_argument('--dir', default=ARCHIVE_DIR or 'archive', help='归档目录')
+    parser.add_argument('--domain', help='只处理该域名')
+    parser.add_argument('--workers', type=int, help='提取进程数 (默认CPU核数)')
+    parser.add_argument('--full', action='store_true', help='输出中包含正文和Markdown')
+    parser.add_argument('-o', '--output', help='NDJSON输出路径 (默认标准输出)')
+    args = parser.parse_args()
+
+    archive = PageArchive(args.dir)
+    try:
+        if args.command == 'stats':
+            print(json.dumps(archive.stats(), ensure_ascii=False, indent=2))
+            return
+        output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            summary = reextract(archive, output, args.domain, args.workers, args.full)
+        finally:
+            if args.output:
+                output.close()
+        print(f"🦊 重新提取 {summary['pages']} 个页面，{summary['seconds']}s "
+              f"({summary['pages_per_second']} 页/秒, {summary['html_mb_per_second']} MB/s)", file=sys.stderr)
+    finally:
+        archive.close()
+
+
+if __name__ == "__main__":
+    main()
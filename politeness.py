@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 域名礼貌调度
+按可注册域名做令牌桶限速和并发限制，遇到失败或验证页面自动降速，成功后逐步恢复
+"""
+
+import json
+import math
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+# 两段式公共后缀 (不引入 publicsuffix 依赖，覆盖常见情况)
+MULTI_PART_SUFFIXES = {
+    'com.cn', 'net.cn', 'org.cn', 'gov.cn', 'edu.cn', 'ac.cn',
+    'com.hk', 'com.tw', 'co.uk', 'org.uk', 'ac.uk', 'co.jp', 'ne.jp',
+    'com.au', 'net.au', 'co.kr', 'com.sg', 'com.br',
+}
+
+# 默认策略: rate 为每秒令牌数，burst 为桶容量，concurrency 为同时进行的请求数
+DEFAULT_POLICY = {"rate": 5.0, "burst": 10, "concurrency": 8}
+
+# 反爬敏感网站 (与 web_agent.is_complex_site / is_social_media 对应)
+DOMAIN_POLICIES = {
+    'zhihu.com': {"rate": 0.5, "burst": 2, "concurrency": 2},
+    'weibo.com': {"rate": 0.5, "burst": 2, "concurrency": 2},
+    'csdn.net': {"rate": 1.0, "burst": 3, "concurrency": 3},
+    'jianshu.com': {"rate": 1.0, "burst": 3, "concurrency": 3},
+    'twitter.com': {"rate": 0.3, "burst": 2, "concurrency": 1},
+    'x.com': {"rate": 0.3, "burst": 2, "concurrency": 1},
+    'facebook.com': {"rate": 0.3, "burst": 2, "concurrency": 1},
+    'instagram.com': {"rate": 0.3, "burst": 2, "concurrency": 1},
+}
+
+# 自适应参数
+MIN_RATE_FACTOR = 0.05      # 最低降到基础速率的5%
+FAILURE_FACTOR = 0.7        # 普通失败: 速率乘以0.7
+CHALLENGE_FACTOR = 0.5      # 验证页面: 速率减半并冷却
+RECOVERY_STEP = 0.1         # 每次成功恢复基础速率的10%
+CHALLENGE_COOLDOWN = 30.0   # 首次验证页面冷却时间，连续出现时翻倍
+MAX_COOLDOWN = 600.0
+MAX_DOMAINS = 1000          # 保留的域名限速器数量，超出时丢弃最久未用且已完全恢复的
+
+# 验证/拦截页面特征
+CHALLENGE_MARKERS = [
+    '安全验证', '验证码', '访问过于频繁', '请求过于频繁', '系统监测到您的网络环境存在异常',
+    '异常流量', '请完成验证', 'captcha', 'just a moment', 'cf-challenge', 'checking your browser',
+    'unusual traffic', 'are you a robot',
+]
+# 太常见的短语只在标题里算数 (正文里讨论限流/权限的文章不算)
+TITLE_CHALLENGE_MARKERS = ['access denied', 'too many requests']
+
+
+class Throttled(Exception):
+    """该域名当前不能在截止时间前获得配额"""
+
+    def __init__(self, domain, retry_after):
+        super().__init__(f"{domain} throttled")
+        self.domain = domain
+        self.retry_after = retry_after
+
+
+def registrable_domain(url):
+    """URL的可注册域名，如 zhuanlan.zhihu.com -> zhihu.com"""
+    host = (urlparse(url).hostname or '').lower().rstrip('.')
+    labels = host.split('.')
+    if len(labels) <= 2 or host.replace('.', '').isdigit():
+        return host
+    if '.'.join(labels[-2:]) in MULTI_PART_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def looks_like_challenge(title, content):
+    """判断提取结果是否为验证/拦截页面 (只看开头，正文里偶然出现的词不算)"""
+    if len(content) >= 5000:
+        return False
+    head = f"{title}\n{content[:2000]}".lower()
+    title = (title or "").lower()
+    return (any(marker in head for marker in CHALLENGE_MARKERS)
+            or any(marker in title for marker in TITLE_CHALLENGE_MARKERS))
+
+
+def load_policies():
+    """默认策略 + 环境变量 FOXREAD_DOMAIN_POLICIES (JSON) 覆盖"""
+    policies = {domain: dict(policy) for domain, policy in DOMAIN_POLICIES.items()}
+    override = os.environ.get("FOXREAD_DOMAIN_POLICIES")
+    if override:
+        for domain, policy in json.loads(override).items():
+            policies[domain] = {**DEFAULT_POLICY, **policies.get(domain, {}), **policy}
+    return policies
+
+
+class DomainLimiter:
+    """单个域名的令牌桶 + 并发限制 + 自适应速率；shared 为跨进程令牌桶 (shared_state.SharedBuckets)"""
+
+    def __init__(self, domain, rate, burst, concurrency, shared=None):
+        self.domain = domain
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.updated = time.monotonic()
+        self.consecutive_challenges = 0
+        self.shared = shared
+        self._cond = asyncio.Condition()
+        self.stats = {"requests": 0, "successes": 0, "failures": 0, "challenges": 0, "throttled": 0}
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _delay(self, now):
+        """距离下一个可用令牌还需等待的时间"""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    async def acquire(self, deadline):
+        async with self._cond:
+            while True:
+                now = time.monotonic()
+                if self.in_flight >= self.concurrency:
+                    if now >= deadline:
+                        self.stats["throttled"] += 1
+                        raise Throttled(self.domain, max(1, math.ceil(1 / self.rate)))
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=deadline - now)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                wait = self._delay(now)
+                if wait <= 0 and self.shared is not None:
+                    # 多个worker共享该域名的令牌桶，本进程的桶只是额外上限
+                    wait = await self.shared.take(self.domain, self.rate, self.burst)
+                    now = time.monotonic()
+                if wait <= 0:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    self.stats["requests"] += 1
+                    return
+                if now + wait > deadline:
+                    self.stats["throttled"] += 1
+                    raise Throttled(self.domain, max(1, math.ceil(wait)))
+                # 等待令牌期间释放条件锁，让其他请求可以检查状态
+                self._cond.release()
+                try:
+                    await asyncio.sleep(wait)
+                finally:
+                    await self._cond.acquire()
+
+    async def release(self, outcome):
+        """归还并发名额；outcome 为 success / failure / challenge / skipped (非目标网站原因)"""
+        async with self._cond:
+            self.in_flight -= 1
+            if outcome != "skipped":
+                self.record(outcome)
+            self._cond.notify_all()
+        if outcome == "challenge" and self.shared is not None:
+            # 验证页面的冷却同步到其他worker
+            await self.shared.block(self.domain, max(0.0, self.blocked_until - time.monotonic()))
+
+    def record(self, outcome):
+        """根据结果调整速率: 失败乘性降速，成功加性恢复"""
+        now = time.monotonic()
+        self._refill(now)
+        min_rate = self.base_rate * MIN_RATE_FACTOR
+        if outcome == "success":
+            self.stats["successes"] += 1
+            self.consecutive_challenges = 0
+            self.rate = min(self.base_rate, self.rate + self.base_rate * RECOVERY_STEP)
+        elif outcome == "challenge":
+            self.stats["challenges"] += 1
+            self.consecutive_challenges += 1
+            self.rate = max(min_rate, self.rate * CHALLENGE_FACTOR)
+            cooldown = min(MAX_COOLDOWN, CHALLENGE_COOLDOWN * 2 ** (self.consecutive_challenges - 1))
+            self.blocked_until = max(self.blocked_until, now + cooldown)
+            self.tokens = 0.0
+        else:
+            self.stats["failures"] += 1
+            self.rate = max(min_rate, self.rate * FAILURE_FACTOR)
+
+    def idle(self):
+        """没有请求、不在冷却、速率和令牌都已恢复: 与新建的限速器等价，可以丢弃"""
+        now = time.monotonic()
+        self._refill(now)
+        return (self.in_flight == 0 and self.blocked_until <= now and self.rate >= self.base_rate
+                and self.tokens >= self.burst)
+
+    def snapshot(self):
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "rate": round(self.rate, 4),
+            "base_rate": self.base_rate,
+            "tokens": round(self.tokens, 2),
+            "in_flight": self.in_flight,
+            "concurrency": self.concurrency,
+            "cooldown_remaining": round(max(0.0, self.blocked_until - now), 1),
+            **self.stats
+        }
+
+
+class PolitenessScheduler:
+    """按可注册域名管理 DomainLimiter"""
+
+    def __init__(self, policies=None, default_policy=None, shared=None):
+        self.policies = load_policies() if policies is None else policies
+        self.default_policy = dict(default_policy or DEFAULT_POLICY)
+        self.shared = shared
+        self._limiters = OrderedDict()
+
+    def policy_for(self, domain):
+        for suffix, policy in self.policies.items():
+            if domain == suffix or domain.endswith('.' + suffix):
+                return {**self.default_policy, **policy}
+        return self.default_policy
+
+    def limiter(self, url):
+        domain = registrable_domain(url)
+        limiter = self._limiters.get(domain)
+        if limiter is None:
+            policy = self.policy_for(domain)
+            limiter = self._limiters[domain] = DomainLimiter(
+                domain, policy["rate"], policy["burst"], policy["concurrency"], shared=self.shared
+            )
+            self._prune()
+        else:
+            self._limiters.move_to_end(domain)
+        return limiter
+
+    def _prune(self):
+        """域名过多时从最久未用的开始丢弃空闲的限速器 (正在使用、冷却或降速中的保留)"""
+        excess = len(self._limiters) - MAX_DOMAINS
+        for domain in list(self._limiters)[:-1]:  # 刚创建的限速器已交给调用方
+            if excess <= 0:
+                break
+            if self._limiters[domain].idle():
+                del self._limiters[domain]
+                excess -= 1
+
+    async def acquire(self, url, deadline):
+        """等待该域名的配额；deadline 为 time.monotonic() 时间点"""
+        limiter = self.limiter(url)
+        await limiter.acquire(deadline)
+        return limiter
+
+    def stats(self):
+        return {domain: limiter.snapshot() for domain, limiter in self._limiters.items()}
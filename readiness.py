@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 页面就绪检测
+用可配置的信号代替固定等待: 站点正文选择器、网络空闲 (CDP网络事件)、DOM变更静默，带硬性上限
+"""
+
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+READY_CEILING = float(os.environ.get("FOXREAD_READY_CEILING", "10"))
+POLL_INTERVAL = 0.1
+NETWORK_IDLE_MS = 500
+DOM_QUIET_MS = 500
+MIN_SELECTOR_TEXT = 50
+
+# 站点正文选择器: 出现且有足够文字即认为正文已渲染
+SITE_READY_SELECTORS = {
+    'zhihu.com': ['.Post-RichText', '.RichContent-inner', '.QuestionAnswer-content'],
+    'csdn.net': ['#content_views', 'article'],
+    'jianshu.com': ['article'],
+    'weibo.com': ['[class*="detail_wbtext"]', '.WB_text', 'article'],
+    'twitter.com': ['article [data-testid="tweetText"]'],
+    'x.com': ['article [data-testid="tweetText"]'],
+}
+SITE_READY_SELECTORS.update(json.loads(os.environ.get("FOXREAD_READY_SELECTORS", "{}")))
+
+# 注入到每个新文档: 记录最近一次DOM变更的时间
+MUTATION_TRACKER_JS = """
+(() => {
+  window.__foxreadLastMutation = performance.now();
+  const start = () => new MutationObserver(() => { window.__foxreadLastMutation = performance.now(); })
+    .observe(document.documentElement, {subtree: true, childList: true, characterData: true});
+  if (document.documentElement) { start(); } else { document.addEventListener('DOMContentLoaded', start); }
+})();
+"""
+
+PROBE_JS = """
+const selectors = arguments[0], minText = arguments[1];
+let matched = null;
+for (const s of selectors) {
+  const el = document.querySelector(s);
+  if (el && (el.innerText || '').trim().length >= minText) { matched = s; break; }
+}
+const last = window.__foxreadLastMutation;
+return {
+  readyState: document.readyState,
+  hasBody: !!document.body,
+  matched: matched,
+  quietMs: last === undefined ? null : performance.now() - last
+};
+"""
+
+
+def ready_selectors(url):
+    host = (urlparse(url).hostname or '').lower()
+    for domain, selectors in SITE_READY_SELECTORS.items():
+        if host == domain or host.endswith('.' + domain):
+            return selectors
+    return []
+
+
+class NetworkTracker:
+    """根据performance日志中的CDP网络事件跟踪进行中的请求"""
+
+    def __init__(self):
+        self.entries = []
+        self.in_flight = set()
+        self.idle_since = time.monotonic()
+
+    def feed(self, entries):
+        self.entries.extend(entries)
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError, TypeError):
+                continue
+            method = message.get('method')
+            request_id = message.get('params', {}).get('requestId')
+            if method == 'Network.requestWillBeSent':
+                self.in_flight.add(request_id)
+            elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+                self.in_flight.discard(request_id)
+        if self.in_flight:
+            self.idle_since = None
+        elif self.idle_since is None:
+            self.idle_since = time.monotonic()
+
+    def idle_for(self):
+        return 0.0 if self.idle_since is None else (time.monotonic() - self.idle_since) * 1000
+
+
+class ReadinessCheck:
+    """就绪判定: 每次轮询传入页面探测结果和新的网络事件，就绪时返回原因"""
+
+    def __init__(self, url, stealth, ceiling=None):
+        self.stealth = stealth
+        self.ceiling = READY_CEILING if ceiling is None else ceiling
+        self.selectors = ready_selectors(url)
+        self.network = NetworkTracker()
+        self.started = time.monotonic()
+        self.timings = {}
+
+    def mark(self, signal):
+        if signal not in self.timings:
+            self.timings[signal] = round(time.monotonic() - self.started, 3)
+
+    def observe(self, probe, entries):
+        """返回就绪原因 (load / selector / quiescent / ceiling)，尚未就绪返回None"""
+        self.network.feed(entries)
+        timings = self.timings
+        if probe.get("hasBody"):
+            self.mark("body")
+        if probe.get("readyState") == "complete":
+            self.mark("load")
+        if probe.get("matched"):
+            self.mark("selector")
+        quiet_ms = probe.get("quietMs")
+        dom_quiet = quiet_ms is not None and quiet_ms >= DOM_QUIET_MS
+        if dom_quiet:
+            self.mark("dom_quiet")
+        network_idle = self.network.idle_for() >= NETWORK_IDLE_MS
+        if network_idle:
+            self.mark("network_idle")
+
+        if not self.stealth and "load" in timings and (not self.selectors or "selector" in timings):
+            return "load"
+        if self.stealth and self.selectors and "selector" in timings and (dom_quiet or network_idle):
+            return "selector"
+        if self.stealth and not self.selectors and "body" in timings and dom_quiet and network_idle:
+            return "quiescent"
+        if time.monotonic() - self.started >= self.ceiling:
+            return "ceiling"
+        return None
+
+    def finish(self, reason):
+        self.timings["ready"] = round(time.monotonic() - self.started, 3)
+        self.timings["reason"] = reason
+        return self.timings, self.network.entries
+
+
+def wait_until_ready(driver, url, stealth, read_log, ceiling=None):
+    """等待页面就绪，返回 (各信号耗时, 期间收集的网络日志)"""
+    check = ReadinessCheck(url, stealth, ceiling)
+    while True:
+        try:
+            probe = driver.execute_script(PROBE_JS, check.selectors, MIN_SELECTOR_TEXT) or {}
+        except Exception:
+            probe = {}
+        reason = check.observe(probe, read_log())
+        if reason:
+            return check.finish(reason)
+        time.sleep(POLL_INTERVAL)
+
+
+async def async_wait_until_ready(probe, url, stealth, read_log, ceiling=None):
+    """wait_until_ready 的asyncio版本，probe 为 async (selectors, min_text) -> dict"""
+    check = ReadinessCheck(url, stealth, ceiling)
+    while True:
+        try:
+            result = await probe(check.selectors, MIN_SELECTOR_TEXT) or {}
+        except Exception:
+            result = {}
+        reason = check.observe(result, read_log())
+        if reason:
+            return check.finish(reason)
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+class ReadinessStats:
+    """按域名汇总各信号耗时，用于调优选择器和上限"""
+
+    SIGNALS = ("body", "load", "selector", "dom_quiet", "network_idle", "ready")
+
+    def __init__(self, window=200, max_domains=500):
+        self.window = window
+        self.max_domains = max_domains
+        self._domains = OrderedDict()  # 超过 max_domains 时丢弃最久未出现的域名
+        self._lock = threading.Lock()
+
+    def record(self, url, timings):
+        domain = (urlparse(url).hostname or '').lower()
+        with self._lock:
+            stats = self._domains.pop(domain, None) or {"samples": 0, "reasons": {}, "signals": {}}
+            self._domains[domain] = stats
+            while len(self._domains) > self.max_domains:
+                self._domains.popitem(last=False)
+            stats["samples"] += 1
+            stats["reasons"][timings["reason"]] = stats["reasons"].get(timings["reason"], 0) + 1
+            for signal in self.SIGNALS:
+                if signal in timings:
+                    samples = stats["signals"].setdefault(signal, [])
+                    samples.append(timings[signal])
+                    del samples[:-self.window]
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for domain, stats in self._domains.items():
+                signals = {}
+                for signal, samples in stats["signals"].items():
+                    ordered = sorted(samples)
+                    signals[signal] = {
+                        "mean": round(sum(ordered) / len(ordered), 3),
+                        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                        "seen": len(ordered),
+                    }
+                result[domain] = {"samples": stats["samples"], "reasons": dict(stats["reasons"]), "signals": signals}
+            return result
+
+
+readiness_stats = ReadinessStats()
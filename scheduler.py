@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 准入控制
+限制同时运行的浏览器提取数量，超出部分进入有界等待队列，队列满或等待超时则快速拒绝。
+等待队列分为两条通道: interactive (/api 等同步请求) 总是先于 bulk (异步任务) 获得名额
+"""
+
+import os
+import math
+import time
+import asyncio
+from collections import deque
+
+# 每个无头Chrome大致占用的内存
+BROWSER_MEMORY_MB = 250
+
+LANES = ("interactive", "bulk")
+
+
+class Overloaded(Exception):
+    """服务过载: status_code 为 429 (队列已满) 或 503 (排队超时)"""
+
+    def __init__(self, status_code, retry_after, reason):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Lane:
+    """一次提取所在的通道。单飞合并的提取由多个请求共享: 交互式请求加入时提升为 interactive，
+    正在 bulk 通道排队的名额请求随之移到 interactive 通道"""
+
+    def __init__(self, name="interactive"):
+        self.name = name
+        self._admission = None
+        self._waiter = None
+
+    def promote(self):
+        if self.name == "interactive":
+            return
+        self.name = "interactive"
+        if self._waiter is not None:
+            self._admission._promote(self._waiter)
+
+
+def available_memory_mb():
+    """可用内存 (Linux读取MemAvailable，其他平台退回物理内存总量)"""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+
+def default_worker_count():
+    """根据CPU核数和可用内存推算浏览器并发数"""
+    cpus = os.cpu_count() or 1
+    memory_mb = available_memory_mb()
+    by_memory = memory_mb // BROWSER_MEMORY_MB if memory_mb else cpus
+    return max(1, min(cpus, by_memory))
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    """计算分位数 (最近邻法)"""
+    if not samples:
+        return {f"p{p}": 0.0 for p in points}
+    ordered = sorted(samples)
+    result = {}
+    for p in points:
+        index = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+        result[f"p{p}"] = round(ordered[index], 4)
+    return result
+
+
+class AdmissionController:
+    """有界并发 + 有界等待队列 (通道内先进先出，interactive 通道优先)。
+    bulk 通道的等待者数量由任务执行器的并发数限定，不占用队列长度，也只在调用方给出超时时才会超时"""
+
+    def __init__(self, workers, queue_size, queue_timeout, window=1000):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self._running = 0
+        self._waiters = {lane: deque() for lane in LANES}
+        self._wait_times = deque(maxlen=window)
+        self._service_time = 5.0
+        self._stats = {"admitted": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    def _retry_after(self):
+        """按平均处理时间估算队列清空所需时间"""
+        backlog = len(self._waiters["interactive"]) + 1
+        return max(1, int(self._service_time * backlog / self.workers + 0.5))
+
+    def _queued(self):
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def acquire(self, timeout=None, lane="interactive"):
+        """lane 为通道名或 Lane (排队期间可被提升)"""
+        shared = lane if isinstance(lane, Lane) else None
+        lane = lane.name if shared is not None else lane
+        if self._running < self.workers and not self._queued():
+            self._running += 1
+            self._admitted(0.0)
+            return
+
+        waiters = self._waiters[lane]
+        if lane == "interactive" and len(waiters) >= self.queue_size:
+            self._stats["rejected_queue_full"] += 1
+            raise Overloaded(429, self._retry_after(), "queue full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        if shared is not None:
+            shared._admission, shared._waiter = self, waiter
+        started = time.monotonic()
+        if lane == "interactive":
+            queue_timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        else:
+            queue_timeout = timeout
+        try:
+            await asyncio.wait_for(waiter, timeout=queue_timeout)
+        except asyncio.TimeoutError:
+            self._forget(waiter)
+            self._stats["rejected_timeout"] += 1
+            raise Overloaded(503, self._retry_after(), "queue timeout")
+        except asyncio.CancelledError:
+            self._forget(waiter)
+            # 取消的同时恰好被分配到名额，需要交还
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if shared is not None:
+                shared._waiter = None
+        self._admitted(time.monotonic() - started)
+
+    def _admitted(self, waited):
+        self._stats["admitted"] += 1
+        self._wait_times.append(waited)
+
+    def _promote(self, waiter):
+        """排队中的 bulk 名额请求移到 interactive 通道末尾"""
+        try:
+            self._waiters["bulk"].remove(waiter)
+        except ValueError:
+            return
+        self._waiters["interactive"].append(waiter)
+
+    def _forget(self, waiter):
+        for waiters in self._waiters.values():
+            try:
+                waiters.remove(waiter)
+                return
+            except ValueError:
+                pass
+
+    def release(self, service_time=None):
+        if service_time is not None:
+            self._service_time = 0.8 * self._service_time + 0.2 * service_time
+        # 名额直接移交给队首的等待者，interactive 通道优先
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self._running -= 1
+
+    def release_when_done(self, future):
+        """名额一直占用到后台任务真正结束 (等待者超时不会提前释放名额)"""
+        started = time.monotonic()
+
+        def done(f):
+            if not f.cancelled():
+                f.exception()
+            self.release(time.monotonic() - started)
+
+        future.add_done_callback(done)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queue_depth": len(self._waiters["interactive"]),
+            "bulk_queue_depth": len(self._waiters["bulk"]),
+            "queue_size": self.queue_size,
+            "queue_timeout": self.queue_timeout,
+            "avg_service_time": round(self._service_time, 3),
+            "wait_time": percentiles(list(self._wait_times)),
+            **self._stats
+        }
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 浏览器会话存储
+每次浏览器提取都在全新的上下文中进行，反检测网站的首次访问要经过验证脚本、跳转和同意弹窗。
+这里按域名保存提取成功后的cookie和localStorage，下次打开同一域名时先恢复，跳过首次访问的代价：
+- 每个域名最多保留 FOXREAD_SESSION_POOL 份会话，按最久未用轮流借出；
+- 会话超过 FOXREAD_SESSION_TTL 秒或使用 FOXREAD_SESSION_MAX_USES 次后淘汰，遇到验证页面立即丢弃；
+- 后台定期为 FOXREAD_SESSION_WARMUP 中的入口页面和最近访问过的反检测网站预热新会话，遇到验证页面后停止预热该域名。
+会话保存在SQLite中 (FOXREAD_SESSION_DB)，同一台机器上的多个worker进程共用。
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+
+from politeness import registrable_domain
+from shared_state import data_path, ensure_parent
+
+SESSION_MODE = os.environ.get("FOXREAD_SESSIONS", "stealth")  # stealth = 只用于反检测网站，all = 所有浏览器提取，off = 关闭
+SESSION_DB = os.environ.get("FOXREAD_SESSION_DB", data_path("foxread_sessions.db"))
+SESSION_POOL = int(os.environ.get("FOXREAD_SESSION_POOL", "3"))  # 每个域名保留的会话数
+SESSION_TTL = int(os.environ.get("FOXREAD_SESSION_TTL", "21600"))
+SESSION_MAX_USES = int(os.environ.get("FOXREAD_SESSION_MAX_USES", "50"))
+SESSION_WARMUP = [url for url in os.environ.get("FOXREAD_SESSION_WARMUP", "").split(",") if url]
+WARMUP_INTERVAL = int(os.environ.get("FOXREAD_SESSION_WARMUP_INTERVAL", "300"))
+STORAGE_MAX_BYTES = 256 * 1024  # 单个会话保存的localStorage上限
+SESSION_DOMAINS = 500  # 保留统计的域名数，超出时丢弃最久未访问的
+
+# Network.setCookies 接受的cookie字段
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
+# 在页面中读取当前源的localStorage
+CAPTURE_STORAGE_JS = "JSON.stringify({origin: location.origin, items: Object.assign({}, localStorage)})"
+
+
+def restore_script(storage):
+    """注入到新文档的脚本: 每个源在本标签页中只恢复一次，之后页面自己的写入不会被覆盖"""
+    return (
+        "(function(saved) {"
+        " var items = saved[location.origin]; if (!items) return;"
+        " try {"
+        "  if (sessionStorage.getItem('__foxread_session')) return;"
+        "  for (var key in items) localStorage.setItem(key, items[key]);"
+        "  sessionStorage.setItem('__foxread_session', '1');"
+        " } catch (e) {}"
+        f"}})({json.dumps(storage, ensure_ascii=False)})"
+    )
+
+
+def cookie_params(cookies, domain, now=None):
+    """只保留属于该域名且未过期的cookie，转换为 Network.setCookies 参数 (会话cookie不带expires)"""
+    now = now or time.time()
+    kept = []
+    for cookie in cookies:
+        host = cookie.get("domain", "").lstrip(".")
+        if host != domain and not host.endswith("." + domain):
+            continue
+        expires = cookie.get("expires", -1)
+        if expires and 0 < expires < now:
+            continue
+        param = {field: cookie[field] for field in COOKIE_FIELDS if field in cookie}
+        if not expires or expires < 0:
+            param.pop("expires", None)
+        kept.append(param)
+    return kept
+
+
+def merge_storage(saved, captured):
+    """把本次读取的localStorage合并到会话中，超过上限时不保存该源"""
+    storage = dict(saved or {})
+    if not captured:
+        return storage
+    try:
+        captured = json.loads(captured)
+    except (TypeError, ValueError):
+        return storage
+    origin, items = captured.get("origin"), captured.get("items") or {}
+    if origin and origin.startswith("http"):
+        if len(json.dumps(items, ensure_ascii=False).encode("utf-8")) <= STORAGE_MAX_BYTES:
+            storage[origin] = items
+    return storage
+
+
+class SessionStore:
+    """SQLite会话表: 每行一份域名会话 (cookie + localStorage)"""
+
+    def __init__(self, path=SESSION_DB, pool=SESSION_POOL, ttl=SESSION_TTL, max_uses=SESSION_MAX_USES):
+        self.path = path
+        self.pool = max(1, pool)
+        self.ttl = ttl
+        self.max_uses = max_uses
+        self._lock = threading.Lock()
+        ensure_parent(path)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, domain TEXT, cookies TEXT, storage TEXT, url TEXT, "
+            "created_at REAL, last_used REAL, uses INTEGER DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_domain ON sessions (domain, last_used)")
+
+    def _transaction(self, func):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._db)
+                self._db.execute("COMMIT")
+                return result
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _expire(self, db, domain):
+        return db.execute("DELETE FROM sessions WHERE domain = ? AND (created_at < ? OR uses >= ?)",
+                          (domain, time.time() - self.ttl, self.max_uses)).rowcount
+
+    def checkout(self, domain):
+        """借出最久未用的有效会话，返回 (会话, 淘汰数)；没有时会话为None"""
+        def checkout(db):
+            expired = self._expire(db, domain)
+            row = db.execute("SELECT * FROM sessions WHERE domain = ? ORDER BY last_used LIMIT 1", (domain,)).fetchone()
+            if row is None:
+                return None, expired
+            db.execute("UPDATE sessions SET last_used = ?, uses = uses + 1 WHERE id = ?", (time.time(), row["id"]))
+            session = {"id": row["id"], "domain": domain, "cookies": json.loads(row["cookies"]),
+                       "storage": json.loads(row["storage"]), "uses": row["uses"] + 1}
+            return session, expired
+        return self._transaction(checkout)
+
+    def save(self, domain, session_id, cookies, storage, url):
+        """更新借出的会话；新会话在池满时替换最早创建的一份"""
+        def save(db):
+            now = time.time()
+            payload = (json.dumps(cookies, ensure_ascii=False), json.dumps(storage, ensure_ascii=False), url)
+            if session_id and db.execute("UPDATE sessions SET cookies = ?, storage = ?, url = ? WHERE id = ?",
+                                         (*payload, session_id)).rowcount:
+                return session_id
+            count = db.execute("SELECT COUNT(*) FROM sessions WHERE domain = ?", (domain,)).fetchone()[0]
+            if count >= self.pool:
+                db.execute("DELETE FROM sessions WHERE id IN (SELECT id FROM sessions WHERE domain = ? "
+                           "ORDER BY created_at LIMIT ?)", (domain, count - self.pool + 1))
+            new_id = uuid.uuid4().hex
+            db.execute("INSERT INTO sessions (id, domain, cookies, storage, url, created_at, last_used, uses) "
+                       "VALUES (?, ?, ?, ?, ?, ?, ?, 0)", (new_id, domain, *payload, now, now))
+            return new_id
+        return self._transaction(save)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def available(self, domain):
+        """该域名当前有效的会话数"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM sessions WHERE domain = ? AND created_at >= ? AND uses < ?",
+                (domain, time.time() - self.ttl, self.max_uses)).fetchone()[0]
+
+    def counts(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT domain, COUNT(*) FROM sessions GROUP BY domain").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class DomainSessionStats:
+    """一个域名的会话复用效果: 复用与全新会话的导航耗时、验证页面次数"""
+
+    def __init__(self):
+        self.stats = {"reused": 0, "fresh": 0, "saved": 0, "expired": 0, "discarded": 0,
+                      "challenges_reused": 0, "challenges_fresh": 0, "warmups": 0}
+        self.seconds = {"reused": 0.0, "fresh": 0.0}
+        self.last_url = None
+        self.last_seen = 0.0
+        self.stealth = False
+        self.challenged = False  # 最近一次结果是验证页面: 不再预热，直到有请求重新成功
+
+    def record(self, reused, outcome, navigation_seconds):
+        kind = "reused" if reused else "fresh"
+        if outcome in ("challenge", "success"):
+            self.challenged = outcome == "challenge"
+        if outcome == "challenge":
+            self.stats[f"challenges_{kind}"] += 1
+        elif outcome == "success" and navigation_seconds is not None:
+            self.stats[kind] += 1
+            self.seconds[kind] += navigation_seconds
+
+    def snapshot(self, stored):
+        averages = {kind: self.seconds[kind] / self.stats[kind] if self.stats[kind] else None
+                    for kind in ("reused", "fresh")}
+        saved = None
+        if averages["reused"] is not None and averages["fresh"] is not None:
+            saved = max(0.0, averages["fresh"] - averages["reused"]) * self.stats["reused"]
+        return {
+            **self.stats,
+            "stored": stored,
+            "reused_avg_navigation_ms": round(averages["reused"] * 1000) if averages["reused"] is not None else None,
+            "fresh_avg_navigation_ms": round(averages["fresh"] * 1000) if averages["fresh"] is not None else None,
+            "navigation_seconds_saved": round(saved, 3) if saved is not None else None,
+        }
+
+
+class SessionManager:
+    """浏览器提取前借出域名会话，提取后保存或丢弃，并在后台预热"""
+
+    def __init__(self, store, mode=SESSION_MODE, warmup=None, interval=WARMUP_INTERVAL):
+        self.store = store
+        self.mode = mode
+        self.warmup = list(SESSION_WARMUP if warmup is None else warmup)
+        self.interval = interval
+        self._domains = OrderedDict()
+        self._task = None
+
+    def applies(self, stealth):
+        return self.mode == "all" or (self.mode == "stealth" and stealth)
+
+    def _domain(self, url):
+        domain = registrable_domain(url)
+        stats = self._domains.pop(domain, None) or DomainSessionStats()
+        self._domains[domain] = stats
+        while len(self._domains) > SESSION_DOMAINS:
+            self._domains.popitem(last=False)
+        return domain, stats
+
+    async def checkout(self, url, stealth=False):
+        domain, stats = self._domain(url)
+        stats.last_url, stats.last_seen, stats.stealth = url, time.time(), stealth
+        session, expired = await asyncio.get_running_loop().run_in_executor(None, self.store.checkout, domain)
+        stats.stats["expired"] += expired
+        return session
+
+    async def checkin(self, url, session, outcome, load_info):
+        """按页面结果 (success / challenge / failure) 保存或丢弃会话"""
+        domain, stats = self._domain(url)
+        state = load_info.pop("session_state", None)
+        stats.record(session is not None, outcome, load_info.get("navigation_seconds"))
+
+        loop = asyncio.get_running_loop()
+        if outcome == "challenge" and session is not None:
+            # 这份会话已被识别，继续复用只会一直遇到验证
+            stats.stats["discarded"] += 1
+            await loop.run_in_executor(None, self.store.discard, session["id"])
+        elif outcome == "success" and state is not None:
+            cookies = cookie_params(state.get("cookies") or [], domain)
+            storage = merge_storage(session["storage"] if session else None, state.get("storage"))
+            if cookies or storage:
+                stats.stats["saved"] += 1
+                await loop.run_in_executor(None, self.store.save, domain, session["id"] if session else None,
+                                           cookies, storage, url)
+
+    def warmup_targets(self):
+        """需要预热的 (域名, 入口URL): 配置的入口页面，以及在会话有效期内访问过的反检测网站；
+        最近遇到验证页面的域名不预热 (每轮都去碰只会继续被拦截)"""
+        targets = {registrable_domain(url): url for url in self.warmup}
+        cutoff = time.time() - self.store.ttl
+        for domain, stats in self._domains.items():
+            if stats.stealth and stats.last_url and stats.last_seen >= cutoff:
+                targets.setdefault(domain, stats.last_url)
+        return {domain: url for domain, url in targets.items()
+                if domain not in self._domains or not self._domains[domain].challenged}
+
+    def start(self, warm):
+        """启动后台预热: warm(url) 在浏览器中打开页面并保存新会话，成功保存时返回True"""
+        self._task = asyncio.ensure_future(self._warm_loop(warm))
+
+    async def _warm_loop(self, warm):
+        loop = asyncio.get_running_loop()
+        while True:
+            for domain, url in self.warmup_targets().items():
+                if await loop.run_in_executor(None, self.store.available, domain) >= self.store.pool:
+                    continue
+                try:
+                    if await warm(url):
+                        self._domain(url)[1].stats["warmups"] += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"⚠️  会话预热失败 {domain}: {e}", file=sys.stderr)
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.store.close()
+
+    def saved_seconds(self):
+        """每个域名估计节省的导航时间 (不查询数据库，供指标抓取使用)"""
+        saved = {}
+        for domain, stats in self._domains.items():
+            seconds = stats.snapshot(0)["navigation_seconds_saved"]
+            if seconds is not None:
+                saved[domain] = seconds
+        return saved
+
+    async def stats(self):
+        counts = await asyncio.get_running_loop().run_in_executor(None, self.store.counts)
+        return {
+            "mode": self.mode,
+            "pool": self.store.pool,
+            "ttl": self.store.ttl,
+            "max_uses": self.store.max_uses,
+            "domains": {domain: stats.snapshot(counts.get(domain, 0)) for domain, stats in self._domains.items()},
+        }
+
+
+def open_sessions(mode=SESSION_MODE, path=SESSION_DB):
+    """按 FOXREAD_SESSIONS 打开会话存储，关闭时返回None"""
+    if mode == "off":
+        return None
+    return SessionManager(SessionStore(path), mode)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+🦊 FoxRead 跨进程共享状态
+多个uvicorn worker、多台机器之间共享: 单飞租约、域名令牌桶 (含验证页面冷却) 和浏览器任务队列。
+本机用SQLite (WAL)，跨机器用Redis兼容存储 (需安装 redis)。
+
+FOXREAD_SHARED_STATE:
+    sqlite:////var/lib/foxread/state.db  或直接写文件路径
+    redis://localhost:6379/0
+"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("FOXREAD_DATA_DIR", os.path.join(ROOT, "data"))  # 任务队列、会话、变化检测等SQLite文件的目录
+SHARED_STATE = os.environ.get("FOXREAD_SHARED_STATE", "")
+JOB_CLAIM_SECONDS = float(os.environ.get("FOXREAD_JOB_CLAIM_SECONDS", "120"))  # 浏览器节点领取任务后多久未完成则重新排队
+RESULT_TTL = 300
+
+
+def data_path(name):
+    """数据目录中的文件路径 (目录在打开数据库时才创建)"""
+    return os.path.join(DATA_DIR, name)
+
+
+def ensure_parent(path):
+    """创建文件所在的目录"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+
+def sqlite_path(url):
+    """共享状态和缓存磁盘层共用的SQLite地址解析: sqlite:///相对路径、sqlite:////绝对路径，或直接写文件路径"""
+    if url.startswith("sqlite:///"):
+        return url[len("sqlite:///"):] or data_path("foxread_state.db")
+    if url.startswith("sqlite:"):
+        raise ValueError(f"SQLite地址应为 sqlite:///相对路径 或 sqlite:////绝对路径: {url}")
+    return url
+
+
+class SQLiteState:
+    """同一台机器上多个进程共享的状态 (一个SQLite文件)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        ensure_parent(path)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS buckets ("
+                         "name TEXT PRIMARY KEY, tokens REAL, updated REAL, blocked_until REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS jobs ("
+                         "id TEXT PRIMARY KEY, seq INTEGER, payload TEXT, state TEXT, worker TEXT, "
+                         "claimed_at REAL, result TEXT, finished_at REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (state, seq)")
+
+    def _transaction(self, func):
+        """BEGIN IMMEDIATE 事务: 读-改-写期间其他进程不能写入"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._db)
+                self._db.execute("COMMIT")
+                return result
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    # ---- 单飞租约 ----
+
+    def try_lease(self, key, owner, ttl):
+        def claim(db):
+            now = time.time()
+            db.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+            cursor = db.execute("INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                                (key, owner, now + ttl))
+            return cursor.rowcount == 1
+        return self._transaction(claim)
+
+    def release_lease(self, key, owner):
+        with self._lock:
+            self._db.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    # ---- 令牌桶 ----
+
+    def take_token(self, name, rate, burst):
+        """取一个令牌，成功返回0，否则返回需要等待的秒数"""
+        def take(db):
+            now = time.time()
+            row = db.execute("SELECT tokens, updated, blocked_until FROM buckets WHERE name = ?", (name,)).fetchone()
+            tokens, updated, blocked_until = row or (float(burst), now, 0.0)
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            if blocked_until > now:
+                wait = blocked_until - now
+            elif tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            db.execute("INSERT OR REPLACE INTO buckets (name, tokens, updated, blocked_until) VALUES (?, ?, ?, ?)",
+                       (name, tokens, now, blocked_until))
+            return wait
+        return self._transaction(take)
+
+    def block(self, name, seconds):
+        """所有进程在 seconds 秒内暂停该令牌桶并清空令牌 (遇到验证页面)"""
+        def update(db):
+            until = time.time() + seconds
+            db.execute("INSERT INTO buckets (name, tokens, updated, blocked_until) VALUES (?, 0, ?, ?) "
+                       "ON CONFLICT(name) DO UPDATE SET tokens = 0, updated = excluded.updated, "
+                       "blocked_until = MAX(blocked_until, excluded.blocked_until)", (name, time.time(), until))
+        self._transaction(update)
+
+    # ---- 浏览器任务队列 ----
+
+    def push_job(self, job_id, payload):
+        def push(db):
+            seq = db.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM jobs").fetchone()[0]
+            db.execute("INSERT INTO jobs (id, seq, payload, state) VALUES (?, ?, ?, 'queued')",
+                       (job_id, seq, json.dumps(payload, ensure_ascii=False)))
+        self._transaction(push)
+
+    def claim_job(self, worker):
+        """领取最早的任务，返回 (job_id, payload) 或 None；超时未完成的任务先重新排队"""
+        def claim(db):
+            now = time.time()
+            db.execute("UPDATE jobs SET state = 'queued', worker = NULL WHERE state = 'running' AND claimed_at < ?",
+                       (now - JOB_CLAIM_SECONDS,))
+            db.execute("DELETE FROM jobs WHERE state = 'done' AND finished_at < ?", (now - RESULT_TTL,))
+            row = db.execute("SELECT id, payload FROM jobs WHERE state = 'queued' ORDER BY seq LIMIT 1").fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET state = 'running', worker = ?, claimed_at = ? WHERE id = ?", (worker, now, row[0]))
+            return row[0], json.loads(row[1])
+        return self._transaction(claim)
+
+    def finish_job(self, job_id, result):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET state = 'done', result = ?, finished_at = ? WHERE id = ?",
+                             (json.dumps(result, ensure_ascii=False), time.time(), job_id))
+
+    def job_result(self, job_id):
+        """取走已完成任务的结果，未完成返回None。
+        只有提交任务的前端会取这个结果，不需要写事务: 轮询时只读，不占用其他进程的写锁"""
+        with self._lock:
+            row = self._db.execute("SELECT result FROM jobs WHERE id = ? AND state = 'done'", (job_id,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return json.loads(row[0])
+
+    def cancel_job(self, job_id):
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def stats(self):
+        with self._lock:
+            jobs = dict(self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+            leases = self._db.execute("SELECT COUNT(*) FROM leases WHERE expires_at >= ?", (time.time(),)).fetchone()[0]
+        return {"backend": "sqlite", "path": self.path, "leases": leases,
+                "jobs_queued": jobs.get("queued", 0), "jobs_running": jobs.get("running", 0)}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# 只删除自己持有的租约: 比较和删除在Redis端原子执行 (租约可能刚过期并被其他进程取得)
+_RELEASE_LEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# 令牌桶的读-改-写在Redis端原子执行
+_TAKE_TOKEN = """
+local now = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'blocked_until')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+local blocked_until = tonumber(state[3]) or 0
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if blocked_until > now then
+    wait = blocked_until - now
+elseif tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now, 'blocked_until', blocked_until)
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+# 暂停令牌桶: blocked_until 只延后不提前，多个进程同时写入也不会互相覆盖
+_BLOCK_BUCKET = """
+local now = tonumber(ARGV[1])
+local until_ = tonumber(ARGV[2])
+local blocked_until = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+redis.call('HSET', KEYS[1], 'tokens', 0, 'updated', now, 'blocked_until', math.max(blocked_until, until_))
+redis.call('EXPIRE', KEYS[1], 3600)
+return 1
+"""
+
+
+class RedisState:
+    """跨机器共享的状态 (Redis兼容存储)；任务队列为至多一次投递，领取后节点崩溃的任务由前端超时处理"""
+
+    def __init__(self, url, prefix="foxread:"):
+        if redis is None:
+            raise RuntimeError("FOXREAD_SHARED_STATE 使用Redis需要安装 redis: pip install redis")
+        self.url = url
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+        self._take_token = self._redis.register_script(_TAKE_TOKEN)
+        self._release_lease = self._redis.register_script(_RELEASE_LEASE)
+        self._block_bucket = self._redis.register_script(_BLOCK_BUCKET)
+
+    def try_lease(self, key, owner, ttl):
+        return bool(self._redis.set(f"{self.prefix}lease:{key}", owner, nx=True, px=int(ttl * 1000)))
+
+    def release_lease(self, key, owner):
+        self._release_lease(keys=[f"{self.prefix}lease:{key}"], args=[owner])
+
+    def take_token(self, name, rate, burst):
+        return float(self._take_token(keys=[f"{self.prefix}bucket:{name}"], args=[time.time(), rate, burst]))
+
+    def block(self, name, seconds):
+        now = time.time()
+        self._block_bucket(keys=[f"{self.prefix}bucket:{name}"], args=[now, now + seconds])
+
+    def push_job(self, job_id, payload):
+        self._redis.lpush(f"{self.prefix}jobs", json.dumps({"id": job_id, "payload": payload}, ensure_ascii=False))
+
+    def claim_job(self, worker):
+        item = self._redis.brpop(f"{self.prefix}jobs", timeout=1)
+        if item is None:
+            return None
+        job = json.loads(item[1])
+        if self._redis.exists(f"{self.prefix}cancelled:{job['id']}"):
+            return None
+        return job["id"], job["payload"]
+
+    def finish_job(self, job_id, result):
+        self._redis.set(f"{self.prefix}result:{job_id}", json.dumps(result, ensure_ascii=False), ex=RESULT_TTL)
+
+    def job_result(self, job_id):
+        name = f"{self.prefix}result:{job_id}"
+        value = self._redis.get(name)
+        if value is None:
+            return None
+        self._redis.delete(name)
+        return json.loads(value)
+
+    def cancel_job(self, job_id):
+        self._redis.set(f"{self.prefix}cancelled:{job_id}", 1, ex=RESULT_TTL)
+
+    def stats(self):
+        return {"backend": "redis", "url": self.url, "jobs_queued": self._redis.llen(f"{self.prefix}jobs")}
+
+    def close(self):
+        self._redis.close()
+
+
+def open_state(url):
+    """按 FOXREAD_SHARED_STATE 打开共享状态，未配置时返回None (只在进程内共享)"""
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisState(url)
+    return SQLiteState(sqlite_path(url))
+
+
+class SharedBuckets:
+    """politeness.DomainLimiter 使用的跨进程令牌桶 (同步存储调用放到线程池)"""
+
+    def __init__(self, state):
+        self.state = state
+
+    async def take(self, domain, rate, burst):
+        return await asyncio.get_running_loop().run_in_executor(None, self.state.take_token, f"domain:{domain}", rate, burst)
+
+    async def block(self, domain, seconds):
+        await asyncio.get_running_loop().run_in_executor(None, self.state.block, f"domain:{domain}", seconds)
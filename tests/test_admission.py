@@ -0,0 +1,128 @@
+"""🦊 准入控制: 队列满/排队超时拒绝、interactive 优先、bulk 名额请求提升通道"""
+
+import os
+import sys
+import asyncio
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scheduler import AdmissionController, Lane, Overloaded
+
+
+def run(scenario):
+    return asyncio.run(scenario())
+
+
+async def admitted_order(admission, requests):
+    """按顺序排队 (名字, 通道)；返回放行顺序 (随放行增长) 和排队的任务"""
+    order = []
+
+    async def request(name, lane):
+        await admission.acquire(lane=lane)
+        order.append(name)
+
+    tasks = []
+    for name, lane in requests:
+        tasks.append(asyncio.ensure_future(request(name, lane)))
+        await asyncio.sleep(0)
+    return order, tasks
+
+
+def test_admits_immediately_under_capacity():
+    async def scenario():
+        admission = AdmissionController(workers=2, queue_size=1, queue_timeout=1)
+        await admission.acquire()
+        await admission.acquire(lane="bulk")
+        return admission.stats()
+
+    stats = run(scenario)
+    assert stats["running"] == 2
+    assert stats["admitted"] == 2
+
+
+def test_rejects_when_queue_full_or_timed_out():
+    async def scenario():
+        admission = AdmissionController(workers=1, queue_size=1, queue_timeout=0.05)
+        await admission.acquire()
+        queued = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as full:
+            await admission.acquire()
+        with pytest.raises(Overloaded) as timed_out:
+            await queued
+        return admission, full.value, timed_out.value
+
+    admission, full, timed_out = run(scenario)
+    assert full.status_code == 429
+    assert timed_out.status_code == 503
+    assert admission.stats()["queue_depth"] == 0
+
+
+def test_bulk_waiters_do_not_count_against_queue_size():
+    async def scenario():
+        admission = AdmissionController(workers=1, queue_size=0, queue_timeout=1)
+        await admission.acquire()
+        bulk = [asyncio.ensure_future(admission.acquire(lane="bulk")) for _ in range(3)]
+        await asyncio.sleep(0)
+        depth = admission.stats()["bulk_queue_depth"]
+        for task in bulk:
+            task.cancel()
+        await asyncio.gather(*bulk, return_exceptions=True)
+        return depth, admission.stats()
+
+    depth, stats = run(scenario)
+    assert depth == 3
+    assert stats["bulk_queue_depth"] == 0
+    assert stats["running"] == 1
+
+
+def test_interactive_admitted_before_bulk():
+    async def scenario():
+        admission = AdmissionController(workers=1, queue_size=5, queue_timeout=1)
+        await admission.acquire()
+        order, tasks = await admitted_order(admission, [("bulk-1", "bulk"), ("api-1", "interactive"),
+                                                        ("bulk-2", "bulk"), ("api-2", "interactive")])
+        for _ in tasks:
+            admission.release()
+            await asyncio.sleep(0)
+        return order
+
+    assert run(scenario) == ["api-1", "api-2", "bulk-1", "bulk-2"]
+
+
+def test_promoted_lane_moves_to_interactive_queue():
+    async def scenario():
+        admission = AdmissionController(workers=1, queue_size=5, queue_timeout=1)
+        await admission.acquire()
+        shared = Lane("bulk")
+        order, tasks = await admitted_order(admission, [("bulk-1", "bulk"), ("shared", shared),
+                                                        ("api-1", "interactive")])
+        shared.promote()
+        depths = admission.stats()["queue_depth"], admission.stats()["bulk_queue_depth"]
+        for _ in tasks:
+            admission.release()
+            await asyncio.sleep(0)
+        return shared, depths, order
+
+    shared, depths, order = run(scenario)
+    assert shared.name == "interactive"
+    assert depths == (2, 1)
+    # 提升后排在已有的 interactive 等待者之后，但先于其他 bulk 等待者
+    assert order == ["api-1", "shared", "bulk-1"]
+
+
+def test_promoting_admitted_lane_only_renames_it():
+    async def scenario():
+        admission = AdmissionController(workers=1, queue_size=5, queue_timeout=1)
+        shared = Lane("bulk")
+        await admission.acquire(lane=shared)
+        shared.promote()
+        return shared, admission.stats()
+
+    shared, stats = run(scenario)
+    assert shared.name == "interactive"
+    assert stats["running"] == 1
+    assert stats["queue_depth"] == 0
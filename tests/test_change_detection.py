@@ -0,0 +1,121 @@
+"""🦊 变化检测: 探测未变、渲染后未变、变化差异和 since 参数"""
+
+import os
+import sys
+import asyncio
+import tempfile
+
+import pytest
+from fastapi import HTTPException
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("FOXREAD_DATA_DIR", tempfile.mkdtemp(prefix="foxread-test-"))
+
+import foxread_api
+from change_detection import ChangeStore
+
+URL = "https://example.com/article"
+CONTENT = "狐狸在森林里寻找猎物。\n" * 50
+
+
+class Site:
+    """可控的探测结论和页面正文，记录渲染次数"""
+
+    def __init__(self):
+        self.verdict = "unknown"
+        self.content = CONTENT
+        self.renders = 0
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    store = ChangeStore(str(tmp_path / "changes.db"), keep=2)
+    site = Site()
+
+    async def probe_changes(url, watch):
+        evidence = "etag" if site.verdict == "unchanged" else "first_probe"
+        return site.verdict, evidence, {"etag": "v", "fingerprint": "x", "complete": True}
+
+    async def cached_extract(url, timeout, no_cache=False):
+        site.renders += 1
+        return {"title": "Fox", "url": url, "content": site.content}, "bypass"
+
+    monkeypatch.setattr(foxread_api, "change_store", store)
+    monkeypatch.setattr(foxread_api, "probe_changes", probe_changes)
+    monkeypatch.setattr(foxread_api, "cached_extract", cached_extract)
+    monkeypatch.setattr(foxread_api, "hunt_succeeded", lambda result: True)
+    yield site
+    store.close()
+
+
+def detect(since=None):
+    return asyncio.run(foxread_api.detect_changes(URL, since))
+
+
+def test_since_on_first_seen_url(site):
+    response = detect(since=1)
+    assert response["changed"] is False
+    assert response["version"] == 1
+    assert response["evidence"] == "content"
+    assert response["changed_at"] is not None
+
+
+def test_probe_unchanged_skips_render(site):
+    detect()
+    site.verdict = "unchanged"
+    response = detect()
+    assert response["changed"] is False
+    assert response["evidence"] == "etag"
+    assert site.renders == 1
+
+
+def test_render_unchanged(site):
+    detect()
+    response = detect()
+    assert response["changed"] is False
+    assert response["evidence"] == "content"
+    assert site.renders == 2
+
+
+def test_changed_with_diff(site):
+    detect()
+    site.content = CONTENT + "新的足迹。\n"
+    response = detect()
+    assert response["changed"] is True
+    assert response["version"] == 2
+    assert response["diff"]["from_version"] == 1
+    assert response["diff"]["added_lines"] == 1
+    assert "+新的足迹。" in response["diff"]["patch"]
+
+
+def test_old_since_with_unchanged_probe_diffs_stored_content(site):
+    detect()
+    site.content = CONTENT + "新的足迹。\n"
+    detect()
+    site.verdict = "unchanged"
+    response = detect(since=1)
+    assert site.renders == 2
+    assert response["changed"] is True
+    assert response["version"] == 2
+    assert response["diff"]["added_lines"] == 1
+    assert response["content"] == site.content
+
+
+def test_evicted_since_is_unknown_base(site):
+    for update in range(3):
+        site.content = CONTENT + f"更新{update}\n"
+        detect()
+    response = detect(since=1)
+    assert response["changed"] is True
+    assert response["evidence"] == "unknown_base"
+    assert response["diff"] is None
+
+
+@pytest.mark.parametrize("since", [0, -1, 5])
+def test_invalid_since_is_rejected(site, since):
+    detect()
+    with pytest.raises(HTTPException) as e:
+        detect(since=since)
+    assert e.value.status_code == 400
+    assert site.renders == 1
@@ -0,0 +1,95 @@
+"""🦊 进程间通信帧: 往返编码、压缩、截断的帧和超过大小上限的帧"""
+
+import os
+import sys
+import asyncio
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ipc
+
+MESSAGE = {
+    "id": 7,
+    "url": "https://example.com/article",
+    "html": "<p>狐狸在森林里寻找猎物。</p>" * 500,
+    "raw": b"\x00\xff" * 3000,
+    "chunks": [["# 标题", 1], {"short": "文本"}],
+    "done": False,
+    "missing": None,
+}
+
+
+def read(data, eof=True):
+    """把字节喂给 StreamReader 后读取一条消息"""
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        if eof:
+            reader.feed_eof()
+        return await ipc.read_message(reader)
+    return asyncio.run(main())
+
+
+def frame(message, compression="none"):
+    return b"".join(ipc.pack(message, compression))
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "zstd"])
+def test_round_trip(compression):
+    # zstd 未安装时退回 zlib，解码端同样能读
+    assert read(frame(MESSAGE, compression)) == MESSAGE
+
+
+def test_long_text_travels_outside_json_head(monkeypatch):
+    monkeypatch.setattr(ipc, "msgpack", None)
+    flags, parts = ipc.encode(MESSAGE)
+    head = parts[1]
+    assert flags == 0
+    assert "狐狸".encode("utf-8") not in head
+    assert ipc.decode(flags, b"".join(parts)) == MESSAGE
+
+
+def test_consecutive_frames():
+    data = frame({"id": 1}) + frame({"id": 2})
+
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return [await ipc.read_message(reader) for _ in range(3)]
+
+    assert asyncio.run(main()) == [{"id": 1}, {"id": 2}, None]
+
+
+def test_closed_connection_returns_none():
+    assert read(b"") is None
+
+
+def test_truncated_body_raises():
+    data = frame(MESSAGE)
+    with pytest.raises(asyncio.IncompleteReadError):
+        read(data[:len(data) // 2])
+
+
+def test_oversized_header_is_rejected_before_reading_body():
+    header = ipc.HEADER.pack(ipc.MAX_FRAME_BYTES + 1, 0)
+    with pytest.raises(ipc.ProtocolError):
+        read(header, eof=False)
+
+
+def test_oversized_message_is_not_sent(monkeypatch):
+    monkeypatch.setattr(ipc, "MAX_FRAME_BYTES", 1024)
+    with pytest.raises(ipc.ProtocolError):
+        ipc.pack(MESSAGE)
+
+
+def test_unsupported_encoding_is_protocol_error(monkeypatch):
+    monkeypatch.setattr(ipc, "msgpack", None)
+    monkeypatch.setattr(ipc, "zstandard", None)
+    with pytest.raises(ipc.ProtocolError):
+        ipc.decode(ipc.FLAG_MSGPACK, b"")
+    with pytest.raises(ipc.ProtocolError):
+        ipc.decompress(ipc.FLAG_ZSTD, b"")
@@ -0,0 +1,81 @@
+"""🦊 跨进程共享状态 (SQLite): 单飞租约、令牌桶冷却和地址解析"""
+
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from shared_state import SQLiteState, sqlite_path
+
+KEY = "https://example.com/article"
+
+
+@pytest.fixture
+def states(tmp_path):
+    """同一个SQLite文件的两个连接，模拟两个worker进程"""
+    path = str(tmp_path / "state.db")
+    first, second = SQLiteState(path), SQLiteState(path)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_lease_is_exclusive_across_processes(states):
+    first, second = states
+    assert first.try_lease(KEY, "worker-1", ttl=30)
+    assert not second.try_lease(KEY, "worker-2", ttl=30)
+    assert second.try_lease("https://example.com/other", "worker-2", ttl=30)
+    assert first.stats()["leases"] == 2
+
+
+def test_release_by_other_owner_keeps_lease(states):
+    first, second = states
+    first.try_lease(KEY, "worker-1", ttl=30)
+    second.release_lease(KEY, "worker-2")
+    assert not second.try_lease(KEY, "worker-2", ttl=30)
+    first.release_lease(KEY, "worker-1")
+    assert second.try_lease(KEY, "worker-2", ttl=30)
+
+
+def test_expired_lease_can_be_taken_over(states):
+    first, second = states
+    assert first.try_lease(KEY, "worker-1", ttl=0.05)
+    time.sleep(0.1)
+    assert first.stats()["leases"] == 0
+    assert second.try_lease(KEY, "worker-2", ttl=30)
+    # 过期的持有者释放时不能删掉新持有者的租约
+    first.release_lease(KEY, "worker-1")
+    assert not first.try_lease(KEY, "worker-1", ttl=30)
+
+
+def test_token_bucket_is_shared(states):
+    first, second = states
+    assert first.take_token("domain:example.com", rate=1, burst=2) == 0
+    assert second.take_token("domain:example.com", rate=1, burst=2) == 0
+    assert first.take_token("domain:example.com", rate=1, burst=2) > 0
+
+
+def test_block_only_extends(states):
+    first, second = states
+    first.block("domain:example.com", 60)
+    second.block("domain:example.com", 1)
+    wait = second.take_token("domain:example.com", rate=10, burst=10)
+    assert 50 < wait <= 60
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///data/state.db", "data/state.db"),
+    ("sqlite:////var/lib/foxread/state.db", "/var/lib/foxread/state.db"),
+    ("/tmp/state.db", "/tmp/state.db"),
+])
+def test_sqlite_path(url, expected):
+    assert sqlite_path(url) == expected
+
+
+def test_sqlite_path_rejects_malformed_url():
+    with pytest.raises(ValueError):
+        sqlite_path("sqlite://state.db")
@@ -0,0 +1,111 @@
+"""🦊 单飞合并: 共享提取任务，等待者超时/取消不影响任务"""
+
+import os
+import sys
+import asyncio
+import tempfile
+
+import pytest
+from fastapi import HTTPException
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("FOXREAD_DATA_DIR", tempfile.mkdtemp(prefix="foxread-test-"))
+
+from foxread_api import SingleFlight
+
+KEY = "https://example.com/article"
+
+
+class Extraction:
+    """可控的提取任务: release() 之前一直挂起，记录启动次数"""
+
+    def __init__(self):
+        self.started = 0
+        self.gate = None
+
+    async def __call__(self, lane):
+        self.started += 1
+        await self.gate.wait()
+        return {"title": "Fox"}
+
+    def release(self):
+        self.gate.set()
+
+
+def run(scenario):
+    async def main():
+        extraction = Extraction()
+        extraction.gate = asyncio.Event()
+        return await scenario(SingleFlight(), extraction)
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_share_one_extraction():
+    async def scenario(flight, extraction):
+        waiters = [asyncio.ensure_future(flight.run(KEY, extraction, timeout=5)) for _ in range(3)]
+        await asyncio.sleep(0)
+        extraction.release()
+        results = await asyncio.gather(*waiters)
+        return flight, extraction, results
+
+    flight, extraction, results = run(scenario)
+    assert extraction.started == 1
+    assert results[0] is results[1] is results[2]
+    assert flight.snapshot()["in_flight"] == 0
+    assert flight.stats["leaders"] == 1 and flight.stats["coalesced"] == 2
+
+
+def test_cancelled_waiter_does_not_cancel_extraction():
+    async def scenario(flight, extraction):
+        first = asyncio.ensure_future(flight.run(KEY, extraction, timeout=5))
+        second = asyncio.ensure_future(flight.run(KEY, extraction, timeout=5))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        extraction.release()
+        return flight, extraction, first, await second
+
+    flight, extraction, first, result = run(scenario)
+    assert first.cancelled()
+    assert result == {"title": "Fox"}
+    assert extraction.started == 1
+    assert flight.stats["waiter_cancelled"] == 1
+
+
+def test_waiter_timeout_keeps_extraction_for_later_requests():
+    async def scenario(flight, extraction):
+        with pytest.raises(HTTPException) as e:
+            await flight.run(KEY, extraction, timeout=0.01)
+        assert e.value.status_code == 408
+        # 超时后提取仍在进行，新请求加入同一个任务
+        assert flight.snapshot()["in_flight"] == 1
+        later = asyncio.ensure_future(flight.run(KEY, extraction, timeout=5))
+        await asyncio.sleep(0)
+        extraction.release()
+        return flight, extraction, await later
+
+    flight, extraction, result = run(scenario)
+    assert result == {"title": "Fox"}
+    assert extraction.started == 1
+    assert flight.stats["waiter_timeouts"] == 1
+    assert flight.snapshot()["in_flight"] == 0
+
+
+def test_failed_extraction_is_forgotten():
+    async def scenario(flight, extraction):
+        async def broken(lane):
+            raise RuntimeError("boom")
+        with pytest.raises(RuntimeError):
+            await flight.run(KEY, broken, timeout=5)
+        await asyncio.sleep(0)
+        # 失败的任务不会留在表里，下一次请求重新提取
+        waiter = asyncio.ensure_future(flight.run(KEY, extraction, timeout=5))
+        await asyncio.sleep(0)
+        extraction.release()
+        return extraction, await waiter
+
+    extraction, result = run(scenario)
+    assert extraction.started == 1
+    assert result == {"title": "Fox"}
+
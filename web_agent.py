@@ -8,26 +8,21 @@ import sys
 import subprocess
 import argparse
 import json
-import time
 from urllib.parse import urlparse
 
 def check_dependencies():
-    """检查依赖"""
+    """检查依赖 (仅命令行运行时；服务由 bootstrap 在启动时检查一次)"""
     try:
-        import selenium, bs4
+        import selenium, lxml
     except ImportError:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "selenium", "beautifulsoup4", "webdriver-manager"])
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "selenium", "lxml", "webdriver-manager"])
 
-check_dependencies()
+if __name__ == "__main__":
+    check_dependencies()
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-from webdriver_manager.chrome import ChromeDriverManager
+import extractor
+from browser_pool import pool_class_for
+from metrics import span
 
 def is_social_media(url):
     """检测社交媒体网站"""
@@ -39,81 +34,50 @@ def is_complex_site(url):
     domains = ['zhihu.com', 'weibo.com', 'csdn.net', 'jianshu.com']
     return any(d in urlparse(url).netloc.lower() for d in domains)
 
+def is_static_site(url):
+    """检测静态网站(HTTP直取即可，无需浏览器)"""
+    domains = ['wikipedia.org', 'github.com', 'python.org', 'readthedocs.io', 'cnblogs.com', 'sspai.com']
+    return any(d in urlparse(url).netloc.lower() for d in domains)
+
+def needs_stealth(url):
+    """是否需要反检测浏览器"""
+    return is_social_media(url) or is_complex_site(url)
+
 def get_content(url):
-    """获取页面内容 - 改进版配置"""
-    chrome_options = Options()
-    
-    # 基础配置
-    chrome_options.add_argument('--headless')
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-gpu')
-    
-    # 🔑 User-Agent (必需)
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
-    # 根据网站类型配置
-    stealth = is_social_media(url) or is_complex_site(url)
-    
-    if stealth:
-        # 完整反检测配置 (对知乎等复杂网站必需)
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    else:
-        # 普通网站优化
-        chrome_options.add_argument('--disable-images')
+    """获取页面内容 - 单次启动浏览器 (命令行模式)"""
+    # 根据网站类型选择配置: StealthBrowserPool / StandardBrowserPool
+    pool = pool_class_for(needs_stealth(url))(size=1, max_pages=1)
+    session = None
     
     try:
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-        
-        if stealth:
-            # JavaScript反检测 (关键!)
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            
-            # HTTP Headers设置
-            custom_headers = {
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            }
-            driver.execute_cdp_cmd('Network.setExtraHTTPHeaders', {'headers': custom_headers})
-        
-        driver.get(url)
-        
-        if stealth:
-            WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            time.sleep(3)
-        else:
-            WebDriverWait(driver, 15).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
-            )
-        
-        content = driver.page_source
-        title = driver.title
-        
-        return content, title
+        session = pool.launch_session()
+        return session.load(url)
         
     except Exception as e:
-        print(f"访问失败: {e}")
+        print(f"访问失败: {e}", file=sys.stderr)
         return None, ""
     finally:
-        try:
-            driver.quit()
-        except:
-            pass
+        if session is not None:
+            session.quit()
 
 def extract_content(html, url, title):
     """提取内容"""
     if not html:
         return {"title": "", "url": url, "content": "访问失败"}
     
-    soup = BeautifulSoup(html, 'html.parser')
-    text = soup.get_text(separator='\n', strip=True)
-    
+    # 正文提取: 去除导航/页脚/评论，同时生成结构化Markdown
+    with span("extract"):
+        article = extractor.extract(html, url)
+    return build_result(article, url, title)
+
+def build_result(article, url, title):
+    """把 extractor.Article 组装成API结果 (进程内或提取工作进程共用)"""
     return {
-        "title": title or (soup.find('title').get_text().strip() if soup.find('title') else ""),
+        "title": title or article.title,
         "url": url,
-        "content": text,
+        "content": article.text,
+        "markdown": article.markdown,
+        "extractor": article.method,
         "content_type": "text/html"
     }
 